@@ -13,6 +13,12 @@ from datetime import datetime
 from app.api.v1.schemas import RobotCreate, RobotUpdate, RobotResponse
 from app.dependencies import access_level, CurrentUser
 from app.db.DataBaseManager import db as async_db
+from app.db.bulk_import import DIALECTS
+from app.api.v1.inventory.streaming import (
+    DEFAULT_PAGE_SIZE,
+    history_stream_response,
+    import_progress_response,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -93,17 +99,33 @@ async def delete_robot(robot_id: str, _: Annotated[CurrentUser, Depends(access_l
 
 @router.post("/inventory/import")
 async def import_inventory_csv(
-    _: Annotated[CurrentUser, Depends(access_level)], file: UploadFile = File(...)
+    _: Annotated[CurrentUser, Depends(access_level)],
+    file: UploadFile = File(...),
+    progress: bool = Query(
+        False, description="Stream ndjson progress lines as chunks are committed"
+    ),
+    dialect: str = Query(
+        "default",
+        pattern=f"^({'|'.join(DIALECTS)})$",
+        description="CSV format: delimiter, date formats and status rules",
+    ),
 ):
-    """Импорт инвентарных данных из CSV файла."""
+    """Импорт инвентарных данных из CSV файла (кусками, без загрузки в память)."""
     if not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
 
+    logger.info(f"Importing inventory from file: {file.filename}")
+    if progress:
+        return import_progress_response(
+            lambda on_progress: async_db.import_inventory_stream(
+                file.file, dialect=DIALECTS[dialect], on_progress=on_progress
+            )
+        )
+
     try:
-        logger.info(f"Importing inventory from file: {file.filename}")
-        contents = await file.read()
-        csv_content = contents.decode("utf-8")
-        result = await async_db.process_csv_inventory_import(csv_content)
+        result = await async_db.import_inventory_stream(
+            file.file, dialect=DIALECTS[dialect]
+        )
 
         if result["status"] == "error":
             logger.error(f"CSV import failed: {result['error']}")
@@ -111,6 +133,8 @@ async def import_inventory_csv(
 
         logger.info(f"CSV import successful: {result.get('message', 'No message')}")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"File processing error: {e}")
         raise HTTPException(
@@ -125,10 +149,13 @@ async def get_inventory_history(
     to_date: Optional[str] = Query(None),
     zone: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    page_size: Optional[int] = Query(None, ge=1, le=5000),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$"),
 ):
     """Получить отфильтрованную историю инвентаризации."""
     logger.info(
-        f"Fetching inventory history with filters: from_date={from_date}, to_date={to_date}, zone={zone}, status={status}"
+        f"Fetching inventory history with filters: from_date={from_date}, to_date={to_date}, zone={zone}, status={status}, cursor={cursor}, format={output}"
     )
     try:
         from_dt = datetime.fromisoformat(from_date) if from_date else None
@@ -138,9 +165,30 @@ async def get_inventory_history(
             status_code=400, detail="Invalid date format. Use ISO format (YYYY-MM-DD)."
         )
 
-    items = await async_db.get_filter_inventory_history(
-        from_date=from_dt, to_date=to_dt, zone=zone, status=status
-    )
+    if output != "json":
+        rows = async_db.stream_inventory_history(
+            from_date=from_dt, to_date=to_dt, zone=zone, status=status
+        )
+        return history_stream_response(rows, output)
+
+    if cursor is None and page_size is None:
+        items = await async_db.get_filter_inventory_history(
+            from_date=from_dt, to_date=to_dt, zone=zone, status=status
+        )
+        logger.info(f"Found {len(items)} items in inventory history.")
+        return {"total": len(items), "items": items, "pagination": {}}
+
+    try:
+        page = await async_db.get_inventory_history_page(
+            from_date=from_dt,
+            to_date=to_dt,
+            zone=zone,
+            status=status,
+            cursor=cursor,
+            page_size=page_size or DEFAULT_PAGE_SIZE,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor value.")
 
-    logger.info(f"Found {len(items)} items in inventory history.")
-    return {"total": len(items), "items": items, "pagination": {}}
+    logger.info(f"Found {len(page['items'])} items in inventory history.")
+    return {"items": page["items"], "pagination": page["pagination"]}
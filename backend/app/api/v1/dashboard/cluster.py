@@ -0,0 +1,245 @@
+"""
+Рассылка дашборда между несколькими процессами (воркеры uvicorn, реплики)
+через Redis pub/sub.
+
+Один процесс выбирается лидером (SET NX PX с продлением аренды). Все
+процессы пересылают лидеру свои записанные данные инвентаризации
+(канал ingested), лидер ведет по ним состояние дашборда и публикует
+обновления (канал state), а каждый процесс рассылает их своим
+WebSocket-клиентам. Число соединений каждого процесса хранится в Redis
+с TTL, чтобы /health и /dashboard/ws/status показывали сумму по кластеру.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+import orjson
+
+from app.api.v1.dashboard.encoding import encode_json
+from app.api.v1.dashboard.websocket_manager import ws_manager
+from app.core.dashboard.aggregator import dashboard_state
+from app.core.events import event_bus, INVENTORY_INGESTED
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Продлить аренду, только если лидер все еще мы
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def decode_ingested(payload: Dict) -> Dict:
+    """Восстанавливает datetime в данных INVENTORY_INGESTED после JSON"""
+    return {
+        "robots": [
+            {**robot, "last_update": _parse_datetime(robot.get("last_update"))}
+            for robot in payload["robots"]
+        ],
+        "history_rows": [
+            {**row, "scanned_at": _parse_datetime(row.get("scanned_at"))}
+            for row in payload["history_rows"]
+        ],
+    }
+
+
+class DashboardCluster:
+    """Лидерство, пересылка данных лидеру и рассылка его состояния по процессам"""
+
+    def __init__(self, manager, prefix: str, lease_ms: int = 5000):
+        self.manager = manager
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.state_channel = f"{prefix}:dashboard:state"
+        self.ingest_channel = f"{prefix}:dashboard:ingested"
+        self.leader_key = f"{prefix}:dashboard:leader"
+        self.connections_prefix = f"{prefix}:dashboard:connections:"
+        self.lease_ms = lease_ms
+
+        self.redis = None
+        self.is_leader = False
+        # Срок лидерства: входит в версии, чтобы версии разных лидеров не совпадали
+        self.term: Optional[str] = None
+        # Последнее опубликованное лидером состояние: (версия, снимок)
+        self.latest = None
+
+        self._pubsub = None
+        self._tasks = []
+        self._pending = set()
+
+    # --- Жизненный цикл ---
+
+    async def start(self, redis):
+        self.redis = redis
+        self.manager.cluster = self
+        dashboard_state.cluster = self
+        self._pubsub = redis.pubsub()
+        await self._pubsub.subscribe(self.state_channel, self.ingest_channel)
+        event_bus.subscribe(INVENTORY_INGESTED, self._relay_ingested)
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._run_lease()),
+        ]
+        logger.info(f"Dashboard cluster started as {self.instance_id}")
+
+    async def stop(self):
+        event_bus.unsubscribe(INVENTORY_INGESTED, self._relay_ingested)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self.manager.cluster = None
+        dashboard_state.cluster = None
+        try:
+            await self.redis.eval(_RELEASE_LEASE, 1, self.leader_key, self.instance_id)
+            await self.redis.delete(self.connections_prefix + self.instance_id)
+            await self._pubsub.aclose()
+        except Exception as e:
+            logger.error(f"Error stopping dashboard cluster: {e}")
+        self.is_leader = False
+
+    # --- Лидерство ---
+
+    async def try_acquire_lease(self) -> bool:
+        """Захватить или продлить аренду лидера. Возвращает, лидер ли мы"""
+        if self.is_leader:
+            renewed = await self.redis.eval(
+                _RENEW_LEASE, 1, self.leader_key, self.instance_id, self.lease_ms
+            )
+            if not renewed:
+                logger.warning("Lost dashboard leadership")
+                self.is_leader = False
+        if not self.is_leader:
+            acquired = await self.redis.set(
+                self.leader_key, self.instance_id, nx=True, px=self.lease_ms
+            )
+            if acquired:
+                await self._become_leader()
+        return self.is_leader
+
+    async def _become_leader(self):
+        # Пока были ведомым, чужие данные не применяли: догоняем по БД
+        await dashboard_state.reconcile()
+        self.term = uuid.uuid4().hex[:8]
+        self.is_leader = True
+        logger.info(f"{self.instance_id} became dashboard leader (term {self.term})")
+
+    async def _run_lease(self):
+        while True:
+            try:
+                await self.try_acquire_lease()
+                await self.redis.set(
+                    self.connections_prefix + self.instance_id,
+                    self.manager.get_connections_count(),
+                    px=self.lease_ms,
+                )
+            except Exception as e:
+                logger.error(f"Dashboard cluster lease error: {e}")
+                self.is_leader = False
+            await asyncio.sleep(self.lease_ms / 3000)
+
+    def cluster_version(self, version):
+        return None if version is None else f"{self.term}:{version}"
+
+    # --- Обмен сообщениями ---
+
+    def _relay_ingested(self, payload: Dict):
+        # Данные, записанные лидером, уже применены его агрегатором
+        if self.is_leader:
+            return
+        message = encode_json({"source": self.instance_id, **payload})
+        task = asyncio.create_task(self.redis.publish(self.ingest_channel, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def publish_state(self, version, state, base_version=None, delta=None):
+        """Лидер: опубликовать новое состояние для всех процессов"""
+        await self.redis.publish(
+            self.state_channel,
+            encode_json(
+                {
+                    "version": self.cluster_version(version),
+                    "base_version": self.cluster_version(base_version),
+                    "state": state,
+                    "delta": delta,
+                }
+            ),
+        )
+
+    async def _handle_message(self, channel: str, data: bytes):
+        payload = orjson.loads(data)
+        if channel == self.state_channel:
+            self.latest = (payload["version"], payload["state"])
+            await self.manager.broadcast_state(
+                payload["version"],
+                payload["state"],
+                payload["base_version"],
+                payload["delta"],
+            )
+        elif channel == self.ingest_channel:
+            if self.is_leader and payload["source"] != self.instance_id:
+                ingested = decode_ingested(payload)
+                dashboard_state.apply_ingested(
+                    ingested["robots"], ingested["history_rows"]
+                )
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message["type"] != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                await self._handle_message(channel, message["data"])
+            except Exception as e:
+                logger.error(f"Error handling dashboard cluster message: {e}")
+
+    # --- Статистика ---
+
+    async def get_connections(self) -> Dict:
+        """Число WebSocket соединений по всем живым процессам"""
+        keys = [
+            key
+            async for key in self.redis.scan_iter(match=self.connections_prefix + "*")
+        ]
+        counts = await self.redis.mget(keys) if keys else []
+        instances = {}
+        for key, count in zip(keys, counts):
+            if count is None:
+                continue
+            if isinstance(key, bytes):
+                key = key.decode()
+            instances[key[len(self.connections_prefix):]] = int(count)
+        leader = await self.redis.get(self.leader_key)
+        return {
+            "total": sum(instances.values()),
+            "instances": instances,
+            "leader": leader.decode() if isinstance(leader, bytes) else leader,
+        }
+
+
+dashboard_cluster = DashboardCluster(
+    ws_manager, prefix=settings.REDIS_PREFIX, lease_ms=settings.WS_CLUSTER_LEASE_MS
+)
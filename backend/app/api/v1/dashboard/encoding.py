@@ -0,0 +1,126 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+import orjson
+
+try:
+    import msgpack
+except ImportError:  # msgpack — необязательная зависимость
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# datetime, Decimal и прочее сериализуем через str, как json.dumps(default=str)
+_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+# Кодировки: json — текстовые фреймы (по умолчанию, так работает фронтенд),
+# msgpack — бинарные фреймы
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+# Раскладка списков роботов и сканирований: rows — список объектов,
+# columns — объект с массивом значений на каждое поле
+LAYOUT_ROWS = "rows"
+LAYOUT_COLUMNS = "columns"
+
+# Списки записей в data сообщений дашборда (полный снимок и дельта)
+_RECORD_LISTS = {
+    "robots": ("upsert",),
+    "recent_scans": ("added", "replace"),
+}
+
+
+def encode_json(message: dict) -> bytes:
+    """Сериализует сообщение в JSON (UTF-8 bytes) один раз для всей рассылки"""
+    return orjson.dumps(message, default=str, option=_OPTIONS)
+
+
+class TextPayload(str):
+    """Текст фрейма, помнящий свой размер в UTF-8 (для метрик без encode)"""
+
+    def __new__(cls, data: bytes):
+        payload = super().__new__(cls, data.decode())
+        payload.nbytes = len(data)
+        return payload
+
+
+def encode_text(message: dict) -> TextPayload:
+    """JSON для текстового фрейма: фронтенд ждет текстовые сообщения"""
+    return TextPayload(encode_json(message))
+
+
+def to_columns(records: List[Dict]) -> Dict[str, List]:
+    """[{"id": 1, "zone": "A"}, ...] -> {"id": [1, ...], "zone": ["A", ...]}"""
+    if not records:
+        return {}
+    return {key: [record.get(key) for record in records] for key in records[0]}
+
+
+def _columnar_data(data: Dict) -> Dict:
+    data = dict(data)
+    for field, nested in _RECORD_LISTS.items():
+        value = data.get(field)
+        if isinstance(value, list):
+            data[field] = to_columns(value)
+        elif isinstance(value, dict):
+            data[field] = {
+                key: to_columns(item) if key in nested else item
+                for key, item in value.items()
+            }
+    return data
+
+
+def to_columnar(message: dict) -> dict:
+    """Сообщение дашборда с роботами и сканированиями в колоночной раскладке"""
+    if not isinstance(message.get("data"), dict):
+        return message
+    return {**message, "data": _columnar_data(message["data"])}
+
+
+class Codec:
+    """Согласованный с клиентом формат сообщений (?encoding=...&layout=...)"""
+
+    __slots__ = ("encoding", "layout")
+
+    def __init__(self, encoding: str = ENCODING_JSON, layout: str = LAYOUT_ROWS):
+        self.encoding = encoding
+        self.layout = layout
+
+    @classmethod
+    def negotiate(
+        cls, encoding: Optional[str] = None, layout: Optional[str] = None
+    ) -> "Codec":
+        """Формат по параметрам клиента; неизвестное или недоступное — JSON/rows"""
+        encoding = (encoding or ENCODING_JSON).lower()
+        layout = (layout or LAYOUT_ROWS).lower()
+        if encoding not in (ENCODING_JSON, ENCODING_MSGPACK):
+            logger.warning(f"Unknown WebSocket encoding {encoding!r}, using json")
+            encoding = ENCODING_JSON
+        if encoding == ENCODING_MSGPACK and msgpack is None:
+            logger.warning("msgpack is not installed, using json")
+            encoding = ENCODING_JSON
+        if layout not in (LAYOUT_ROWS, LAYOUT_COLUMNS):
+            logger.warning(f"Unknown WebSocket layout {layout!r}, using rows")
+            layout = LAYOUT_ROWS
+        return cls(encoding, layout)
+
+    @property
+    def key(self):
+        return (self.encoding, self.layout)
+
+    @property
+    def is_default(self) -> bool:
+        return self.key == (ENCODING_JSON, LAYOUT_ROWS)
+
+    def as_dict(self) -> Dict:
+        return {"encoding": self.encoding, "layout": self.layout}
+
+    def encode(self, message: dict) -> Union[TextPayload, bytes]:
+        """TextPayload — для текстового фрейма, bytes — для бинарного"""
+        if self.layout == LAYOUT_COLUMNS:
+            message = to_columnar(message)
+        if self.encoding == ENCODING_MSGPACK:
+            return msgpack.packb(message, default=str, use_bin_type=True)
+        return encode_text(message)
+
+
+DEFAULT_CODEC = Codec()
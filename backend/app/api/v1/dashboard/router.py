@@ -12,7 +12,7 @@ router = APIRouter()
 async def get_current_dashboard_state():
     """Получить текущее состояние дашборда."""
     try:
-        state = await async_db.get_current_state()
+        _, state = await ws_manager.get_versioned_state()
         return state
     except Exception as e:
         logger.error(f"Error fetching current dashboard state: {e}")
@@ -42,4 +42,7 @@ async def websocket_status():
     return {
         "active_connections": ws_manager.get_connections_count(),
         "status": "operational",
+        "fanout": ws_manager.metrics.get_stats(),
+        "queues": ws_manager.get_queue_stats(),
+        "cluster": await ws_manager.get_cluster_connections(),
     }
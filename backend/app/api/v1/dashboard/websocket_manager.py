@@ -1,89 +1,571 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Set, Tuple, Union
 from datetime import datetime
 import json
 import logging
 import asyncio
-from app.db.DataBaseManager import db as async_db  # ← Асинхронный менеджер
+import time
+from app.api.v1.dashboard.encoding import DEFAULT_CODEC, Codec, TextPayload
+from app.core.dashboard.aggregator import dashboard_state
+from app.core.dashboard.delta import diff_states
+from app.core.dashboard.subscriptions import (
+    Subscription,
+    Topic,
+    delta_topics,
+    filter_delta,
+    filter_state,
+)
+from app.core.events import event_bus, DASHBOARD_CHANGED
+from settings import settings
 
 logger = logging.getLogger(__name__)
 
+# full — каждый раз полный снимок (по умолчанию, так работает фронтенд);
+# delta — полный снимок в initial_data/refresh, дальше только изменения
+PROTOCOL_FULL = "full"
+PROTOCOL_DELTA = "delta"
+
+# Сообщение в очереди клиента: TextPayload — текстовый фрейм, bytes — бинарный
+Payload = Union[TextPayload, bytes]
+
+
+class FanoutMetrics:
+    """Метрики рассылки: задержка fan-out по последним рассылкам и отключенные клиенты"""
+
+    def __init__(self, window: int = 100):
+        self.broadcasts = 0
+        self.failed_sends = 0
+        self.evicted = 0
+        self.last_latency_ms = 0.0
+        self.last_encode_ms = 0.0
+        self.last_payload_bytes = 0
+        self.last_recipients = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(
+        self,
+        latency_ms: float,
+        encode_ms: float,
+        payload_bytes: int,
+        recipients: int,
+        failed: int,
+    ):
+        self.broadcasts += 1
+        self.failed_sends += failed
+        self.last_latency_ms = latency_ms
+        self.last_encode_ms = encode_ms
+        self.last_payload_bytes = payload_bytes
+        self.last_recipients = recipients
+        self._latencies.append(latency_ms)
+
+    def get_stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        p95_index = min(len(latencies) - 1, int(len(latencies) * 0.95))
+        return {
+            "broadcasts": self.broadcasts,
+            "failed_sends": self.failed_sends,
+            "evicted": self.evicted,
+            "last_recipients": self.last_recipients,
+            "last_payload_bytes": self.last_payload_bytes,
+            "last_encode_ms": round(self.last_encode_ms, 3),
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 3)
+            if latencies
+            else 0.0,
+            "p95_latency_ms": round(latencies[p95_index], 3)
+            if latencies
+            else 0.0,
+            "max_latency_ms": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+
+def _payload_size(payload: Payload) -> int:
+    # Размер текста известен с сериализации: повторный encode не нужен
+    return len(payload) if isinstance(payload, bytes) else payload.nbytes
+
+
+class ConnectionState:
+    """
+    Состояние одного WebSocket соединения: подписка, версия, которая есть
+    у клиента, очередь отправки со своим писателем и счетчики
+    """
+
+    __slots__ = (
+        "websocket",
+        "protocol",
+        "codec",
+        "subscription",
+        "version",
+        "queue",
+        "writer",
+        "sent",
+        "sent_bytes",
+        "dropped",
+    )
+
+    def __init__(
+        self, websocket: WebSocket, protocol: str, codec: Codec, queue_size: int
+    ):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.codec = codec
+        self.subscription: Optional[Subscription] = None
+        self.version = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+
+    @property
+    def is_delta(self) -> bool:
+        return self.protocol == PROTOCOL_DELTA
+
+    def get_stats(self) -> dict:
+        return {
+            "protocol": self.protocol,
+            **self.codec.as_dict(),
+            "version": self.version,
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            "dropped": self.dropped,
+            "subscription": self.subscription.as_dict()
+            if self.subscription is not None
+            else None,
+        }
+
 
 class WebSocketConnectionManager:
     """Менеджер для управления WebSocket соединениями"""
 
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, send_timeout: float = 2.0, queue_size: int = 32):
+        # Сокет -> состояние соединения: подключение и отключение за O(1)
+        self.connections: Dict[WebSocket, ConnectionState] = {}
+        # Индекс топик -> подписанные соединения
+        self.topic_index: Dict[Topic, Set[ConnectionState]] = defaultdict(set)
+        # Зоны роботов в последнем разосланном снимке (для ушедших из зоны)
+        self._robot_zones: Dict[str, Optional[str]] = {}
+        self.send_timeout = send_timeout
+        self.queue_size = queue_size
+        self.metrics = FanoutMetrics()
         self._broadcast_task = None
+        self._dashboard_changed = asyncio.Event()
+        # DashboardCluster, если включена рассылка через Redis
+        self.cluster = None
 
-    async def connect(self, websocket: WebSocket):
-        """Принять новое WebSocket соединение"""
+    async def connect(
+        self,
+        websocket: WebSocket,
+        protocol: str = PROTOCOL_FULL,
+        codec: Codec = DEFAULT_CODEC,
+    ) -> ConnectionState:
+        """Принять новое WebSocket соединение и запустить его писателя"""
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(
-            f"Client connected. Total connections: {len(self.active_connections)}"
-        )
+        connection = ConnectionState(websocket, protocol, codec, self.queue_size)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections[websocket] = connection
+        logger.info(f"Client connected. Total connections: {len(self.connections)}")
+        return connection
 
     def disconnect(self, websocket: WebSocket):
         """Отключить WebSocket соединение"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(
-                f"WebSocket disconnected. Total connections: {len(self.active_connections)}"
-            )
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        self._unindex(connection)
+        if connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        # Неотправленное больше не нужно; drain() не должен его ждать
+        while not connection.queue.empty():
+            connection.queue.get_nowait()
+            connection.queue.task_done()
+        logger.info(
+            f"WebSocket disconnected. Total connections: {len(self.connections)}"
+        )
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Отправить сообщение конкретному клиенту"""
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        """Заменить подписку клиента. Пустая подписка — весь дашборд"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        self._unindex(connection)
+        if subscription.is_empty:
+            return
+        connection.subscription = subscription
+        for topic in subscription.topics():
+            self.topic_index[topic].add(connection)
+
+    def unsubscribe(self, websocket: WebSocket):
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            self._unindex(connection)
+
+    def _unindex(self, connection: ConnectionState):
+        subscription = connection.subscription
+        if subscription is None:
+            return
+        connection.subscription = None
+        for topic in subscription.topics():
+            subscribers = self.topic_index.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.topic_index[topic]
+
+    async def _send(self, websocket: WebSocket, payload: Payload) -> bool:
+        """Отправка с таймаутом: зависшая отправка означает забитый буфер клиента"""
+        send = (
+            websocket.send_bytes if isinstance(payload, bytes) else websocket.send_text
+        )
         try:
-            await websocket.send_text(json.dumps(message, default=str))
+            await asyncio.wait_for(send(payload), timeout=self.send_timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Send to client timed out after {self.send_timeout}s, evicting"
+            )
         except Exception as e:
             logger.error(f"Error sending message to client: {e}")
-            self.disconnect(websocket)
+        return False
 
-    async def broadcast(self, message: dict):
-        """Отправить сообщение всем подключенным клиентам"""
-        disconnected = []
-        for connection in self.active_connections:
+    async def _write(self, connection: ConnectionState):
+        """Писатель соединения: отправляет сообщения из его очереди по порядку"""
+        while True:
+            payload = await connection.queue.get()
             try:
-                await connection.send_text(json.dumps(message, default=str))
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.disconnect(conn)
+                sent = await self._send(connection.websocket, payload)
+            finally:
+                connection.queue.task_done()
+            if not sent:
+                await self._evict(connection.websocket)
+                return
+            connection.sent += 1
+            connection.sent_bytes += _payload_size(payload)
 
-    def get_connections_count(self) -> int:
-        """Получить количество активных соединений"""
-        return len(self.active_connections)
+    def _enqueue(self, connection: ConnectionState, payload: Payload) -> bool:
+        """Поставить сообщение в очередь клиента; False, если она переполнена"""
+        try:
+            connection.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            connection.dropped += 1
+            logger.warning(
+                f"Send queue of a client is full ({self.queue_size}), evicting"
+            )
+            return False
+
+    async def _evict(self, websocket: WebSocket):
+        """Убрать клиента из рассылки и закрыть сокет, не дожидаясь его дольше таймаута"""
+        if websocket not in self.connections:
+            return
+        self.disconnect(websocket)
+        self.metrics.evicted += 1
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=self.send_timeout)
+        except Exception:
+            pass
 
-    async def broadcast_dashboard_updates(self, interval: int = 5):
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """Отправить сообщение конкретному клиенту"""
+        connection = self.connections.get(websocket)
+        if connection is not None and not self._enqueue(
+            connection, connection.codec.encode(message)
+        ):
+            await self._evict(websocket)
+
+    async def _fanout(
+        self,
+        deliveries: List[Tuple[ConnectionState, Payload]],
+        started: float,
+        encode_ms: float,
+    ):
         """
-        Фоновая задача для периодической отправки обновлений дашборда
+        Раскладывает уже закодированные сообщения по очередям клиентов и
+        учитывает метрики. Клиенты с переполненной очередью отключаются
         """
-        await asyncio.sleep(2)
-        logger.info(f"Starting dashboard broadcast task (interval: {interval}s)")
+        failed = [
+            connection
+            for connection, payload in deliveries
+            if not self._enqueue(connection, payload)
+        ]
+        if failed:
+            await asyncio.gather(
+                *(self._evict(connection.websocket) for connection in failed)
+            )
 
-        while True:
+        self.metrics.record(
+            latency_ms=(time.perf_counter() - started) * 1000,
+            encode_ms=encode_ms,
+            payload_bytes=sum(_payload_size(payload) for _, payload in deliveries),
+            recipients=len(deliveries),
+            failed=len(failed),
+        )
+
+    async def drain(self):
+        """Дождаться отправки всего, что уже стоит в очередях клиентов"""
+        await asyncio.gather(
+            *(connection.queue.join() for connection in list(self.connections.values()))
+        )
+
+    async def close_all(self):
+        """Закрыть все соединения (остановка приложения)"""
+        for websocket in list(self.connections):
+            self.disconnect(websocket)
             try:
-                if self.active_connections:
-                    # ИСПРАВЛЕНО: Просто вызываем метод, без создания сессии
-                    current_data = await async_db.get_current_state()
-
-                    message = {
-                        "type": "dashboard_update",
-                        "data": current_data,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                    await self.broadcast(message)
-                    logger.info(
-                        f"Broadcasted update to {len(self.active_connections)} clients"
+                await websocket.close()
+            except Exception:
+                pass
+
+    async def broadcast(self, message: dict):
+        """
+        Отправить сообщение всем подключенным клиентам: сериализация один
+        раз на каждый формат клиентов, затем сообщение ставится в очередь
+        каждого клиента. Рассылка не ждет отправки: медленный клиент
+        задерживает только свою очередь
+        """
+        connections = list(self.connections.values())
+        if not connections:
+            return
+        started = time.perf_counter()
+        payloads = {}
+        deliveries = []
+        for connection in connections:
+            codec = connection.codec
+            if codec.key not in payloads:
+                payloads[codec.key] = codec.encode(message)
+            deliveries.append((connection, payloads[codec.key]))
+        encode_ms = (time.perf_counter() - started) * 1000
+        await self._fanout(deliveries, started, encode_ms)
+
+    async def broadcast_state(
+        self,
+        version: int,
+        state: Dict,
+        base_version: Optional[int] = None,
+        delta: Optional[Dict] = None,
+    ):
+        """
+        Разослать новое состояние дашборда. Клиенты delta, у которых есть
+        base_version, получают dashboard_delta, остальные — полный снимок
+        dashboard_update. Подписчики получают срез по своей подписке, а если
+        дельта не затронула ни один их топик (ищется по индексу), ничего не
+        получают. Каждый вариант (срез и формат клиента) кодируется один раз.
+        """
+        connections = list(self.connections.values())
+        previous_zones = self._robot_zones
+        self._robot_zones = {
+            robot["id"]: robot.get("current_zone")
+            for robot in state.get("robots", ())
+        }
+        if not connections:
+            return
+        started = time.perf_counter()
+        timestamp = datetime.now().isoformat()
+
+        # Подписчики, чьи топики затронуты дельтой
+        touched = set()
+        if delta is not None and self.topic_index:
+            for topic in delta_topics(delta, previous_zones):
+                touched |= self.topic_index.get(topic, set())
+
+        slices = {}
+        payloads = {}
+
+        def sliced_delta(subscription):
+            if subscription.key not in slices:
+                slices[subscription.key] = filter_delta(
+                    delta, subscription, previous_zones
+                )
+            return slices[subscription.key]
+
+        def encoded(kind, connection, build):
+            subscription = connection.subscription
+            key = (
+                kind,
+                subscription.key if subscription is not None else None,
+                connection.codec.key,
+            )
+            if key not in payloads:
+                payloads[key] = connection.codec.encode(build())
+            return payloads[key]
+
+        deliveries = []
+        for connection in connections:
+            subscription = connection.subscription
+            in_sync = (
+                delta is not None
+                and connection.is_delta
+                and connection.version == base_version
+            )
+            data = delta
+            if delta is not None and subscription is not None:
+                data = sliced_delta(subscription) if connection in touched else None
+                # Срез клиента не изменился: версию сдвигаем без отправки
+                if data is None and (in_sync or not connection.is_delta):
+                    continue
+
+            if in_sync:
+                deliveries.append(
+                    (
+                        connection,
+                        encoded(
+                            "delta",
+                            connection,
+                            lambda: {
+                                "type": "dashboard_delta",
+                                "version": version,
+                                "base_version": base_version,
+                                "data": data,
+                                "timestamp": timestamp,
+                            },
+                        ),
                     )
+                )
+            else:
+                deliveries.append(
+                    (
+                        connection,
+                        encoded(
+                            "full",
+                            connection,
+                            lambda: {
+                                "type": "dashboard_update",
+                                "version": version,
+                                "data": state
+                                if subscription is None
+                                else filter_state(state, subscription),
+                                "timestamp": timestamp,
+                            },
+                        ),
+                    )
+                )
+        encode_ms = (time.perf_counter() - started) * 1000
+
+        for connection in connections:
+            connection.version = version
+        if deliveries:
+            await self._fanout(deliveries, started, encode_ms)
+
+    async def get_versioned_state(self):
+        """Текущий снимок с версией: от лидера кластера или из памяти процесса"""
+        if self.cluster is not None and self.cluster.latest is not None:
+            return self.cluster.latest
+        return await dashboard_state.get_versioned_state()
+
+    async def send_state(self, websocket: WebSocket, message_type: str):
+        """Отправить клиенту полный снимок (initial_data, ответ на refresh)"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        version, state = await self.get_versioned_state()
+        connection.version = version
+        if connection.subscription is not None:
+            state = filter_state(state, connection.subscription)
+        await self.send_personal_message(
+            {
+                "type": message_type,
+                "version": version,
+                "data": state,
+                "timestamp": datetime.now().isoformat(),
+            },
+            websocket,
+        )
+
+    def get_connections_count(self) -> int:
+        """Получить количество активных соединений"""
+        return len(self.connections)
+
+    def get_queue_stats(self) -> dict:
+        """Заполненность очередей отправки по всем соединениям"""
+        depths = [connection.queue.qsize() for connection in self.connections.values()]
+        return {
+            "queue_size": self.queue_size,
+            "queued": sum(depths),
+            "max_queued": max(depths, default=0),
+            "dropped": sum(
+                connection.dropped for connection in self.connections.values()
+            ),
+        }
+
+    async def get_cluster_connections(self):
+        """Соединения по всем процессам кластера (None без кластера)"""
+        if self.cluster is None:
+            return None
+        return await self.cluster.get_connections()
 
-                await asyncio.sleep(interval)
+    def _on_dashboard_changed(self, version: int):
+        self._dashboard_changed.set()
 
-            except Exception as e:
-                logger.error(f"Error in broadcast task: {e}")
-                await asyncio.sleep(interval)
+    async def _push_state(self, last_version, last_state):
+        """Разослать состояние, если оно изменилось. Возвращает новую (версию, снимок)"""
+        # Состояние берется из памяти, без запросов к БД
+        version, state = await dashboard_state.get_versioned_state()
+        # Версия не сдвинулась — рассылать нечего
+        if version == last_version:
+            return last_version, last_state
+        delta = diff_states(last_state, state) if last_state is not None else None
+        if last_state is None or delta is not None:
+            if self.cluster is not None:
+                # Рассылают все процессы, получив сообщение лидера
+                await self.cluster.publish_state(version, state, last_version, delta)
+                logger.info(f"Published dashboard update v{version} to the cluster")
+            else:
+                await self.broadcast_state(version, state, last_version, delta)
+                logger.info(
+                    f"Broadcasted update v{version} "
+                    f"to {len(self.connections)} clients"
+                )
+        return version, state
+
+    async def broadcast_dashboard_updates(
+        self, min_interval: float = 0.25, idle_interval: float = 30.0
+    ):
+        """
+        Фоновая задача рассылки обновлений дашборда по событию DASHBOARD_CHANGED.
+        События, пришедшие в течение min_interval после первого, сворачиваются
+        в одну рассылку. Без событий раз в idle_interval проверяется только
+        смена дня в снимке; к БД задача не обращается.
+        """
+        self._dashboard_changed = asyncio.Event()
+        event_bus.subscribe(DASHBOARD_CHANGED, self._on_dashboard_changed)
+        logger.info(
+            f"Starting dashboard broadcast task (min interval: {min_interval}s)"
+        )
+
+        last_version = None
+        last_state = None
+        try:
+            while True:
+                try:
+                    try:
+                        await asyncio.wait_for(
+                            self._dashboard_changed.wait(), timeout=idle_interval
+                        )
+                        # Копим пачку событий, затем одна рассылка
+                        await asyncio.sleep(min_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._dashboard_changed.clear()
+                    if self.cluster is not None:
+                        # В кластере состояние публикует только лидер
+                        if not self.cluster.is_leader:
+                            last_version, last_state = None, None
+                            continue
+                        last_version, last_state = await self._push_state(
+                            last_version, last_state
+                        )
+                    elif self.connections:
+                        last_version, last_state = await self._push_state(
+                            last_version, last_state
+                        )
+
+                except Exception as e:
+                    logger.error(f"Error in broadcast task: {e}")
+                    await asyncio.sleep(min_interval)
+        finally:
+            event_bus.unsubscribe(DASHBOARD_CHANGED, self._on_dashboard_changed)
 
 
 class WebSocketHandler:
@@ -96,18 +578,17 @@ class WebSocketHandler:
         """
         Обработать WebSocket соединение
         """
-        await self.manager.connect(websocket)
+        params = websocket.query_params
+        protocol = params.get("protocol", PROTOCOL_FULL)
+        codec = Codec.negotiate(params.get("encoding"), params.get("layout"))
+        await self.manager.connect(websocket, protocol, codec)
         try:
-            initial_data = await async_db.get_current_state()
-
-            await self.manager.send_personal_message(
-                {
-                    "type": "initial_data",
-                    "data": initial_data,
-                    "timestamp": datetime.now().isoformat(),
-                },
-                websocket,
-            )
+            if not codec.is_default:
+                # Клиент узнает, какой формат ему реально достался
+                await self.manager.send_personal_message(
+                    {"type": "encoding", **codec.as_dict()}, websocket
+                )
+            await self.manager.send_state(websocket, "initial_data")
 
             # Обрабатываем входящие сообщения от клиента
             while True:
@@ -153,23 +634,39 @@ class WebSocketHandler:
         message_type = message.get("type")
 
         if message_type == "refresh":
-            current_data = await async_db.get_current_state()
+            await self.manager.send_state(websocket, "dashboard_update")
+        elif message_type == "subscribe":
+            try:
+                subscription = Subscription.from_message(message)
+            except ValueError as e:
+                await self.manager.send_personal_message(
+                    {"type": "subscribed", "status": "error", "error": str(e)},
+                    websocket,
+                )
+                return
+            self.manager.subscribe(websocket, subscription)
             await self.manager.send_personal_message(
                 {
-                    "type": "dashboard_update",
-                    "data": current_data,
-                    "timestamp": datetime.now().isoformat(),
+                    "type": "subscribed",
+                    "status": "success",
+                    "subscription": subscription.as_dict(),
                 },
                 websocket,
             )
-        elif message_type == "subscribe":
+            # Снимок под новую подписку: дальше приходят только ее срезы
+            await self.manager.send_state(websocket, "dashboard_update")
+        elif message_type == "unsubscribe":
+            self.manager.unsubscribe(websocket)
             await self.manager.send_personal_message(
-                {"type": "subscribed", "status": "success"}, websocket
+                {"type": "unsubscribed", "status": "success"}, websocket
             )
+            await self.manager.send_state(websocket, "dashboard_update")
         else:
             logger.warning(f"Unknown message type: {message_type}")
 
 
 # Глобальные экземпляры
-ws_manager = WebSocketConnectionManager()
+ws_manager = WebSocketConnectionManager(
+    send_timeout=settings.WS_SEND_TIMEOUT, queue_size=settings.WS_SEND_QUEUE_SIZE
+)
 ws_handler = WebSocketHandler(ws_manager)
@@ -1,7 +1,15 @@
 from fastapi import APIRouter, UploadFile, HTTPException, Query, File
+from fastapi.responses import JSONResponse
 from typing import Optional
 from datetime import datetime
 from app.db.DataBaseManager import db
+from app.db.bulk_import import DIALECTS
+from app.core.ingestion.import_jobs import import_jobs
+from app.api.v1.inventory.streaming import (
+    DEFAULT_PAGE_SIZE,
+    history_stream_response,
+    import_progress_response,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +27,21 @@ async def get_inventory_history(
     ),
     zone: Optional[str] = Query(None, description="Фильтр по зоне"),
     status: Optional[str] = Query(None, description="Фильтр по статусу"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor из предыдущей страницы"
+    ),
+    page_size: Optional[int] = Query(
+        None,
+        ge=1,
+        le=5000,
+        description="Размер страницы; без cursor и page_size — весь диапазон",
+    ),
+    output: str = Query(
+        "json",
+        alias="format",
+        pattern="^(json|ndjson|csv)$",
+        description="json — страница с курсором, ndjson/csv — потоковая выгрузка всего диапазона",
+    ),
 ):
     """
     Получить отфильтрованную историю инвентаризации.
@@ -45,22 +68,38 @@ async def get_inventory_history(
                 )
 
         logger.info(
-            f"Fetching inventory history with filters: from_date={from_dt}, to_date={to_dt}, zone={zone}, status={status}"
-        )
-
-        # Вызываем асинхронный метод из DataBaseManager
-        items = await db.get_filter_inventory_history(
-            from_date=from_dt, to_date=to_dt, zone=zone, status=status
+            f"Fetching inventory history with filters: from_date={from_dt}, to_date={to_dt}, zone={zone}, status={status}, cursor={cursor}, format={output}"
         )
 
-        logger.info(f"Found {len(items)} records in inventory history.")
-
-        # Возвращаем ответ в том же формате, что и в вашем примере
-        return {
-            "total": len(items),
-            "items": items,
-            "pagination": {},  # пустой объект, как в требовании
-        }
+        if output != "json":
+            rows = db.stream_inventory_history(
+                from_date=from_dt, to_date=to_dt, zone=zone, status=status
+            )
+            return history_stream_response(rows, output)
+
+        if cursor is None and page_size is None:
+            # Прежний ответ без пагинации: фронтенд не ходит по курсорам
+            items = await db.get_filter_inventory_history(
+                from_date=from_dt, to_date=to_dt, zone=zone, status=status
+            )
+            logger.info(f"Found {len(items)} records in inventory history.")
+            return {"total": len(items), "items": items, "pagination": {}}
+
+        try:
+            page = await db.get_inventory_history_page(
+                from_date=from_dt,
+                to_date=to_dt,
+                zone=zone,
+                status=status,
+                cursor=cursor,
+                page_size=page_size or DEFAULT_PAGE_SIZE,
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid 'cursor' value.")
+
+        logger.info(f"Found {len(page['items'])} records in inventory history.")
+
+        return {"items": page["items"], "pagination": page["pagination"]}
 
     except HTTPException:
         # Пробрасываем HTTPException дальше, чтобы клиент получил правильный статус и сообщение
@@ -71,27 +110,59 @@ async def get_inventory_history(
 
 
 @router.post("/import")
-async def import_inventory_csv(file: UploadFile = File(...)):
+async def import_inventory_csv(
+    file: UploadFile = File(...),
+    progress: bool = Query(
+        False, description="Stream ndjson progress lines as chunks are committed"
+    ),
+    background: bool = Query(
+        False,
+        description="Return a job id at once, poll GET /import/{job_id} for progress",
+    ),
+    dialect: str = Query(
+        "default",
+        pattern=f"^({'|'.join(DIALECTS)})$",
+        description="CSV format: delimiter, date formats and status rules",
+    ),
+):
     """
     Импорт инвентарных данных из CSV файла.
+    Файл читается и коммитится кусками, целиком в память не загружается.
     """
     # Проверяем что файл CSV
     if not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
 
-    try:
-        # Читаем файл здесь и передаем содержимое в метод БД
-        contents = file.file.read()
-        csv_content = contents.decode("utf-8")
+    if background:
+        try:
+            job = await import_jobs.submit(
+                file.file, file.filename, dialect=DIALECTS[dialect]
+            )
+        finally:
+            file.file.close()
+        return JSONResponse(status_code=202, content=job)
+
+    if progress:
+        # Файл закроет FastAPI после отправки потокового ответа
+        return import_progress_response(
+            lambda on_progress: db.import_inventory_stream(
+                file.file, dialect=DIALECTS[dialect], on_progress=on_progress
+            )
+        )
 
-        # Передаем содержимое CSV в метод БД
-        result = await db.process_csv_inventory_import(csv_content)
+    try:
+        # Читаем временный файл загрузки кусками прямо в методе БД
+        result = await db.import_inventory_stream(
+            file.file, dialect=DIALECTS[dialect]
+        )
 
         if result["status"] == "error":
             raise HTTPException(status_code=400, detail=result["error"])
 
         return result
 
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
         raise HTTPException(
             status_code=400,
@@ -104,3 +175,15 @@ async def import_inventory_csv(file: UploadFile = File(...)):
         )
     finally:
         file.file.close()
+
+
+@router.get("/import/{job_id}")
+async def get_import_job(job_id: str):
+    """
+    Состояние фонового импорта: status, records_processed, rows_per_sec,
+    error_samples. Отвечает любой воркер, состояние хранится в Redis.
+    """
+    job = await import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
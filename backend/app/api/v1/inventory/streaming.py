@@ -0,0 +1,83 @@
+import asyncio
+import csv
+import io
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+from fastapi.responses import StreamingResponse
+
+# Размер страницы истории, если передан только cursor
+DEFAULT_PAGE_SIZE = 500
+
+HISTORY_CSV_COLUMNS = [
+    "id",
+    "robot_id",
+    "product_id",
+    "product_name",
+    "quantity",
+    "zone",
+    "shelf_number",
+    "status",
+    "scanned_at",
+    "recommended_order",
+    "discrepancy",
+    "prediction_confidence",
+]
+
+
+async def _ndjson_lines(rows: AsyncIterator[Dict]):
+    async for row in rows:
+        yield json.dumps(row, default=str, ensure_ascii=False) + "\n"
+
+
+async def _csv_lines(rows: AsyncIterator[Dict], batch_size: int = 500):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HISTORY_CSV_COLUMNS, delimiter=";")
+    writer.writeheader()
+    pending = 0
+    async for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def history_stream_response(rows: AsyncIterator[Dict], output: str) -> StreamingResponse:
+    """Потоковый ответ истории инвентаризации в формате ndjson или csv"""
+    if output == "csv":
+        return StreamingResponse(
+            _csv_lines(rows),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": "attachment; filename=inventory_history.csv"},
+        )
+    return StreamingResponse(_ndjson_lines(rows), media_type="application/x-ndjson")
+
+
+async def _progress_lines(run: Callable[..., Awaitable[Dict]]):
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_progress(progress: Dict):
+        await queue.put(progress)
+
+    task = asyncio.create_task(run(on_progress))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    while (progress := await queue.get()) is not None:
+        yield json.dumps({"type": "progress", **progress}, default=str) + "\n"
+    try:
+        result = task.result()
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    yield json.dumps({"type": "result", **result}, default=str) + "\n"
+
+
+def import_progress_response(run: Callable[..., Awaitable[Dict]]) -> StreamingResponse:
+    """
+    Потоковый ответ импорта: строка ndjson {"type": "progress", ...} после
+    каждого закоммиченного куска и последней {"type": "result", ...}.
+    run(on_progress) — корутина импорта, например db.import_inventory_stream.
+    """
+    return StreamingResponse(_progress_lines(run), media_type="application/x-ndjson")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from app.db.DataBaseManager import db
+from app.core.ingestion.buffer import ingestion_buffer, IngestionQueueFull
 
 
 router = APIRouter()
@@ -7,8 +7,20 @@ router = APIRouter()
 
 @router.post("/data")
 async def add_robot_data(data: dict):
+    if not data.get("robot_id"):
+        raise HTTPException(status_code=400, detail="robot_id is required")
     try:
-        state = await db.add_robot_data(data)
-        return state
+        ingestion_buffer.submit(data)
+        return True
+    except IngestionQueueFull as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/ingestion/stats")
+async def get_ingestion_stats():
+    """Счетчики очереди приема отчетов роботов."""
+    return ingestion_buffer.get_stats()
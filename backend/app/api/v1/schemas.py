@@ -103,3 +103,6 @@ class PredictRequest(BaseModel):
 class PredictResponse(BaseModel):
     predictions: List[Dict[str, Any]]
     confidence: float
+    failed: List[Dict[str, Any]] = []
+    generated_at: Optional[datetime] = None
+    stale: bool = False
@@ -0,0 +1,74 @@
+import random
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонен: внешний сервис недавно падал подряд"""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего сервиса. После failure_threshold неудач
+    подряд размыкается и reset_timeout секунд отклоняет вызовы сразу,
+    затем пропускает один пробный вызов: успех замыкает цепь, неудача
+    снова размыкает.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """Проверить, можно ли звать сервис. CircuitOpenError, если нельзя"""
+        if self.state == OPEN:
+            if self._clock() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"Circuit is open after {self.failures} consecutive failures"
+                )
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError("Circuit is half-open, trial call in flight")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self._clock()
+
+    def release(self):
+        """
+        Вызов прерван без ответа сервиса (отмена): пробный вызов не занят,
+        счетчик неудач не меняется
+        """
+        self._trial_in_flight = False
+
+    def get_stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Экспоненциальная задержка с полным джиттером: U(0, min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * 2**attempt))
@@ -0,0 +1,216 @@
+"""
+Локальный статистический прогноз исчерпания остатков.
+
+По сканированиям из inventory_history для каждого места хранения
+(товар, зона, полка) строится линейный тренд остатка во времени;
+скорость расхода — его наклон со знаком минус. Все суммы для регрессии
+считаются одним groupby по всей истории, без цикла по товарам, поэтому
+прогноз на весь каталог — это один проход pandas/NumPy.
+
+Уверенность — доля дисперсии остатка, объясненная трендом (R^2),
+умноженная на полноту ряда: два сканирования дают идеальную прямую,
+но доверять ей нельзя. Товар каталога без сканирований в окне получает
+явную оценку с нулевой уверенностью: расход не наблюдался, заказ не
+рекомендуется.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HISTORY_COLUMNS = ("product_id", "zone", "shelf_number", "quantity", "scanned_at")
+PRODUCT_COLUMNS = ("product_id", "min_stock", "optimal_stock")
+LOCATION_COLUMNS = ["product_id", "zone", "shelf_number"]
+
+# Значения по умолчанию модели Product
+DEFAULT_MIN_STOCK = 10
+DEFAULT_OPTIMAL_STOCK = 100
+
+SECONDS_PER_DAY = 86400.0
+
+
+class StockForecaster:
+    """
+    Прогноз days_until_stockout и recommended_order на horizon_days.
+
+    Заказ рекомендуется, если к концу горизонта остаток опустится ниже
+    min_stock, и пополняет его до optimal_stock.
+    """
+
+    def __init__(
+        self,
+        horizon_days: int = 7,
+        max_days: int = 365,
+        full_confidence_points: int = 10,
+    ):
+        self.horizon_days = horizon_days
+        # Если расхода нет, запас "бесконечен" — ограничиваем max_days
+        self.max_days = max_days
+        # Сколько сканирований одного места нужно для полной уверенности
+        self.full_confidence_points = full_confidence_points
+
+    def _location_trends(self, history: pd.DataFrame) -> pd.DataFrame:
+        """Наклон, R^2 и последний остаток для каждого места хранения"""
+        keys = [column for column in LOCATION_COLUMNS if column in history.columns]
+        frame = history.dropna(subset=["product_id", "quantity", "scanned_at"])
+        scanned_at = pd.to_datetime(frame["scanned_at"], utc=True)
+        # Время в днях от первого сканирования: числа небольшие, точности float64
+        # хватает для сумм квадратов
+        t = (scanned_at - scanned_at.min()).dt.total_seconds().to_numpy()
+        t = t / SECONDS_PER_DAY
+        q = frame["quantity"].to_numpy(dtype=np.float64)
+
+        frame = frame[keys].assign(t=t, q=q, tq=t * q, tt=t * t, qq=q * q)
+        # dropna=False: полка может быть не указана (NULL)
+        grouped = frame.sort_values("t", kind="stable").groupby(
+            keys, sort=False, dropna=False
+        )
+        sums = grouped.agg(
+            n=("t", "size"),
+            st=("t", "sum"),
+            sq=("q", "sum"),
+            stq=("tq", "sum"),
+            stt=("tt", "sum"),
+            sqq=("qq", "sum"),
+            quantity=("q", "last"),
+        )
+
+        n = sums["n"].to_numpy(dtype=np.float64)
+        cov = n * sums["stq"].to_numpy() - sums["st"].to_numpy() * sums["sq"].to_numpy()
+        var_t = n * sums["stt"].to_numpy() - sums["st"].to_numpy() ** 2
+        var_q = n * sums["sqq"].to_numpy() - sums["sq"].to_numpy() ** 2
+        # Погрешность округления не должна давать тренд по одной точке
+        has_trend = var_t > 1e-9 * np.maximum(n * sums["stt"].to_numpy(), 1.0)
+        flat = var_q <= 1e-9 * np.maximum(n * sums["sqq"].to_numpy(), 1.0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(has_trend, cov / var_t, 0.0)
+            r2 = np.where(has_trend & ~flat, cov * cov / (var_t * var_q), 0.0)
+        # Неизменный остаток полностью объясняется нулевым расходом
+        r2 = np.where(has_trend & flat, 1.0, r2)
+        coverage = np.clip(
+            (n - 1) / max(self.full_confidence_points - 1, 1), 0.0, 1.0
+        )
+
+        return pd.DataFrame(
+            {
+                "product_id": sums.index.get_level_values("product_id"),
+                "n": n,
+                "quantity": sums["quantity"].to_numpy(),
+                "rate": np.maximum(-slope, 0.0),
+                "confidence": np.clip(r2, 0.0, 1.0) * coverage,
+            }
+        )
+
+    def forecast(
+        self, history: pd.DataFrame, products: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """
+        Прогноз для всех товаров из history и каталога products. Колонки:
+        product_id, quantity, consumption_rate (шт/день), days_until_stockout,
+        recommended_order, confidence_score.
+        """
+        columns = [
+            "product_id",
+            "quantity",
+            "consumption_rate",
+            "days_until_stockout",
+            "recommended_order",
+            "confidence_score",
+        ]
+        has_catalog = products is not None and not products.empty
+        if history.empty and not has_catalog:
+            return pd.DataFrame(columns=columns)
+
+        if history.empty:
+            per_product = pd.DataFrame(
+                columns=["n", "quantity", "rate", "weighted"], dtype=np.float64
+            )
+        else:
+            trends = self._location_trends(history)
+            trends["weighted"] = trends["confidence"] * trends["n"]
+            # Остаток и расход товара — сумма по местам хранения, уверенность —
+            # средняя по местам с весом по числу сканирований
+            per_product = trends.groupby("product_id", sort=False).agg(
+                n=("n", "sum"),
+                quantity=("quantity", "sum"),
+                rate=("rate", "sum"),
+                weighted=("weighted", "sum"),
+            )
+        if has_catalog:
+            limits = products.set_index("product_id")[["min_stock", "optimal_stock"]]
+            # Товары каталога без сканирований в окне — строки с n = 0
+            unscanned = limits.index.difference(per_product.index, sort=False)
+            per_product = per_product.reindex(
+                per_product.index.append(unscanned), fill_value=0.0
+            ).join(limits, how="left")
+        else:
+            per_product["min_stock"] = np.nan
+            per_product["optimal_stock"] = np.nan
+
+        n = per_product["n"].to_numpy(dtype=np.float64)
+        has_data = n > 0
+        quantity = per_product["quantity"].to_numpy(dtype=np.float64)
+        rate = per_product["rate"].to_numpy(dtype=np.float64)
+        min_stock = (
+            per_product["min_stock"].fillna(DEFAULT_MIN_STOCK).to_numpy(np.float64)
+        )
+        optimal_stock = (
+            per_product["optimal_stock"]
+            .fillna(DEFAULT_OPTIMAL_STOCK)
+            .to_numpy(np.float64)
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            days = np.where(rate > 0, np.floor(quantity / rate), self.max_days)
+        days = np.clip(days, 0, self.max_days)
+
+        # Остаток к концу горизонта; ушедший в минус спрос не восполняется
+        projected = np.maximum(quantity - rate * self.horizon_days, 0.0)
+        order = np.where(
+            projected < min_stock, np.ceil(optimal_stock - projected), 0.0
+        )
+        # Без сканирований остаток неизвестен: заказывать вслепую нельзя
+        order = np.where(has_data, order, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = np.where(
+                has_data, per_product["weighted"].to_numpy(np.float64) / n, 0.0
+            )
+
+        return pd.DataFrame(
+            {
+                "product_id": per_product.index.to_numpy(),
+                "quantity": quantity.astype(np.int64),
+                "consumption_rate": np.round(rate, 3),
+                "days_until_stockout": days.astype(np.int64),
+                "recommended_order": np.maximum(order, 0).astype(np.int64),
+                "confidence_score": np.round(confidence, 2),
+            },
+            columns=columns,
+        )
+
+    def predict(
+        self,
+        history: pd.DataFrame,
+        products: Optional[pd.DataFrame] = None,
+        created_at: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """Прогноз в формате предсказаний LLM для add_ai_prediction"""
+        frame = self.forecast(history, products)
+        created_at = (created_at or datetime.now()).isoformat()
+        return [
+            {
+                "product_id": product_id,
+                "days_until_stockout": int(days),
+                "recommended_order": int(order),
+                "confidence_score": float(confidence),
+                "created_at": created_at,
+            }
+            for product_id, days, order, confidence in zip(
+                frame["product_id"],
+                frame["days_until_stockout"],
+                frame["recommended_order"],
+                frame["confidence_score"],
+            )
+        ]
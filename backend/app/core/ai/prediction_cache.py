@@ -0,0 +1,130 @@
+"""
+Кеш предсказаний LLM по содержимому входных данных.
+
+Ключ — sha256 нормализованной таблицы товаров, которую видит модель
+(prompting.product_rows, отсортированная по product_id), горизонта и
+модели. Поля истории, не попадающие в промпт (текущие предсказания,
+расхождения), в ключ не входят. Одинаковые данные не отправляются в LLM
+повторно, а любое их изменение дает новый ключ, поэтому кеш не нужно
+сбрасывать по времени.
+
+Уровни: последний результат в памяти процесса -> Redis (общий для
+процессов, с TTL) -> ai_predictions.input_hash (переживает рестарт Redis).
+"""
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+from app.core.ai.prompting import encode_table, product_rows
+from app.db.DataBaseManager import db as default_db
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def prediction_input_hash(
+    inventory_data: Dict, historical_data, period_days: int, model: str
+) -> str:
+    rows = sorted(
+        product_rows(inventory_data, historical_data), key=lambda row: str(row[0])
+    )
+    payload = f"{model}\n{period_days}\n{encode_table(rows)}"
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PredictionCache:
+    """Результаты get_prediction по хешу входных данных"""
+
+    def __init__(self, prefix: str, ttl: int = 86400, db=None):
+        self.key_prefix = f"{prefix}:ai:prediction:"
+        self.ttl = ttl
+        self.db = db or default_db
+        self.redis = None
+        self._last: Optional[Tuple[str, Dict]] = None
+        self.hits = {"memory": 0, "redis": 0, "db": 0}
+        self.misses = 0
+        self.errors = 0
+
+    async def start(self, redis):
+        self.redis = redis
+
+    async def get(self, input_hash: str) -> Optional[Dict]:
+        """{"categories", "failed"} для этих данных или None (промах)"""
+        if self._last is not None and self._last[0] == input_hash:
+            self.hits["memory"] += 1
+            return self._last[1]
+
+        source = "redis"
+        result = await self._get_redis(input_hash)
+        if result is None:
+            source = "db"
+            result = await self._get_db(input_hash)
+            if result is not None:
+                await self._set_redis(input_hash, result)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits[source] += 1
+        self._last = (input_hash, result)
+        return result
+
+    async def set(self, input_hash: str, result: Dict):
+        """
+        Запомнить полный ответ LLM. В ai_predictions строки с input_hash
+        пишет add_ai_prediction при сохранении пачки.
+        """
+        self._last = (input_hash, result)
+        await self._set_redis(input_hash, result)
+
+    async def _get_redis(self, input_hash: str) -> Optional[Dict]:
+        if self.redis is None:
+            return None
+        try:
+            cached = await self.redis.get(self.key_prefix + input_hash)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prediction cache read from Redis failed: {e}")
+            return None
+        return orjson.loads(cached) if cached is not None else None
+
+    async def _set_redis(self, input_hash: str, result: Dict):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(
+                self.key_prefix + input_hash, orjson.dumps(result), ex=self.ttl
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prediction cache write to Redis failed: {e}")
+
+    async def _get_db(self, input_hash: str) -> Optional[Dict]:
+        try:
+            predictions = await self.db.get_predictions_by_input_hash(input_hash)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prediction cache lookup in ai_predictions failed: {e}")
+            return None
+        if not predictions:
+            return None
+        return {"categories": predictions, "failed": []}
+
+    def get_stats(self) -> Dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "hits_by_source": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "errors": self.errors,
+            "redis": self.redis is not None,
+        }
+
+
+prediction_cache = PredictionCache(
+    prefix=settings.REDIS_PREFIX, ttl=settings.PREDICTION_CACHE_TTL
+)
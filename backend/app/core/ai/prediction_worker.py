@@ -0,0 +1,358 @@
+"""
+Фоновое обновление AI-предсказаний.
+
+Воркер по расписанию собирает данные, спрашивает YandexGPT и сохраняет
+пачку через add_ai_prediction; /ai/predict отдает последнюю пачку из
+памяти (или из current_ai_predictions после рестарта) без вызова LLM.
+Устаревшая пачка отдается сразу, а обновление запускается в фоне
+(stale-while-revalidate). Одновременные промахи ждут одно и то же
+обновление (single-flight), а между процессами обновление разделяет
+advisory lock Postgres.
+
+Движок задается PREDICTION_ENGINE: "llm" — YandexGPT, а товары, по
+которым он не ответил (или весь запрос, если сервис недоступен),
+закрываются локальным прогнозом StockForecaster; "statistical" — только
+локальный прогноз по всему каталогу, без вызова LLM.
+
+Ответы LLM кешируются по хешу входных данных (prediction_cache), поэтому
+в режиме llm воркер проверяет данные часто (PREDICTION_CHECK_INTERVAL), а
+LLM вызывается, только когда они изменились.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.core.ai.forecaster import StockForecaster
+from app.core.ai.prediction_cache import prediction_cache, prediction_input_hash
+from app.core.ai.yandex_gpt_client import yandex_client
+from app.db.DataBaseManager import db as default_db
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+_REFRESH_LOCK = "ai_predictions_refresh"
+
+# Уверенность, с которой сохраняются предсказания LLM (см. add_ai_prediction)
+LLM_CONFIDENCE = 0.75
+
+ENGINE_LLM = "llm"
+ENGINE_STATISTICAL = "statistical"
+
+
+class PredictionService:
+    """Последняя пачка предсказаний и ее фоновое обновление"""
+
+    def __init__(
+        self,
+        refresh_interval: float = 3600.0,
+        stale_after: float = 7200.0,
+        db=None,
+        client=None,
+        engine: str = ENGINE_LLM,
+        history_days: int = 14,
+        forecaster: Optional[StockForecaster] = None,
+        cache=None,
+        check_interval: float = 60.0,
+    ):
+        self.refresh_interval = refresh_interval
+        self.stale_after = stale_after
+        self.db = db or default_db
+        self.client = client or yandex_client
+        self.engine = engine
+        self.history_days = history_days
+        self.forecaster = forecaster or StockForecaster()
+        self.cache = cache or prediction_cache
+        self.check_interval = check_interval
+        # {"predictions", "failed", "confidence", "generated_at" (datetime UTC)}
+        self.latest: Optional[Dict] = None
+        self._flights: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_refresh_ms = 0.0
+        # Чем посчитана последняя пачка: llm, statistical или llm+statistical
+        self.last_engine: Optional[str] = None
+
+    # --- Чтение ---
+
+    def age(self, batch: Dict) -> float:
+        return (datetime.utcnow() - batch["generated_at"]).total_seconds()
+
+    def is_stale(self, batch: Dict) -> bool:
+        return self.age(batch) >= self.stale_after
+
+    @property
+    def poll_interval(self) -> float:
+        # LLM вызывается только на изменившихся данных — проверять их можно часто
+        if self.engine == ENGINE_LLM:
+            return self.check_interval
+        return self.refresh_interval
+
+    async def get_latest(self) -> Optional[Dict]:
+        """
+        Пачка для ответа /ai/predict. Свежая — сразу; устаревшая — тоже
+        сразу, но с фоновым обновлением; если пачки нет — ждем загрузку из
+        БД или общее для всех запросов обновление. None, если LLM недоступен
+        и сохраненных предсказаний нет.
+        """
+        batch = self.latest
+        if batch is None:
+            return await self._single_flight("load", self._load_or_refresh)
+        if self.is_stale(batch):
+            self._revalidate()
+        return batch
+
+    # --- Обновление ---
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable]):
+        """Одна задача на key: параллельные вызовы ждут ее результат"""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        # shield: отмена одного ожидающего запроса не отменяет обновление для всех
+        return await asyncio.shield(task)
+
+    def _revalidate(self):
+        if "refresh" not in self._flights:
+            logger.info("Serving stale AI predictions, refreshing in background")
+            self._flights["refresh"] = task = asyncio.create_task(self._refresh())
+            task.add_done_callback(lambda _: self._flights.pop("refresh", None))
+
+    async def refresh(self) -> Optional[Dict]:
+        """Обновить предсказания (повторные вызовы ждут уже идущее обновление)"""
+        return await self._single_flight("refresh", self._refresh)
+
+    async def reload(self) -> Optional[Dict]:
+        """Взять последнюю сохраненную пачку из БД (например, от другого процесса)"""
+        batch = await self.db.get_latest_prediction_batch()
+        if batch is not None and (
+            self.latest is None or batch["generated_at"] > self.latest["generated_at"]
+        ):
+            self.latest = batch
+        return self.latest
+
+    async def _load_or_refresh(self) -> Optional[Dict]:
+        try:
+            batch = await self.reload()
+        except Exception as e:
+            logger.error(f"Failed to load stored AI predictions: {e}")
+            batch = None
+        if batch is None:
+            return await self.refresh()
+        if self.is_stale(batch):
+            self._revalidate()
+        return batch
+
+    @asynccontextmanager
+    async def refresh_lock(self):
+        """advisory lock на время обновления; False, если его держит другой процесс"""
+        async with self.db.engine.connect() as conn:
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(hashtext(:key))"),
+                {"key": _REFRESH_LOCK},
+            )
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(hashtext(:key))"),
+                        {"key": _REFRESH_LOCK},
+                    )
+
+    async def _refresh(self) -> Optional[Dict]:
+        started = time.perf_counter()
+        try:
+            async with self.refresh_lock() as acquired:
+                if not acquired:
+                    logger.info("AI predictions are refreshed by another instance")
+                    return await self.reload()
+                batch = await self._generate()
+        except Exception as e:
+            batch = None
+            self.last_error = str(e)
+            logger.error(f"Error refreshing AI predictions: {e}")
+
+        self.last_refresh_ms = (time.perf_counter() - started) * 1000
+        if batch is None:
+            self.failures += 1
+            # Старая пачка остается в ответах, пока обновление не удастся
+            return self.latest
+        self.refreshes += 1
+        self.last_error = None
+        self.latest = batch
+        logger.info(
+            f"AI predictions refreshed: {len(batch['predictions'])} products "
+            f"in {self.last_refresh_ms:.0f} ms"
+        )
+        return batch
+
+    async def _generate(self) -> Optional[Dict]:
+        """Данные из БД -> LLM и/или локальный прогноз -> add_ai_prediction"""
+        generated_at = datetime.utcnow()
+        if self.engine == ENGINE_STATISTICAL:
+            return await self._save(
+                await self._forecast(generated_at), [], generated_at, self.engine
+            )
+
+        data = await self.db.get_data_for_predict()
+        if not isinstance(data, tuple):
+            # Критичных остатков нет — предсказывать нечего
+            return self._batch([], [], generated_at)
+        inventory_data, historical_data = data
+
+        input_hash = prediction_input_hash(
+            inventory_data, historical_data, self.client.period_days, self.client.model
+        )
+        cached = await self.cache.get(input_hash)
+        if cached is not None:
+            if self.latest is not None and self.latest.get("input_hash") == input_hash:
+                # Данные не изменились — последняя пачка по-прежнему актуальна
+                return dict(self.latest, generated_at=generated_at)
+            # Эти данные LLM уже видел, но текущие предсказания сейчас другие
+            predictions = [
+                dict(prediction, created_at=generated_at.isoformat())
+                for prediction in cached["categories"]
+            ]
+            return await self._save(
+                predictions, [], generated_at, ENGINE_LLM, input_hash
+            )
+
+        request_data = await self.client.get_prediction(inventory_data, historical_data)
+        if request_data is None or not request_data.get("categories"):
+            logger.warning("AI service returned no predictions, using local forecast")
+            predictions = await self._forecast(generated_at)
+            if not predictions:
+                self.last_error = "AI service returned no predictions"
+                return None
+            return await self._save(predictions, [], generated_at, ENGINE_STATISTICAL)
+
+        predictions = list(request_data["categories"])
+        # Товары, по которым LLM так и не дал предсказания, с причиной
+        failed = request_data.get("failed", [])
+        if not failed:
+            # Кешируется только полный ответ: отказы сервиса не запоминаем
+            await self.cache.set(input_hash, request_data)
+            return await self._save(
+                predictions, [], generated_at, ENGINE_LLM, input_hash
+            )
+
+        engine = ENGINE_LLM
+        local = {
+            prediction["product_id"]: prediction
+            for prediction in await self._forecast(generated_at)
+        }
+        covered = [item for item in failed if item["product_id"] in local]
+        if covered:
+            predictions.extend(local[item["product_id"]] for item in covered)
+            failed = [item for item in failed if item["product_id"] not in local]
+            engine = f"{ENGINE_LLM}+{ENGINE_STATISTICAL}"
+        return await self._save(predictions, failed, generated_at, engine)
+
+    async def _forecast(self, generated_at: datetime) -> List[Dict]:
+        """Локальный прогноз по всему каталогу (CPU — в отдельном потоке)"""
+        history, products = await self.db.get_forecast_data(self.history_days)
+        return await asyncio.to_thread(
+            self.forecaster.predict, history, products, generated_at
+        )
+
+    async def _save(
+        self,
+        predictions: List[Dict],
+        failed: List[Dict],
+        generated_at,
+        engine,
+        input_hash: Optional[str] = None,
+    ) -> Optional[Dict]:
+        if not predictions:
+            return self._batch([], failed, generated_at)
+        saved = await self.db.add_ai_prediction(predictions, input_hash=input_hash)
+        if saved is None:
+            self.last_error = "Failed to save AI predictions"
+            return None
+        self.last_engine = engine
+        return self._batch(saved, failed, generated_at, input_hash)
+
+    @staticmethod
+    def _batch(
+        predictions: List[Dict],
+        failed: List[Dict],
+        generated_at,
+        input_hash: Optional[str] = None,
+    ) -> Dict:
+        scores = [
+            LLM_CONFIDENCE
+            if prediction.get("confidence_score") is None
+            else float(prediction["confidence_score"])
+            for prediction in predictions
+        ]
+        return {
+            "predictions": predictions,
+            "failed": failed,
+            # Средняя уверенность по товарам пачки
+            "confidence": round(sum(scores) / len(scores), 2) if scores else 0.0,
+            "generated_at": generated_at,
+            "input_hash": input_hash,
+        }
+
+    # --- Фоновая задача ---
+
+    async def _run(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"Failed to load stored AI predictions: {e}")
+        while True:
+            # После рестарта не зовем LLM, если сохраненная пачка еще свежая
+            wait = 0.0
+            if self.latest is not None:
+                wait = max(0.0, self.poll_interval - self.age(self.latest))
+            await asyncio.sleep(wait)
+            await self.refresh()
+            if self.latest is None or self.age(self.latest) >= self.poll_interval:
+                # Обновление не удалось — не долбим LLM в цикле
+                await asyncio.sleep(min(self.poll_interval, 60.0))
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_refresh_ms": round(self.last_refresh_ms, 1),
+            "generated_at": self.latest["generated_at"].isoformat()
+            if self.latest
+            else None,
+            "refreshing": "refresh" in self._flights,
+            "engine": self.engine,
+            "last_engine": self.last_engine,
+            "cache": self.cache.get_stats(),
+        }
+
+
+prediction_service = PredictionService(
+    refresh_interval=settings.PREDICTION_REFRESH_INTERVAL,
+    stale_after=settings.PREDICTION_STALE_AFTER,
+    engine=settings.PREDICTION_ENGINE,
+    history_days=settings.PREDICTION_HISTORY_DAYS,
+    check_interval=settings.PREDICTION_CHECK_INTERVAL,
+)
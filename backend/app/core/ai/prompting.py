@@ -0,0 +1,106 @@
+"""
+Компактное представление товаров для промпта и нарезка на куски по
+бюджету токенов.
+
+Вместо repr словарей истории в промпт идет CSV-таблица с одной строкой
+на товар: id, текущий остаток, ряд остатков из последних сканирований и
+охват этого ряда в часах. Размер в токенах оценивается по длине текста
+(без токенизатора модели), поэтому оценка намеренно завышена.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+PRODUCT_COLUMNS = ("product_id", "qty", "history", "hours")
+
+# Консервативная оценка: у моделей обычно 3-4 символа ASCII на токен
+CHARS_PER_TOKEN = 3
+# Один объект ответа {"product_id": ..., "days_until_stockout": ..., ...}
+OUTPUT_TOKENS_PER_PRODUCT = 30
+# Сколько последних сканирований товара попадает в ряд history
+HISTORY_POINTS = 10
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _scanned_at(row: Dict):
+    value = row.get("scanned_at")
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def product_rows(inventory_data: Dict, historical_data: List[Dict]) -> List[List]:
+    """Одна строка таблицы на товар из inventory_data (и истории)"""
+    history = defaultdict(list)
+    for row in historical_data:
+        if row.get("product_id") and _scanned_at(row) is not None:
+            history[row["product_id"]].append((_scanned_at(row), row.get("quantity")))
+
+    rows = []
+    product_ids = list(inventory_data) + [
+        product_id for product_id in history if product_id not in inventory_data
+    ]
+    for product_id in product_ids:
+        points = sorted(history.get(product_id, []), key=lambda point: point[0])
+        points = points[-HISTORY_POINTS:]
+        quantity = inventory_data.get(product_id)
+        if quantity is None and points:
+            quantity = points[-1][1]
+        hours = (
+            round((points[-1][0] - points[0][0]).total_seconds() / 3600, 1)
+            if len(points) > 1
+            else 0
+        )
+        rows.append(
+            [
+                product_id,
+                quantity,
+                " ".join(str(point[1]) for point in points),
+                hours,
+            ]
+        )
+    return rows
+
+
+def encode_row(row: Sequence) -> str:
+    """CSV без кавычек: значения в таблице не содержат запятых"""
+    return ",".join("" if value is None else str(value) for value in row)
+
+
+def encode_table(
+    rows: Sequence[Sequence], columns: Sequence[str] = PRODUCT_COLUMNS
+) -> str:
+    return "\n".join([",".join(columns)] + [encode_row(row) for row in rows])
+
+
+def chunk_rows(
+    rows: Sequence[Sequence], input_budget: int, output_budget: int
+) -> List[List]:
+    """
+    Жадно раскладывает строки по кускам так, чтобы таблица куска укладывалась
+    в input_budget токенов, а ответ на нее (по OUTPUT_TOKENS_PER_PRODUCT на
+    товар) — в output_budget. Строка, которая одна не влезает, идет отдельным
+    куском.
+    """
+    max_products = max(1, output_budget // OUTPUT_TOKENS_PER_PRODUCT)
+    header_tokens = estimate_tokens(",".join(PRODUCT_COLUMNS))
+    chunks = []
+    current = []
+    current_tokens = header_tokens
+    for row in rows:
+        row_tokens = estimate_tokens(encode_row(row)) + 1
+        if current and (
+            current_tokens + row_tokens > input_budget or len(current) >= max_products
+        ):
+            chunks.append(current)
+            current = []
+            current_tokens = header_tokens
+        current.append(row)
+        current_tokens += row_tokens
+    if current:
+        chunks.append(current)
+    return chunks
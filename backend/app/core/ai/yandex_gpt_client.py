@@ -1,9 +1,34 @@
+import asyncio
 import json
 import httpx
 import re
 from settings import settings
 from datetime import datetime
 import logging
+from typing import Dict, List, Optional, Tuple
+from app.core.ai.circuit_breaker import CircuitBreaker, CircuitOpenError, backoff_delay
+from app.core.ai.prompting import (
+    chunk_rows,
+    encode_table,
+    estimate_tokens,
+    product_rows,
+)
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Товар не вернулся в ответе (обрезан или пропущен моделью) — стоит переспросить
+MISSING_PREDICTION = "missing or invalid in AI response"
+
+
+class AIServiceError(Exception):
+    """YandexGPT не ответил успешно после всех попыток"""
+
+
+class AIServiceUnavailable(AIServiceError):
+    """
+    Сбой сервиса (сеть, 429/5xx после повторов, тело не в JSON): его
+    учитывает предохранитель, в отличие от отказа 4xx
+    """
 
 
 class YandexGPTClient:
@@ -14,6 +39,13 @@ class YandexGPTClient:
         model=settings.YANDEX_MODEL,
         temperature=settings.TEMPERATURE_MODEL,
         max_tokens=settings.MAX_TOKENS,
+        max_concurrency=settings.YANDEX_MAX_CONCURRENCY,
+        max_retries=settings.YANDEX_MAX_RETRIES,
+        backoff_base=settings.YANDEX_BACKOFF_BASE,
+        backoff_max=settings.YANDEX_BACKOFF_MAX,
+        connect_timeout=settings.YANDEX_CONNECT_TIMEOUT,
+        read_timeout=settings.YANDEX_READ_TIMEOUT,
+        breaker=None,
     ):
         self.api_key = api_key
         self.url = url
@@ -22,27 +54,111 @@ class YandexGPTClient:
         self.period_days = 7
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = httpx.Timeout(connect_timeout, read=read_timeout)
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.YANDEX_BREAKER_THRESHOLD,
+            reset_timeout=settings.YANDEX_BREAKER_RESET,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
 
-    def send_to_ai(self, inventory_data, historical_data):
-        logging.debug(f"INV DATA: {inventory_data}")
-        logging.debug(f"HIS DATA: {historical_data}")
-        prompt = (
-            f"""
-        Analyze warehouse inventory data and predict stock levels for next 7 days.
-        Current data: {inventory_data}
-        Historical consumption pattern: {historical_data}
-        Provide predictions in JSON format with fields: product_id, days_until_stockout, recommended_order. 
-        Return ONLY valid JSON array, no additional text or markdown.
-        Example: """
-            + """[{"product_id": "TEL-4567", "days_until_stockout": 9, "recommended_order": 100}, {"product_id": "TEL-8901", "days_until_stockout": 4, "recommended_order": 50}]
+    async def start(self):
+        """Открыть общий пул соединений (вызывается в lifespan приложения)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60.0,
+                ),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Api-Key {self.api_key}",
+                },
+            )
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, payload: dict) -> dict:
+        """
+        POST к YandexGPT: не больше max_concurrency запросов одновременно,
+        повтор с джиттером на 429/5xx и сетевые ошибки, предохранитель
+        отсекает вызовы, пока сервис лежит
         """
+        self.breaker.before_call()
+        try:
+            result = await self._post_with_retries(payload)
+        except AIServiceUnavailable:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Отмена, отказ 4xx или ошибка в коде — не сбой сервиса: не
+            # считаем, но пробный вызов предохранителя нужно освободить
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _post_with_retries(self, payload: dict) -> dict:
+        await self.start()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = backoff_delay(attempt - 1, self.backoff_base, self.backoff_max)
+                retry_after = _retry_after(error)
+                if retry_after is not None:
+                    delay = min(max(delay, retry_after), self.backoff_max)
+                logging.warning(
+                    f"YandexGPT attempt {attempt} failed ({error}), "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(self.url, json=payload)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        # 200 с телом не в JSON (прокси, обрыв) — сбой сервиса
+                        raise AIServiceUnavailable(
+                            f"YandexGPT returned a non-JSON body: {e}"
+                        ) from e
+                error = response
+            except httpx.TransportError as e:
+                error = e
+            except httpx.HTTPStatusError as e:
+                # 4xx кроме 429 повтором не исправить
+                raise AIServiceError(f"YandexGPT rejected the request: {e}") from e
+
+        raise AIServiceUnavailable(
+            f"YandexGPT failed after {self.max_retries + 1} attempts: {error}"
         )
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Api-Key {self.api_key}",
-        }
+    def build_prompt(self, table: str) -> str:
+        return (
+            f"Analyze warehouse inventory and predict stock levels for the next "
+            f"{self.period_days} days.\n"
+            "Products as CSV: qty is the current stock, history is the stock seen "
+            "by recent scans (oldest first), hours is the time span of that history.\n"
+            f"{table}\n"
+            "Return one object for EVERY product_id in the table with fields: "
+            "product_id, days_until_stockout, recommended_order.\n"
+            "Return ONLY valid JSON array, no additional text or markdown.\n"
+            'Example: [{"product_id": "TEL-4567", "days_until_stockout": 9, '
+            '"recommended_order": 100}]'
+        )
 
+    async def _complete(self, prompt: str) -> Optional[str]:
         payload = {
             "modelUri": self.model,
             "completionOptions": {
@@ -59,52 +175,130 @@ class YandexGPTClient:
             ],
         }
 
-        with httpx.Client() as client:
-            timeout = httpx.Timeout(10.0, read=30.0)
-            response = client.post(
-                self.url, headers=headers, json=payload, timeout=timeout
+        response = await self._post(payload)
+        result = response.get("result") if isinstance(response, dict) else None
+        if not isinstance(result, dict):
+            raise AIServiceError(f"YandexGPT returned no result: {str(response)[:200]}")
+        alternatives = result.get("alternatives")
+        if not alternatives:
+            return None
+        first = alternatives[0]
+        message = first.get("message") if isinstance(first, dict) else None
+        if not isinstance(message, dict):
+            raise AIServiceError(
+                f"YandexGPT returned a malformed alternative: {str(alternatives)[:200]}"
             )
-            response.raise_for_status()
-            response = json.loads(response.text)
-            result_text = response.get("result", None).get("alternatives", None)
-            if result_text:
-                result_text = result_text[0].get("message", None).get("text", None)
-            return result_text
-
-    def get_prediction(self, inventory_data, historical_data, period_days=7):
+        return message.get("text")
+
+    async def send_to_ai(self, inventory_data, historical_data):
+        """Один запрос по всем товарам (без нарезки на куски)"""
+        logging.debug(f"INV DATA: {inventory_data}")
+        logging.debug(f"HIS DATA: {historical_data}")
+        table = encode_table(product_rows(inventory_data, historical_data))
+        return await self._complete(self.build_prompt(table))
+
+    async def _predict_chunk(self, rows: List[List]) -> Tuple[Dict, Dict]:
+        """Предсказания по куску: (product_id -> предсказание, product_id -> ошибка)"""
+        product_ids = {row[0] for row in rows}
+        try:
+            text = await self._complete(self.build_prompt(encode_table(rows)))
+        except (AIServiceError, CircuitOpenError) as e:
+            return {}, {product_id: str(e) for product_id in product_ids}
+
+        predictions = {}
+        for item in self.safe_parse_json(text) or []:
+            if not isinstance(item, dict) or item.get("product_id") not in product_ids:
+                continue
+            try:
+                predictions[item["product_id"]] = {
+                    **item,
+                    "days_until_stockout": int(item["days_until_stockout"]),
+                    "recommended_order": int(item["recommended_order"]),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+        failed = {
+            product_id: MISSING_PREDICTION
+            for product_id in product_ids
+            if product_id not in predictions
+        }
+        return predictions, failed
+
+    async def predict_products(
+        self, inventory_data, historical_data
+    ) -> Tuple[List[Dict], List[Dict]]:
         """
-        Получает предсказания от YandexGPT на основе данных об остатках.
-        Возвращает чистый список словарей с предсказаниями или None в случае ошибки.
+        Предсказания по всем товарам: компактная таблица режется на куски по
+        бюджету токенов, куски уходят параллельно (число одновременных
+        запросов ограничено семафором клиента). Товары, пропавшие из ответа
+        (например, обрезанного), один раз переспрашиваются. Возвращает
+        (предсказания, [{"product_id", "error"}] для товаров без предсказания).
         """
-        self.period_days = period_days
-        ai_response_text = self.send_to_ai(inventory_data, historical_data)
-        logging.info(f"Raw AI response: {ai_response_text}")
-
-        # Парсим ответ от AI
-        self.last_prediction = self.safe_parse_json(ai_response_text)
-        # Если safe_parse_json вернул None (ошибка парсинга)
-        if self.last_prediction is None:
-            logging.error("Failed to parse AI prediction response.")
-            return None
+        rows = product_rows(inventory_data, historical_data)
+        by_id = {row[0]: row for row in rows}
+        input_budget = settings.PREDICTION_CHUNK_TOKENS - estimate_tokens(
+            self.build_prompt("")
+        )
+        # Запас на неточность оценки и обрамление ответа
+        output_budget = int(self.max_tokens * 0.8)
 
-        # Отфильтровываем лишний элемент с датой, если он есть
-        clean_predictions = [
-            p
-            for p in self.last_prediction
-            if isinstance(p, dict) and "product_id" in p and "days_until_stockout" in p
+        predictions, failed = {}, {}
+        pending = rows
+        for attempt in range(2):
+            chunks = chunk_rows(pending, input_budget, output_budget)
+            logging.info(
+                f"Requesting AI predictions for {len(pending)} products "
+                f"in {len(chunks)} chunks (attempt {attempt + 1})"
+            )
+            results = await asyncio.gather(
+                *(self._predict_chunk(chunk) for chunk in chunks)
+            )
+            for chunk_predictions, chunk_failed in results:
+                predictions.update(chunk_predictions)
+                failed.update(chunk_failed)
+            for product_id in predictions:
+                failed.pop(product_id, None)
+            # Повторяем только то, что не вернулось в ответе: при ошибке сервиса
+            # повторы уже сделал _post
+            pending = [
+                by_id[product_id]
+                for product_id, error in failed.items()
+                if error == MISSING_PREDICTION
+            ]
+            if not pending:
+                break
+
+        return list(predictions.values()), [
+            {"product_id": product_id, "error": error}
+            for product_id, error in failed.items()
         ]
 
-        if not clean_predictions:
-            logging.warning("AI returned valid JSON but no actual prediction data.")
-            return None
-        logging.info(
-            f"Successfully parsed {len(clean_predictions)} predictions from AI."
+    async def get_prediction(self, inventory_data, historical_data, period_days=7):
+        """
+        Получает предсказания от YandexGPT на основе данных об остатках.
+        Возвращает {"period_days", "categories": предсказания, "failed": товары
+        без предсказания с причиной} или None, если не получено ни одного.
+        """
+        self.period_days = period_days
+        predictions, failed = await self.predict_products(
+            inventory_data, historical_data
         )
-        request_data = {
+        self.last_prediction = predictions
+        if failed:
+            logging.warning(
+                f"No AI prediction for {len(failed)} products: "
+                f"{[item['product_id'] for item in failed][:20]}"
+            )
+        if not predictions:
+            logging.error("AI returned no usable predictions.")
+            return None
+
+        logging.info(f"Successfully parsed {len(predictions)} predictions from AI.")
+        return {
             "period_days": self.period_days,
-            "categories": self.last_prediction,
+            "categories": predictions,
+            "failed": failed,
         }
-        return request_data
 
     # def send_to_api(self):
     #
@@ -132,20 +326,20 @@ class YandexGPTClient:
 
             start_index = result_text.find(start_marker)
             if start_index == -1:
-                logging.error("Ответ AI не содержит открывающего маркера ```")
-                return None
-
-            content_start = start_index + len(start_marker)
-            potential_json = result_text[content_start:]
-            end_index = potential_json.find(end_marker)
-
-            if end_index != -1:
-                clean_json_str = potential_json[:end_index].strip()
+                # Промпт просит JSON без markdown — разбираем ответ целиком
+                clean_json_str = result_text.strip()
             else:
-                logging.warning(
-                    "Закрывающий маркер ``` не найден. Ответ от AI, вероятно, обрезан."
-                )
-                clean_json_str = potential_json.strip()
+                content_start = start_index + len(start_marker)
+                potential_json = result_text[content_start:]
+                end_index = potential_json.find(end_marker)
+
+                if end_index != -1:
+                    clean_json_str = potential_json[:end_index].strip()
+                else:
+                    logging.warning(
+                        "Закрывающий маркер ``` не найден. Ответ от AI, вероятно, обрезан."
+                    )
+                    clean_json_str = potential_json.strip()
 
             # Шаг 2: Пытаемся распарсить полный JSON
             try:
@@ -215,4 +409,14 @@ class YandexGPTClient:
             return None
 
 
+def _retry_after(error) -> Optional[float]:
+    """Retry-After из ответа 429/503 в секундах, если сервис его прислал"""
+    if not isinstance(error, httpx.Response):
+        return None
+    try:
+        return float(error.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
 yandex_client = YandexGPTClient()
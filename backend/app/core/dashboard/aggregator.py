@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Dict, List, Tuple
+
+from app.core.events import event_bus, DASHBOARD_CHANGED, INVENTORY_INGESTED
+from app.db.DataBaseManager import db
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз перечитать БД, если во время чтения пришли новые данные
+RECONCILE_ATTEMPTS = 3
+
+
+def _local(moment: datetime) -> datetime:
+    # naive datetime (CSV-импорт) считаем локальным, как и "сегодня"
+    # в get_dashboard_data; aware и naive даты после этого сравнимы
+    return moment.astimezone()
+
+
+class DashboardAggregator:
+    """
+    Инкрементально поддерживаемое состояние дашборда.
+
+    Обновляется по событию INVENTORY_INGESTED после каждой записи данных
+    инвентаризации и периодически сверяется с БД; после каждого изменения
+    публикует DASHBOARD_CHANGED.
+    Чтение снимка не зависит от объема истории: счетчики за день,
+    кольцевой буфер последних сканирований и таблица роботов с
+    накопленной суммой заряда хранятся в памяти.
+    """
+
+    def __init__(self, recent_limit: int = 20, reconcile_interval: float = 60.0):
+        self.recent_limit = recent_limit
+        self.reconcile_interval = reconcile_interval
+        self.version = 0
+        # Меняется при каждой пересборке снимка (новые данные или смена дня)
+        self.snapshot_version = 0
+        self.ready = False
+
+        self._day_counters: Dict[date, Dict[str, int]] = defaultdict(
+            lambda: {"scanned": 0, "critical": 0}
+        )
+        self._recent_scans: List[Dict] = []
+        self._robots: Dict[str, Dict] = {}
+        self._active_count = 0
+        # Средний заряд — только по активным роботам с известным зарядом,
+        # как AVG в robot_statistics_query
+        self._active_battery_count = 0
+        self._active_battery_sum = 0
+
+        self._snapshot = None
+        self._snapshot_key = None
+        self._reconcile_task: asyncio.Task | None = None
+        # Кластер процессов (app.api.v1.dashboard.cluster): периодическую
+        # сверку с БД делает только лидер, ведомые получают его состояние
+        self.cluster = None
+        self._reconcile_lock = asyncio.Lock()
+
+    # --- Роботы и накопленная статистика заряда ---
+
+    def _robot_contribution(self, robot: Dict):
+        """(активен, учтен в среднем заряде, заряд) — как FILTER и AVG в SQL"""
+        if robot["status"] != "active":
+            return 0, 0, 0
+        if robot["battery_level"] is None:
+            return 1, 0, 0
+        return 1, 1, robot["battery_level"]
+
+    def _count_robot(self, robot: Dict, sign: int):
+        active, counted, battery = self._robot_contribution(robot)
+        self._active_count += sign * active
+        self._active_battery_count += sign * counted
+        self._active_battery_sum += sign * battery
+
+    def _upsert_robot(self, robot: Dict):
+        old = self._robots.get(robot["id"])
+        if old is not None:
+            self._count_robot(old, -1)
+            # Как и upsert в БД: пустая позиция не затирает прошлую
+            robot = {
+                **robot,
+                "current_zone": robot["current_zone"]
+                if robot["current_zone"] is not None
+                else old["current_zone"],
+                "current_row": robot["current_row"]
+                if robot["current_row"] is not None
+                else old["current_row"],
+                "current_shelf": robot["current_shelf"]
+                if robot["current_shelf"] is not None
+                else old["current_shelf"],
+            }
+        self._count_robot(robot, 1)
+        self._robots[robot["id"]] = robot
+
+    # --- Обновление по событиям записи ---
+
+    def apply_ingested(self, robots: List[Dict], history_rows: List[Dict]):
+        """Применить только что закоммиченные данные"""
+        for robot in robots:
+            self._upsert_robot(robot)
+
+        new_scans = []
+        for row in history_rows:
+            scanned_at = row.get("scanned_at")
+            if scanned_at is None:
+                continue
+            counters = self._day_counters[_local(scanned_at).date()]
+            counters["scanned"] += 1
+            if row.get("status") == "CRITICAL":
+                counters["critical"] += 1
+            # В последних сканированиях только строки с товаром (как JOIN в БД)
+            if row.get("product_id"):
+                new_scans.append(
+                    {
+                        **row,
+                        "product_name": db.product_registry.get_name(
+                            row["product_id"]
+                        ),
+                    }
+                )
+
+        if new_scans:
+            self._recent_scans = heapq.nlargest(
+                self.recent_limit,
+                chain(self._recent_scans, new_scans),
+                key=lambda scan: _local(scan["scanned_at"]),
+            )
+        self._prune_days()
+        self.version += 1
+        event_bus.publish(DASHBOARD_CHANGED, self.version)
+
+    def _on_ingested(self, payload: Dict):
+        self.apply_ingested(payload["robots"], payload["history_rows"])
+
+    def _prune_days(self):
+        yesterday = date.today() - timedelta(days=1)
+        for day in [day for day in self._day_counters if day < yesterday]:
+            del self._day_counters[day]
+
+    # --- Сверка с БД ---
+
+    def load(self, data: Dict):
+        """Заменить состояние данными get_dashboard_data"""
+        self._robots = {}
+        self._active_count = 0
+        self._active_battery_count = 0
+        self._active_battery_sum = 0
+        for robot in data["robots"]:
+            self._upsert_robot(robot)
+
+        self._day_counters.clear()
+        self._day_counters[date.today()] = {
+            "scanned": data["scanned_today"],
+            "critical": data["critical_stocks"],
+        }
+        self._recent_scans = list(data["recent_scans"])[: self.recent_limit]
+        self.ready = True
+        self.version += 1
+        event_bus.publish(DASHBOARD_CHANGED, self.version)
+
+    async def reconcile(self):
+        """Перечитать состояние из БД и исправить накопленный дрейф"""
+        async with self._reconcile_lock:
+            for _ in range(RECONCILE_ATTEMPTS):
+                version = self.version
+                data = await db.get_dashboard_data()
+                # Событие, примененное во время чтения, может не попасть в
+                # снимок БД: load затер бы его, поэтому читаем заново
+                if self.version == version:
+                    break
+            else:
+                if self.ready:
+                    # Инкрементальное состояние актуальнее снимка, дрейф
+                    # исправит следующая сверка
+                    logger.debug("Dashboard reconciliation skipped: state changed")
+                    return
+            self.load(data)
+            logger.debug(f"Dashboard state reconciled (version {self.version})")
+
+    async def _run_reconciler(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            if self.cluster is not None and not self.cluster.is_leader:
+                continue
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling dashboard state: {e}")
+
+    async def start(self):
+        """Подписаться на запись данных, загрузить состояние и запустить сверку"""
+        event_bus.subscribe(INVENTORY_INGESTED, self._on_ingested)
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logger.error(f"Initial dashboard reconciliation failed: {e}")
+        self._reconcile_task = asyncio.create_task(self._run_reconciler())
+
+    async def stop(self):
+        event_bus.unsubscribe(INVENTORY_INGESTED, self._on_ingested)
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+
+    # --- Чтение ---
+
+    def snapshot(self) -> Dict:
+        """Текущее состояние в формате get_current_state (кэшируется по версии и дате)"""
+        today_date = date.today()
+        if self._snapshot_key != (self.version, today_date):
+            today = self._day_counters.get(today_date, {"scanned": 0, "critical": 0})
+            self._snapshot = db.format_dashboard_state(
+                {
+                    "active_robots": self._active_count,
+                    "total_robots": len(self._robots),
+                    "scanned_today": today["scanned"],
+                    "critical_stocks": today["critical"],
+                    "average_battery": self._active_battery_sum
+                    / self._active_battery_count
+                    if self._active_battery_count
+                    else 0.0,
+                    "robots": list(self._robots.values()),
+                    "recent_scans": self._recent_scans,
+                }
+            )
+            self._snapshot_key = (self.version, today_date)
+            self.snapshot_version += 1
+        return self._snapshot
+
+    async def get_state(self) -> Dict:
+        if not self.ready:
+            await self.reconcile()
+        return self.snapshot()
+
+    async def get_versioned_state(self) -> Tuple[int, Dict]:
+        """Снимок и его версия (согласованная пара, без await между ними)"""
+        state = await self.get_state()
+        return self.snapshot_version, state
+
+
+dashboard_state = DashboardAggregator(
+    reconcile_interval=settings.DASHBOARD_RECONCILE_INTERVAL
+)
@@ -0,0 +1,46 @@
+from typing import Dict, Optional
+
+
+def diff_states(previous: Dict, current: Dict) -> Optional[Dict]:
+    """
+    Разница двух снимков дашборда (формат get_current_state).
+
+    statistics — только изменившиеся счетчики; robots.upsert — новые и
+    изменившиеся роботы, robots.removed — id пропавших; recent_scans.added —
+    сканирования, которых не было в предыдущем снимке (от новых к старым),
+    клиент добавляет их в начало списка и обрезает до recent_scans.limit;
+    recent_scans.replace — новый список целиком, если он не сводится к
+    добавлению. None, если снимки совпадают.
+    """
+    delta = {}
+
+    statistics = {
+        key: value
+        for key, value in current["statistics"].items()
+        if previous["statistics"].get(key) != value
+    }
+    if statistics:
+        delta["statistics"] = statistics
+
+    previous_robots = {robot["id"]: robot for robot in previous["robots"]}
+    current_ids = {robot["id"] for robot in current["robots"]}
+    upsert = [
+        robot for robot in current["robots"] if previous_robots.get(robot["id"]) != robot
+    ]
+    removed = [robot_id for robot_id in previous_robots if robot_id not in current_ids]
+    if upsert or removed:
+        delta["robots"] = {"upsert": upsert, "removed": removed}
+
+    previous_scans = previous["recent_scans"]
+    current_scans = current["recent_scans"]
+    if current_scans != previous_scans:
+        known = {scan["id"] for scan in previous_scans}
+        added = [scan for scan in current_scans if scan["id"] not in known]
+        limit = len(current_scans)
+        if added + previous_scans[: limit - len(added)] == current_scans:
+            delta["recent_scans"] = {"added": added, "limit": limit}
+        else:
+            # Список перестроен (например, после сверки с БД) — отдаем целиком
+            delta["recent_scans"] = {"replace": current_scans}
+
+    return delta or None
@@ -0,0 +1,179 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+Topic = Tuple[str, str]
+
+# Общие счетчики: отдельный топик, чтобы их изменения тоже шли через индекс
+STATISTICS_TOPIC: Topic = ("statistics", "all")
+# Любое изменение роботов: подписки без фильтра по зонам и роботам видят
+# всех роботов и должны получать их изменения
+ROBOTS_TOPIC: Topic = ("robots", "all")
+
+
+def _names(values) -> frozenset:
+    if values is None:
+        return frozenset()
+    if isinstance(values, str):
+        values = [values]
+    if not isinstance(values, (list, tuple)):
+        raise ValueError(f"Expected a list of names, got {values!r}")
+    return frozenset(str(value) for value in values)
+
+
+class Subscription:
+    """
+    Подписка WebSocket-клиента на часть дашборда.
+
+    zones и robots отбирают роботов и сканирования (достаточно совпасть
+    по одному из них), statuses дополнительно ограничивает сканирования
+    (например, только CRITICAL). statistics=False отключает общие
+    счетчики в дельтах. Пустая подписка означает весь дашборд.
+    """
+
+    __slots__ = ("zones", "robots", "statuses", "statistics")
+
+    def __init__(self, zones=(), robots=(), statuses=(), statistics: bool = True):
+        self.zones = _names(zones)
+        self.robots = _names(robots)
+        self.statuses = frozenset(status.upper() for status in _names(statuses))
+        self.statistics = bool(statistics)
+
+    @classmethod
+    def from_message(cls, message: Dict) -> "Subscription":
+        """Из сообщения {"type": "subscribe", "zones": [...], ...}. ValueError при ошибке"""
+        return cls(
+            zones=message.get("zones"),
+            robots=message.get("robots"),
+            statuses=message.get("statuses"),
+            statistics=message.get("statistics", True),
+        )
+
+    @property
+    def key(self):
+        return (self.zones, self.robots, self.statuses, self.statistics)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.zones or self.robots or self.statuses)
+
+    def topics(self) -> Set[Topic]:
+        topics = (
+            {("zone", zone) for zone in self.zones}
+            | {("robot", robot_id) for robot_id in self.robots}
+            | {("status", status) for status in self.statuses}
+        )
+        if not (self.zones or self.robots):
+            topics.add(ROBOTS_TOPIC)
+        if self.statistics:
+            topics.add(STATISTICS_TOPIC)
+        return topics
+
+    def as_dict(self) -> Dict:
+        return {
+            "zones": sorted(self.zones),
+            "robots": sorted(self.robots),
+            "statuses": sorted(self.statuses),
+            "statistics": self.statistics,
+        }
+
+    def _located(self, zone, robot_id) -> bool:
+        if not (self.zones or self.robots):
+            return True
+        return zone in self.zones or robot_id in self.robots
+
+    def matches_robot(self, robot: Dict) -> bool:
+        return self._located(robot.get("current_zone"), robot.get("id"))
+
+    def matches_scan(self, scan: Dict) -> bool:
+        if self.statuses and scan.get("status") not in self.statuses:
+            return False
+        return self._located(scan.get("zone"), scan.get("robot_id"))
+
+
+def robot_topics(robot: Dict) -> Set[Topic]:
+    return {("zone", robot.get("current_zone")), ("robot", robot.get("id"))}
+
+
+def scan_topics(scan: Dict) -> Set[Topic]:
+    return {
+        ("zone", scan.get("zone")),
+        ("robot", scan.get("robot_id")),
+        ("status", scan.get("status")),
+    }
+
+
+def delta_topics(delta: Dict, previous_zones: Optional[Dict] = None) -> Set[Topic]:
+    """
+    Топики, которые затрагивает дельта diff_states. previous_zones
+    (id робота -> зона в прошлом снимке) добавляет зоны, которые роботы
+    покинули: их подписчикам нужно убрать робота.
+    """
+    previous_zones = previous_zones or {}
+    topics = {STATISTICS_TOPIC} if "statistics" in delta else set()
+    robots = delta.get("robots", {})
+    if robots.get("upsert") or robots.get("removed"):
+        topics.add(ROBOTS_TOPIC)
+    for robot in robots.get("upsert", []):
+        topics |= robot_topics(robot)
+        if robot["id"] in previous_zones:
+            topics.add(("zone", previous_zones[robot["id"]]))
+    topics |= {("robot", robot_id) for robot_id in robots.get("removed", [])}
+    scans = delta.get("recent_scans", {})
+    for scan in scans.get("added", scans.get("replace", [])):
+        topics |= scan_topics(scan)
+    return topics
+
+
+def _filter_scans(scans: Iterable[Dict], subscription: Subscription) -> List[Dict]:
+    return [scan for scan in scans if subscription.matches_scan(scan)]
+
+
+def filter_state(state: Dict, subscription: Subscription) -> Dict:
+    """Снимок дашборда, урезанный до подписки (счетчики остаются общими)"""
+    return {
+        "statistics": state["statistics"],
+        "robots": [
+            robot for robot in state["robots"] if subscription.matches_robot(robot)
+        ],
+        "recent_scans": _filter_scans(state["recent_scans"], subscription),
+    }
+
+
+def filter_delta(
+    delta: Dict, subscription: Subscription, previous_zones: Optional[Dict] = None
+) -> Optional[Dict]:
+    """
+    Дельта, урезанная до подписки. Робот, ушедший из зоны подписки
+    (по previous_zones), попадает подписчику в removed. None, если
+    подписчика дельта не касается.
+    """
+    previous_zones = previous_zones or {}
+    filtered = {}
+    if subscription.statistics and "statistics" in delta:
+        filtered["statistics"] = delta["statistics"]
+
+    if "robots" in delta:
+        upsert = []
+        # Зона удаленного робота неизвестна — id передаем всем, это дешево
+        removed = list(delta["robots"]["removed"])
+        for robot in delta["robots"]["upsert"]:
+            if subscription.matches_robot(robot):
+                upsert.append(robot)
+            elif robot["id"] in previous_zones and subscription.matches_robot(
+                {"id": robot["id"], "current_zone": previous_zones[robot["id"]]}
+            ):
+                removed.append(robot["id"])
+        if upsert or removed:
+            filtered["robots"] = {"upsert": upsert, "removed": removed}
+
+    scans = delta.get("recent_scans")
+    if scans is not None:
+        if "replace" in scans:
+            filtered["recent_scans"] = {
+                "replace": _filter_scans(scans["replace"], subscription)
+            }
+        else:
+            added = _filter_scans(scans["added"], subscription)
+            if added:
+                filtered["recent_scans"] = {"added": added, "limit": scans["limit"]}
+
+    return filtered or None
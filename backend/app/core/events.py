@@ -0,0 +1,40 @@
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Закоммичены данные инвентаризации: {"robots": [...], "history_rows": [...]}
+INVENTORY_INGESTED = "inventory.ingested"
+# Состояние дашборда в памяти изменилось (после ingest или сверки с БД)
+DASHBOARD_CHANGED = "dashboard.changed"
+
+
+class EventBus:
+    """
+    Внутренняя шина событий процесса. Подписчики — синхронные функции,
+    вызываются в event loop сразу при публикации; долгую работу они
+    должны откладывать сами (например, выставлять asyncio.Event).
+    Ошибка подписчика логируется и не мешает остальным.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+
+    def subscribe(self, topic: str, callback: Callable[[Any], None]):
+        if callback not in self._subscribers[topic]:
+            self._subscribers[topic].append(callback)
+
+    def unsubscribe(self, topic: str, callback: Callable[[Any], None]):
+        if callback in self._subscribers[topic]:
+            self._subscribers[topic].remove(callback)
+
+    def publish(self, topic: str, payload: Any = None):
+        for callback in list(self._subscribers[topic]):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error(f"Event subscriber {callback} for {topic} failed: {e}")
+
+
+event_bus = EventBus()
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.ingestion.dedup import RecentKeys, report_key
+from app.db.DataBaseManager import db
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueueFull(Exception):
+    """Очередь приема отчетов переполнена — клиент должен повторить позже."""
+
+
+class IngestionBuffer:
+    """
+    Write-behind буфер для отчетов роботов.
+
+    Отчеты принимаются в asyncio-очередь и сбрасываются в БД пачками:
+    по достижении batch_size или по истечении flush_interval секунд
+    с момента первого отчета в пачке. Повторы недавних отчетов (ретраи
+    роботов) отбрасываются до очереди по LRU из dedup_size ключей.
+    """
+
+    def __init__(
+        self,
+        flush_callback: Callable[[List[Dict]], Awaitable[bool]],
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10000,
+        dedup_size: int = 50000,
+    ):
+        self._flush_callback = flush_callback
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._worker: asyncio.Task | None = None
+        self._inflight: asyncio.Task | None = None
+        self._batch: List[Dict] = []
+        self._closing = False
+        self.recent = RecentKeys(dedup_size)
+
+        self.reports_accepted = 0
+        self.reports_rejected = 0
+        self.reports_duplicate = 0
+        self.reports_flushed = 0
+        self.reports_failed = 0
+        self.batches_flushed = 0
+        self.last_batch_size = 0
+        self.last_batch_latency_ms = 0.0
+        self.max_batch_latency_ms = 0.0
+        self._total_batch_latency_ms = 0.0
+
+    async def start(self):
+        """Запустить фоновую задачу сброса очереди"""
+        if self._worker is None or self._worker.done():
+            self._closing = False
+            self._worker = asyncio.create_task(self._run())
+            logger.info(
+                f"Ingestion buffer started (batch_size={self.batch_size}, "
+                f"flush_interval={self.flush_interval}s)"
+            )
+
+    def submit(self, report: Dict) -> bool:
+        """
+        Поставить отчет в очередь. Не ждет записи в БД.
+        Возвращает False для повтора недавнего отчета (он уже принят).
+        Бросает IngestionQueueFull, если очередь заполнена или буфер
+        останавливается.
+        """
+        if self._closing:
+            self.reports_rejected += 1
+            raise IngestionQueueFull("Ingestion buffer is shutting down")
+        key = report_key(report)
+        if key is not None and self.recent.seen(key):
+            self.reports_duplicate += 1
+            return False
+        try:
+            self.queue.put_nowait(report)
+        except asyncio.QueueFull:
+            self.reports_rejected += 1
+            if key is not None:
+                self.recent.discard(key)
+            raise IngestionQueueFull(
+                f"Ingestion queue is full ({self.queue.maxsize} reports)"
+            )
+        self.reports_accepted += 1
+        return True
+
+    async def stop(self):
+        """Остановить прием и сбросить в БД все, что осталось в очереди"""
+        self._closing = True
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+
+        # Пачка, собранная до отмены воркера, плюс остаток очереди
+        pending = self._batch
+        self._batch = []
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        for i in range(0, len(pending), self.batch_size):
+            await self._flush_batch(pending[i : i + self.batch_size])
+        logger.info(f"Ingestion buffer stopped, flushed {len(pending)} pending reports")
+
+    async def _run(self):
+        while True:
+            await self._collect_batch()
+            batch = self._batch
+            self._batch = []
+            # shield: отмена воркера при остановке не должна обрывать запись пачки
+            self._inflight = asyncio.ensure_future(self._flush_batch(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def _collect_batch(self):
+        self._batch.append(await self.queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _flush_batch(self, batch: List[Dict]):
+        if not batch:
+            return
+        started = time.perf_counter()
+        ok = await self._safe_flush(batch)
+        if not ok and len(batch) > 1:
+            # Изолируем битые отчеты, чтобы не потерять всю пачку
+            logger.warning(
+                f"Batch of {len(batch)} reports failed, retrying one by one"
+            )
+            failed = 0
+            for report in batch:
+                if not await self._safe_flush([report]):
+                    self._forget(report)
+                    failed += 1
+            self.reports_failed += failed
+            self.reports_flushed += len(batch) - failed
+        elif not ok:
+            self._forget(batch[0])
+            self.reports_failed += 1
+        else:
+            self.reports_flushed += len(batch)
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.batches_flushed += 1
+        self.last_batch_size = len(batch)
+        self.last_batch_latency_ms = latency_ms
+        self.max_batch_latency_ms = max(self.max_batch_latency_ms, latency_ms)
+        self._total_batch_latency_ms += latency_ms
+
+    def _forget(self, report: Dict):
+        # Незаписанный отчет робот повторит — повтор не должен считаться дублем
+        key = report_key(report)
+        if key is not None:
+            self.recent.discard(key)
+
+    async def _safe_flush(self, batch: List[Dict]) -> bool:
+        try:
+            return bool(await self._flush_callback(batch))
+        except Exception as e:
+            logger.error(f"Error flushing ingestion batch: {e}")
+            return False
+
+    def get_stats(self) -> Dict:
+        """Счетчики очереди и задержки сброса пачек"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "reports_accepted": self.reports_accepted,
+            "reports_rejected": self.reports_rejected,
+            "reports_duplicate": self.reports_duplicate,
+            "reports_flushed": self.reports_flushed,
+            "reports_failed": self.reports_failed,
+            "batches_flushed": self.batches_flushed,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_latency_ms": round(self.last_batch_latency_ms, 2),
+            "avg_batch_latency_ms": round(
+                self._total_batch_latency_ms / self.batches_flushed, 2
+            )
+            if self.batches_flushed
+            else 0.0,
+            "max_batch_latency_ms": round(self.max_batch_latency_ms, 2),
+        }
+
+
+ingestion_buffer = IngestionBuffer(
+    db.add_robot_data_batch,
+    batch_size=settings.INGEST_BATCH_SIZE,
+    flush_interval=settings.INGEST_FLUSH_INTERVAL,
+    max_queue_size=settings.INGEST_QUEUE_MAXSIZE,
+    dedup_size=settings.INGEST_DEDUP_SIZE,
+)
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+def report_key(report: Dict) -> Optional[Hashable]:
+    """
+    Ключ повтора отчета робота: request_id, если робот его прислал, иначе
+    (robot_id, timestamp, товары). Без timestamp время сканирования
+    назначает сервер, и повтор не отличить от нового отчета — None.
+    """
+    robot_id = report.get("robot_id")
+    if report.get("request_id"):
+        return ("request", robot_id, str(report["request_id"]))
+    timestamp = report.get("timestamp")
+    if not timestamp:
+        return None
+    products = tuple(
+        sorted(str(scan.get("product_id")) for scan in report.get("scan_results", []))
+    )
+    return ("scan", robot_id, timestamp, products)
+
+
+class RecentKeys:
+    """
+    LRU недавних ключей отчетов. Отсекает повторы без запроса к БД в
+    пределах процесса; между процессами и после вытеснения дубли отсекает
+    уникальный индекс inventory_history (миграция 0006).
+    """
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._keys: OrderedDict = OrderedDict()
+
+    def seen(self, key: Hashable) -> bool:
+        """Был ли ключ недавно; если нет — запомнить его"""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        if self.maxsize <= 0:
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+        return False
+
+    def discard(self, key: Hashable):
+        """Забыть ключ — отчет не записался, повтор нужно принять"""
+        self._keys.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._keys)
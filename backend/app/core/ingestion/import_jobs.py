@@ -0,0 +1,180 @@
+"""
+Фоновые задачи импорта CSV.
+
+Загрузка копируется во временный файл и сразу получает job_id, а импорт
+(db.import_inventory_stream: разбор кусков в потоке, коммит каждого куска)
+идет в фоне. Состояние задачи после каждого куска пишется в Redis, чтобы
+GET /api/inventory/import/{job_id} мог ответить любой воркер; без Redis
+состояние хранится в памяти процесса.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import orjson
+
+from app.db.DataBaseManager import db as default_db
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Завершенная задача получает status результата импорта:
+# success, partial_success или error
+QUEUED = "queued"
+RUNNING = "running"
+
+# Сколько ошибок по строкам показывать в состоянии задачи
+ERROR_SAMPLES = 20
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ImportJobs:
+    """Очередь фоновых импортов и их состояние"""
+
+    def __init__(self, prefix: str, ttl: int = 86400, max_jobs: int = 2, db=None):
+        self.key_prefix = f"{prefix}:import:job:"
+        self.ttl = ttl
+        self.db = db or default_db
+        self.redis = None
+        self._local: Dict[str, Dict] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Одновременно идет не больше max_jobs импортов, остальные ждут
+        self._slots = asyncio.Semaphore(max_jobs)
+
+    # --- Хранение состояния ---
+
+    async def start(self, redis):
+        self.redis = redis
+
+    async def _save(self, state: Dict):
+        self._local[state["job_id"]] = state
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(
+                self.key_prefix + state["job_id"], orjson.dumps(state), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store import job {state['job_id']}: {e}")
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Состояние задачи (из Redis, если он есть) или None"""
+        if self.redis is not None:
+            try:
+                stored = await self.redis.get(self.key_prefix + job_id)
+                if stored is not None:
+                    return orjson.loads(stored)
+            except Exception as e:
+                logger.warning(f"Failed to read import job {job_id}: {e}")
+        return self._local.get(job_id)
+
+    # --- Запуск ---
+
+    async def submit(self, upload, filename: str, dialect=None) -> Dict:
+        """
+        Копирует загруженный файл во временный (UploadFile закрывается
+        вместе с запросом) и ставит импорт в очередь.
+        """
+        with tempfile.NamedTemporaryFile(
+            prefix="inventory-import-", suffix=".csv", delete=False
+        ) as spool:
+            await asyncio.to_thread(shutil.copyfileobj, upload, spool)
+            path = spool.name
+
+        state = {
+            "job_id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "filename": filename,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "records_processed": 0,
+            "total_records": 0,
+            "errors_count": 0,
+            "rows_per_sec": 0.0,
+            "error_samples": [],
+            "error": None,
+        }
+        await self._save(state)
+        task = asyncio.create_task(self._run(state, path, dialect))
+        self._tasks[state["job_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(state["job_id"], None))
+        return state
+
+    async def _run(self, state: Dict, path: str, dialect):
+        try:
+            async with self._slots:
+                state.update(status=RUNNING, started_at=_now())
+                await self._save(state)
+                started = time.perf_counter()
+
+                async def on_progress(progress: Dict):
+                    self._apply(state, progress, started)
+                    state["status"] = RUNNING
+                    await self._save(state)
+
+                with open(path, "rb") as source:
+                    result = await self.db.import_inventory_stream(
+                        source, dialect=dialect, on_progress=on_progress
+                    )
+                self._apply(state, result, started)
+                state.update(status=result["status"], error=result.get("error"))
+        except asyncio.CancelledError:
+            state.update(status="error", error="Import interrupted by shutdown")
+            raise
+        except UnicodeDecodeError:
+            state.update(
+                status="error",
+                error="File encoding error. Please use UTF-8 encoded CSV file.",
+            )
+        except Exception as e:
+            logger.error(f"Import job {state['job_id']} failed: {e}")
+            state.update(status="error", error=str(e))
+        finally:
+            state["finished_at"] = _now()
+            # При отмене состояние все равно должно попасть в Redis
+            await asyncio.shield(self._save(state))
+            if self.redis is not None:
+                # В памяти держим только незавершенные задачи
+                self._local.pop(state["job_id"], None)
+            os.unlink(path)
+            logger.info(
+                f"Import job {state['job_id']} finished with {state['status']}: "
+                f"{state['records_processed']} of {state['total_records']} rows"
+            )
+
+    @staticmethod
+    def _apply(state: Dict, progress: Dict, started: float):
+        elapsed = time.perf_counter() - started
+        for key in ("records_processed", "total_records", "errors_count"):
+            state[key] = progress.get(key, state[key])
+        state["error_samples"] = (progress.get("error_details") or [])[:ERROR_SAMPLES]
+        state["rows_per_sec"] = (
+            round(state["total_records"] / elapsed, 1) if elapsed > 0 else 0.0
+        )
+
+    async def stop(self):
+        """Прервать незавершенные импорты (закоммиченные куски остаются)"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        return {"active": len(self._tasks), "redis": self.redis is not None}
+
+
+import_jobs = ImportJobs(
+    prefix=settings.REDIS_PREFIX,
+    ttl=settings.IMPORT_JOB_TTL,
+    max_jobs=settings.IMPORT_MAX_JOBS,
+)
@@ -1,8 +1,17 @@
 from collections import defaultdict
-from app.db.models import User, Robot, Product, InventoryHistory, AIPrediction
+from app.db.models import (
+    User,
+    Robot,
+    Product,
+    InventoryHistory,
+    AIPrediction,
+    CurrentAIPrediction,
+)
 from app.db.base import Base
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy import create_engine, func, desc, select
+from sqlalchemy import create_engine, func, desc, select, tuple_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import asyncio
 import logging
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta, timezone
@@ -17,6 +26,29 @@ from app.api.v1.schemas import (
 )
 from settings import settings
 from app.core.security import hash_password
+from app.db.product_registry import ProductRegistry
+from app.db.statistics import dashboard_statistics_query, robot_statistics_query
+from app.db.pagination import encode_cursor, decode_cursor
+from app.db.migrations import upgrade_schema
+from app.core.events import event_bus, INVENTORY_INGESTED
+from app.core.ai.forecaster import HISTORY_COLUMNS, PRODUCT_COLUMNS
+from app.db.bulk_import import (
+    DIALECTS,
+    MAX_ERROR_DETAILS,
+    REQUIRED_COLUMNS,
+    CsvDialect,
+    allocate_history_ids,
+    copy_history_rows,
+    derive_status,
+    distinct_products,
+    ingested_rows,
+    insert_products,
+    normalize_inventory_frame,
+    product_stock_levels,
+)
+
+# Предел bind-параметров одного запроса (asyncpg/протокол PostgreSQL: int16)
+MAX_QUERY_PARAMS = 32767
 
 
 class DataBaseManager:
@@ -31,10 +63,32 @@ class DataBaseManager:
         self.Product = Product
         self.InventoryHistory = InventoryHistory
         self.AIPrediction = AIPrediction
+        self.CurrentAIPrediction = CurrentAIPrediction
+        self.product_registry = ProductRegistry()
 
     async def create_tables(self):
+        """Применяет миграции alembic (backend/migrations) вместо create_all"""
         async with self.engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_schema)
+
+    def _notify_ingested(self, robots: List[Dict], history_rows: List[Dict]):
+        """Публикует закоммиченные данные инвентаризации в шину событий"""
+        event_bus.publish(
+            INVENTORY_INGESTED, {"robots": robots, "history_rows": history_rows}
+        )
+
+    @staticmethod
+    def _history_to_dict(inv_his):
+        return {
+            "id": inv_his.id,
+            "robot_id": inv_his.robot_id,
+            "product_id": inv_his.product_id,
+            "quantity": inv_his.quantity,
+            "zone": inv_his.zone,
+            "shelf_number": inv_his.shelf_number,
+            "status": inv_his.status,
+            "scanned_at": inv_his.scanned_at,
+        }
 
     async def init_default_user(self):
         """
@@ -259,6 +313,7 @@ class DataBaseManager:
             _s.add(new_product)
             try:
                 await _s.commit()
+                self.product_registry.put(new_product.id, new_product.name)
                 return id if id else new_id  # Возвращаем сгенерированный ID
             except IntegrityError:
                 await _s.rollback()
@@ -312,6 +367,7 @@ class DataBaseManager:
             try:
                 await _s.commit()
                 await _s.refresh(product)  # Обновляем объект из БД
+                self.product_registry.put(product.id, product.name)
                 logging.info(f"Successfully updated product with id {product_id}")
 
                 # Возвращаем объект ProductResponse
@@ -344,6 +400,7 @@ class DataBaseManager:
             await _s.delete(product)
             try:
                 await _s.commit()
+                self.product_registry.discard(product_id)
                 logging.info(f"Successfully deleted product with id {product_id}")
                 return True
             except IntegrityError:
@@ -353,6 +410,72 @@ class DataBaseManager:
                 )
                 return False
 
+    async def warm_product_registry(self):
+        """Загружает справочник товаров (id, name) в процессный кэш"""
+        async with self.DBSession() as _s:
+            result = await _s.execute(select(self.Product.id, self.Product.name))
+            self.product_registry.warm(result.all())
+        logging.info(f"Product registry warmed with {len(self.product_registry)} products")
+
+    async def _insert_new_products(
+        self,
+        _s,
+        products: Dict[str, str],
+        rename: bool = True,
+        category=None,
+        min_stock: int = 10,
+        optimal_stock: int = 100,
+    ):
+        """
+        Добавляет в сессию только неизвестные кэшу товары одним
+        INSERT ... ON CONFLICT DO NOTHING. Если rename=True, товары со
+        сменившимся названием обновляются одним upsert.
+        Возвращает словарь товаров для записи в кэш после коммита: названия
+        из БД (RETURNING), а не из отчета.
+        """
+        if not self.product_registry.warmed:
+            await self.warm_product_registry()
+
+        new_products, renamed_products = self.product_registry.split(products)
+        # unnest вместо VALUES: размер импорта не упирается в лимит параметров
+        known_products = await insert_products(
+            _s, new_products, category, min_stock, optimal_stock
+        )
+        existing = [
+            product_id
+            for product_id in new_products
+            if product_id not in known_products
+        ]
+        if existing:
+            # Товар уже записан другим процессом: кэшируем его название в БД
+            result = await _s.execute(
+                select(self.Product.id, self.Product.name).where(
+                    self.Product.id.in_(existing)
+                )
+            )
+            known_products.update(result.all())
+
+        if rename and renamed_products:
+            stmt = pg_insert(self.Product).values(
+                [
+                    {"id": product_id, "name": product_name}
+                    for product_id, product_name in renamed_products.items()
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[self.Product.id],
+                set_={"name": stmt.excluded.name},
+            ).returning(self.Product.id, self.Product.name)
+            result = await _s.execute(stmt)
+            known_products.update(result.all())
+        return known_products
+
+    def _remember_products(self, products: Dict[str, str]):
+        for product_id, product_name in products.items():
+            # Пустое название в кэше split принял бы за неизвестный товар
+            if product_name is not None:
+                self.product_registry.put(product_id, product_name)
+
     # Методы Robot
     async def get_robot(self, robot_id: str):
         async with self.DBSession() as _s:
@@ -542,147 +665,213 @@ class DataBaseManager:
                 return False
 
     # Работа робота
-    async def add_robot_data(self, robot_data):
-        async with self.DBSession() as _s:
-            robot_id = robot_data.get("robot_id", None)
-            battery_level = robot_data.get("battery_level", None)
-            timestamp_str = robot_data.get("timestamp", None)
-
-            # --- ГАРАНТИРОВАННОЕ СОЗДАНИЕ DATETIME С ZONE ---
-            # Создаем scanned_at, гарантированно с временной зоной UTC
-            if timestamp_str:
-                try:
-                    scanned_at = datetime.fromisoformat(
-                        timestamp_str.replace("Z", "+00:00")
-                    )
-                    # Если по какой-то причине tzinfo не применилось, добавляем его принудительно
-                    if scanned_at.tzinfo is None:
-                        scanned_at = scanned_at.replace(tzinfo=timezone.utc)
-                except ValueError:
-                    # Если формат строки неверный, используем текущее время в UTC
-                    scanned_at = datetime.now(timezone.utc)
-            else:
+    @staticmethod
+    def _parse_robot_report(robot_data):
+        """
+        Разбирает отчет робота в строки для таблиц robots, products
+        и inventory_history.
+        """
+        robot_id = robot_data.get("robot_id", None)
+        battery_level = robot_data.get("battery_level", None)
+        timestamp_str = robot_data.get("timestamp", None)
+
+        # Создаем scanned_at, гарантированно с временной зоной UTC
+        if timestamp_str:
+            try:
+                scanned_at = datetime.fromisoformat(
+                    timestamp_str.replace("Z", "+00:00")
+                )
+                if scanned_at.tzinfo is None:
+                    scanned_at = scanned_at.replace(tzinfo=timezone.utc)
+            except ValueError:
                 scanned_at = datetime.now(timezone.utc)
+        else:
+            scanned_at = datetime.now(timezone.utc)
 
-            # Определяем статус на основе уровня батареи
-            robot_status = "active"
-            if battery_level is not None:
-                if battery_level < 20:
-                    robot_status = "low_battery"
-                elif battery_level == 0:
-                    robot_status = "inactive"
+        # Определяем статус на основе уровня батареи
+        robot_status = "active"
+        if battery_level is not None:
+            if battery_level < 20:
+                robot_status = "low_battery"
+            elif battery_level == 0:
+                robot_status = "inactive"
 
-            # Ищем робота в ТЕКУЩЕЙ сессии
-            result = await _s.execute(
-                select(self.Robot).filter(self.Robot.id == robot_id)
+        robot_location = robot_data.get("location", None)
+        zone = robot_location.get("zone", None) if robot_location else None
+        row_number = robot_location.get("row", None) if robot_location else None
+        shelf_number = robot_location.get("shelf", None) if robot_location else None
+
+        now = datetime.now(timezone.utc)
+        robot_row = {
+            "id": robot_id,
+            "status": robot_status,
+            "battery_level": battery_level,
+            "last_update": now,
+            "current_zone": zone,
+            "current_row": row_number,
+            "current_shelf": shelf_number,
+        }
+
+        products = {}
+        history_rows = []
+        for scan_result in robot_data.get("scan_results", []):
+            product_id = scan_result.get("product_id", None)
+            product_name = scan_result.get("product_name", None)
+            if product_id and product_name:
+                products[product_id] = product_name
+
+            history_rows.append(
+                {
+                    "robot_id": robot_id,
+                    "zone": zone,
+                    "row_number": row_number,
+                    "shelf_number": shelf_number,
+                    "product_id": product_id,
+                    "quantity": scan_result.get("quantity", None),
+                    "status": scan_result.get("status", None),
+                    "scanned_at": scanned_at,
+                    "created_at": now,
+                }
             )
-            robot = result.scalar_one_or_none()
+        return robot_row, products, history_rows
 
-            if not robot:
-                # Создаем робота в ТЕКУЩЕЙ сессии
-                new_robot = self.Robot(
-                    id=robot_id,
-                    status=robot_status,
-                    battery_level=battery_level,
-                    last_update=datetime.now(timezone.utc),  # <-- ГАРАНТИЯ UTC
-                )
-                _s.add(new_robot)
-                robot = new_robot
-
-            # Обновляем существующего робота
-            robot.battery_level = battery_level
-            robot.status = robot_status
-            robot.last_update = datetime.now(timezone.utc)  # <-- ГАРАНТИЯ UTC
-
-            # Получаем location
-            robot_location = robot_data.get("location", None)
-            zone = robot_location.get("zone", None) if robot_location else None
-            row_number = robot_location.get("row", None) if robot_location else None
-            shelf_number = robot_location.get("shelf", None) if robot_location else None
-
-            # Обновляем текущую позицию робота
-            if zone is not None:
-                robot.current_zone = zone
-            if row_number is not None:
-                robot.current_row = row_number
-            if shelf_number is not None:
-                robot.current_shelf = shelf_number
-
-            # Обрабатываем scan_results
-            scan_results = robot_data.get("scan_results", [])
-            for scan_result in scan_results:
-                product_id = scan_result.get("product_id", None)
-                product_name = scan_result.get("product_name", None)
-                quantity = scan_result.get("quantity", None)
-                status = scan_result.get("status", None)
-
-                if product_id and product_name:
+    # Естественный ключ сканирования, уникальный индекс из миграции 0006
+    SCAN_KEY = ("robot_id", "scanned_at", "product_id")
+
+    @classmethod
+    def _scan_key(cls, row: Dict) -> tuple:
+        return tuple(row[column] for column in cls.SCAN_KEY)
+
+    async def add_robot_data(self, robot_data):
+        return await self.add_robot_data_batch([robot_data])
+
+    async def add_robot_data_batch(self, reports: List[Dict]):
+        """
+        Записывает пачку отчетов роботов одной транзакцией: один upsert
+        по всем роботам, один upsert по всем товарам и многострочный
+        INSERT в inventory_history.
+        """
+        robots = {}
+        products = {}
+        # Строки по естественному ключу: повтор отчета внутри пачки схлопывается
+        history_rows = {}
+        for robot_data in reports:
+            robot_row, report_products, report_history = self._parse_robot_report(
+                robot_data
+            )
+            # Для робота важен только последний отчет в пачке
+            robots[robot_row["id"]] = robot_row
+            products.update(report_products)
+            for row in report_history:
+                history_rows.setdefault(self._scan_key(row), row)
+
+        async with self.DBSession() as _s:
+            try:
+                if robots:
+                    stmt = pg_insert(self.Robot).values(list(robots.values()))
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[self.Robot.id],
+                        set_={
+                            "status": stmt.excluded.status,
+                            "battery_level": stmt.excluded.battery_level,
+                            "last_update": stmt.excluded.last_update,
+                            "current_zone": func.coalesce(
+                                stmt.excluded.current_zone, self.Robot.current_zone
+                            ),
+                            "current_row": func.coalesce(
+                                stmt.excluded.current_row, self.Robot.current_row
+                            ),
+                            "current_shelf": func.coalesce(
+                                stmt.excluded.current_shelf, self.Robot.current_shelf
+                            ),
+                        },
+                    )
+                    await _s.execute(stmt)
+
+                known_products = await self._insert_new_products(_s, products)
+
+                inserted = []
+                if history_rows:
+                    # Уже записанные сканирования (повтор отчета) пропускаются
+                    # уникальным индексом; RETURNING отдает только новые строки
+                    stmt = pg_insert(self.InventoryHistory).on_conflict_do_nothing(
+                        index_elements=self.SCAN_KEY
+                    )
                     result = await _s.execute(
-                        select(self.Product).filter(self.Product.id == product_id)
+                        stmt.returning(
+                            self.InventoryHistory.id,
+                            *(getattr(self.InventoryHistory, c) for c in self.SCAN_KEY),
+                        ),
+                        list(history_rows.values()),
                     )
-                    product = result.scalar_one_or_none()
-
-                    if not product:
-                        new_product = self.Product(
-                            id=product_id,
-                            name=product_name,
-                            category=None,
-                            min_stock=10,
-                            optimal_stock=100,
-                        )
-                        _s.add(new_product)
-                    else:
-                        if product.name != product_name:
-                            product.name = product_name
-
-                new_inventory_history = self.InventoryHistory(
-                    robot_id=robot_id,
-                    zone=zone,
-                    row_number=row_number,
-                    shelf_number=shelf_number,
-                    product_id=product_id,
-                    quantity=quantity,
-                    status=status,
-                    scanned_at=scanned_at,
-                    created_at=datetime.now(timezone.utc),
-                )
-                _s.add(new_inventory_history)
+                    for row_id, *key in result.all():
+                        row = history_rows[tuple(key)]
+                        row["id"] = row_id
+                        inserted.append(row)
 
-            try:
                 await _s.commit()
-                logging.info(f"Successfully processed robot data for {robot_id}")
+                self._remember_products(known_products)
+                self._notify_ingested(list(robots.values()), inserted)
+                logging.info(
+                    f"Successfully processed {len(reports)} robot reports "
+                    f"({len(inserted)} new scans, "
+                    f"{len(history_rows) - len(inserted)} duplicates) "
+                    f"for {len(robots)} robots"
+                )
                 return True
             except Exception as e:
                 await _s.rollback()
-                logging.error(f"Failed to process robot data for {robot_id}: {str(e)}")
+                if isinstance(e, IntegrityError):
+                    # Товар мог быть удален другим процессом — перечитаем справочник
+                    self.product_registry.invalidate()
+                logging.error(
+                    f"Failed to process batch of {len(reports)} robot reports: {str(e)}"
+                )
                 return False
 
-    async def get_current_state(self):
-        """Получает текущее состояние для dashboard"""
+    @staticmethod
+    def format_robot(robot: Dict) -> Dict:
+        return {
+            "id": robot["id"],
+            "status": robot["status"],
+            "battery_level": robot["battery_level"],
+            "last_update": robot["last_update"].strftime("%H:%M:%S %d.%m.%Y")
+            if robot["last_update"]
+            else None,
+            "current_zone": robot["current_zone"],
+            "current_row": robot["current_row"],
+            "current_shelf": robot["current_shelf"],
+        }
+
+    @staticmethod
+    def format_scan(scan: Dict) -> Dict:
+        return {
+            "id": scan["id"],
+            "robot_id": scan["robot_id"],
+            "product_id": scan["product_id"],
+            "product_name": scan["product_name"],
+            "quantity": scan["quantity"],
+            "zone": scan["zone"],
+            "shelf_number": scan["shelf_number"],
+            "status": scan["status"],
+            "scanned_at": scan["scanned_at"].strftime("%H:%M:%S %d.%m.%Y")
+            if scan["scanned_at"]
+            else None,
+        }
+
+    async def get_dashboard_data(self):
+        """
+        Сырые данные дашборда: счетчики за сегодня, роботы и последние
+        сканирования (даты — объекты datetime).
+        """
         async with self.DBSession() as _s:
-            # Активные роботы
-            active_robots_count, total_robots = await self.get_active_robots()
-            # Средний заряд батареи
-            avg_battery = await self.average_battery_charge() or 0
-
-            # Проверено сегодня
+            # Роботы, средний заряд, проверено сегодня и критические остатки —
+            # одним агрегатным запросом
             today_start = datetime.now().replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
-            result = await _s.execute(
-                select(self.InventoryHistory).filter(
-                    self.InventoryHistory.scanned_at >= today_start
-                )
-            )
-            scanned_today = len(result.scalars().all())
-
-            # Критические остатки
-            result = await _s.execute(
-                select(self.InventoryHistory)
-                .filter(self.InventoryHistory.status == "CRITICAL")
-                .filter(self.InventoryHistory.scanned_at >= today_start)
-            )
-            critical_stocks = len(result.scalars().all())
+            result = await _s.execute(dashboard_statistics_query(today_start))
+            stats = result.one()
 
             # Последние сканирования (20 записей) с JOIN к продуктам
             result = await _s.execute(
@@ -698,21 +887,17 @@ class DataBaseManager:
             robots = result.scalars().all()
 
             return {
-                "statistics": {
-                    "active_robots": active_robots_count,
-                    "total_robots": total_robots,
-                    "scanned_today": scanned_today,
-                    "critical_stocks": critical_stocks,
-                    "average_battery": round(avg_battery, 1),
-                },
+                "active_robots": stats.active_robots,
+                "total_robots": stats.total_robots,
+                "scanned_today": stats.scanned_today,
+                "critical_stocks": stats.critical_stocks,
+                "average_battery": float(stats.average_battery or 0),
                 "robots": [
                     {
                         "id": robot.id,
                         "status": robot.status,
                         "battery_level": robot.battery_level,
-                        "last_update": robot.last_update.strftime("%H:%M:%S %d.%m.%Y")
-                        if robot.last_update
-                        else None,
+                        "last_update": robot.last_update,
                         "current_zone": robot.current_zone,
                         "current_row": robot.current_row,
                         "current_shelf": robot.current_shelf,
@@ -721,301 +906,184 @@ class DataBaseManager:
                 ],
                 "recent_scans": [
                     {
-                        "id": scan.id,
-                        "robot_id": scan.robot_id,
-                        "product_id": scan.product_id,
+                        **self._history_to_dict(scan),
                         "product_name": product_name,  # Добавлено имя продукта
-                        "quantity": scan.quantity,
-                        "zone": scan.zone,
-                        "shelf_number": scan.shelf_number,
-                        "status": scan.status,
-                        "scanned_at": scan.scanned_at.strftime("%H:%M:%S %d.%m.%Y")
-                        if scan.scanned_at
-                        else None,
                     }
                     for scan, product_name in recent_scans  # Распаковываем кортеж
                 ],
             }
 
+    def format_dashboard_state(self, data: Dict) -> Dict:
+        """Формирует ответ дашборда из сырых данных get_dashboard_data"""
+        return {
+            "statistics": {
+                "active_robots": data["active_robots"],
+                "total_robots": data["total_robots"],
+                "scanned_today": data["scanned_today"],
+                "critical_stocks": data["critical_stocks"],
+                "average_battery": round(data["average_battery"], 1),
+            },
+            "robots": [self.format_robot(robot) for robot in data["robots"]],
+            "recent_scans": [self.format_scan(scan) for scan in data["recent_scans"]],
+        }
+
+    async def get_current_state(self):
+        """Получает текущее состояние для dashboard"""
+        return self.format_dashboard_state(await self.get_dashboard_data())
+
     async def process_csv_inventory_import(self, csv_content: str) -> Dict[str, any]:
         """
         Обрабатывает CSV данные для импорта инвентаря
         """
-        try:
-            import pandas as pd
-            import io
-
-            # Парсим CSV
-            df = pd.read_csv(io.StringIO(csv_content), delimiter=";")
-
-            # Проверяем обязательные колонки
-            required_columns = ["product_id", "product_name", "quantity"]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                return {
-                    "status": "error",
-                    "error": f"Missing required columns: {', '.join(missing_columns)}",
-                }
+        return await self.import_inventory_stream(io.StringIO(csv_content))
 
-            records = df.where(pd.notnull(df), None).to_dict("records")
+    async def import_inventory_stream(
+        self,
+        source,
+        chunk_rows: int | None = None,
+        dialect: CsvDialect | None = None,
+        on_progress=None,
+    ) -> Dict[str, any]:
+        """
+        Потоковый импорт CSV из файлового объекта (bytes или str), формат —
+        dialect (по умолчанию DIALECTS["default"]). Файл читается и разбирается кусками по chunk_rows строк в
+        отдельном потоке, каждый кусок сразу коммитится (app/db/bulk_import.py),
+        поэтому в памяти одновременно только один кусок. После каждого коммита
+        вызывается await on_progress(промежуточный результат).
+        Ошибка БД останавливает импорт; уже закоммиченные куски остаются.
+        """
+        chunk_rows = chunk_rows or settings.IMPORT_CHUNK_ROWS
+        dialect = dialect or DIALECTS["default"]
+        progress = {"records_processed": 0, "total_records": 0, "errors_count": 0}
+        errors = []
 
-            success_count = 0
-            error_details = []
+        def summary(result_status: str, **extra) -> Dict[str, any]:
+            processed, total = progress["records_processed"], progress["total_records"]
+            return {
+                "status": result_status,
+                **progress,
+                # Первые MAX_ERROR_DETAILS ошибок; полное число — в errors_count
+                "error_details": errors or None,
+                "message": f"Imported {processed} out of {total} records",
+                **extra,
+            }
 
-            async with self.DBSession() as _s:
-                for i, record in enumerate(records, 1):
+        try:
+            reader = pd.read_csv(
+                source,
+                delimiter=dialect.delimiter,
+                dtype=str,
+                chunksize=chunk_rows,
+                encoding=dialect.encoding,
+            )
+            with reader:
+                while True:
+                    chunk = await asyncio.to_thread(next, reader, None)
+                    if chunk is None:
+                        break
+                    # Проверяем обязательные колонки
+                    missing_columns = [
+                        col for col in REQUIRED_COLUMNS if col not in chunk.columns
+                    ]
+                    if missing_columns:
+                        return {
+                            "status": "error",
+                            "error": "Missing required columns: "
+                            f"{', '.join(missing_columns)}",
+                        }
+
+                    frame, chunk_errors = await asyncio.to_thread(
+                        normalize_inventory_frame,
+                        chunk,
+                        dialect.status,
+                        first_row=progress["total_records"] + 1,
+                        date_formats=dialect.date_formats,
+                    )
                     try:
-                        product_id = record.get("product_id")
-                        product_name = record.get("product_name")
-                        quantity = record.get("quantity")
-                        zone = record.get("zone")
-                        row_number = record.get("row")
-                        shelf_number = record.get("shelf")
-                        scanned_at_str = record.get("date")
-
-                        # Парсим дату
-                        if scanned_at_str:
-                            try:
-                                scanned_at = datetime.fromisoformat(
-                                    scanned_at_str.replace("Z", "+00:00")
-                                )
-                            except ValueError:
-                                scanned_at = datetime.now()
-                        else:
-                            scanned_at = datetime.now()
-
-                        # Проверяем/добавляем продукт
-                        result = await _s.execute(
-                            select(self.Product).filter(self.Product.id == product_id)
-                        )
-                        product = result.scalar_one_or_none()
-                        if not product:
-                            # Создаем продукт напрямую в этой сессии
-                            new_product = self.Product(
-                                id=product_id,
-                                name=product_name,
-                                category=None,
-                                min_stock=10,
-                                optimal_stock=100,
-                            )
-                            _s.add(new_product)
-
-                        # ✅ robot_id оставляем пустым (NULL)
-                        new_inventory = self.InventoryHistory(
-                            robot_id=None,  # Оставляем пустым
-                            zone=zone,
-                            row_number=row_number,
-                            shelf_number=shelf_number,
-                            product_id=product_id,
-                            quantity=quantity,
-                            status="OK",
-                            scanned_at=scanned_at,
-                        )
-                        _s.add(new_inventory)
-                        success_count += 1
-
+                        await self._write_inventory_frame(frame, dialect)
                     except Exception as e:
-                        error_details.append(f"Row {i}: {str(e)}")
-                        logging.error(f"Error processing CSV record {record}: {e}")
-                        continue
-
-                try:
-                    await _s.commit()
-                    logging.info(
-                        f"✅ Successfully imported {success_count} records from CSV"
-                    )
-
-                    return {
-                        "status": "success" if success_count > 0 else "partial_success",
-                        "records_processed": success_count,
-                        "total_records": len(records),
-                        "errors_count": len(error_details),
-                        "error_details": error_details if error_details else None,
-                        "message": f"Imported {success_count} out of {len(records)} records",
-                    }
+                        logging.error(f"❌ Failed to import CSV data: {e}")
+                        return summary(
+                            "error", error=f"Database commit failed: {str(e)}"
+                        )
 
-                except Exception as e:
-                    await _s.rollback()
-                    logging.error(f"❌ Failed to import CSV data: {e}")
-                    return {
-                        "status": "error",
-                        "error": f"Database commit failed: {str(e)}",
-                    }
+                    progress["records_processed"] += len(frame)
+                    progress["total_records"] += len(chunk)
+                    progress["errors_count"] += len(chunk_errors)
+                    errors.extend(chunk_errors[: MAX_ERROR_DETAILS - len(errors)])
+                    if on_progress is not None:
+                        await on_progress(summary("running"))
 
+        except UnicodeDecodeError:
+            raise
+        except pd.errors.EmptyDataError:
+            return {"status": "error", "error": "CSV file is empty"}
         except Exception as e:
             logging.error(f"❌ CSV import error: {e}")
-            return {"status": "error", "error": f"Internal server error: {str(e)}"}
-
-    # Работа с CSV файлом
-    async def process_csv_file(self, file_csv):
-        """Обрабатывает CSV файл и добавляет данные в базу"""
-        try:
-            # Читаем файл
-            contents = file_csv.file.read()
-            csv_text = contents.decode("utf-8")
-
-            # Используем StringIO для pandas
-            df = pd.read_csv(io.StringIO(csv_text), delimiter=";")
+            return summary("error", error=f"Internal server error: {str(e)}")
 
-            # Передаем DataFrame напрямую, а не records
-            return await self.add_robot_data_csv_from_dataframe(df)
-
-        except Exception as e:
-            logging.error(f"Error processing CSV file: {e}")
-            raise
+        if progress["errors_count"]:
+            logging.warning(
+                f"CSV import skipped {progress['errors_count']} invalid rows"
+            )
+        logging.info(
+            f"✅ Successfully imported {progress['records_processed']} records from CSV"
+        )
+        return summary(
+            "success" if progress["records_processed"] > 0 else "partial_success"
+        )
 
-    async def add_robot_data_csv_from_dataframe(self, df):
-        """Добавляет записи из DataFrame в базу данных"""
+    async def _write_inventory_frame(self, frame, dialect: CsvDialect):
+        """
+        Нормализованные строки (normalize_inventory_frame) — в БД одним
+        коммитом: новые товары одним запросом, история через COPY.
+        robot_id у импортированных строк пустой.
+        """
+        if frame.empty:
+            return
         async with self.DBSession() as _s:
-            success_count = 0
-            total_records = len(df)
-            errors = []
-
-            default_status = "NORMAL"
-
-            for index, row in df.iterrows():
-                try:
-                    # Получаем значения из CSV
-                    product_id = (
-                        str(row["product_id"]).strip()
-                        if pd.notna(row.get("product_id"))
-                        else None
-                    )
-                    product_name = (
-                        str(row["product_name"]).strip()
-                        if pd.notna(row.get("product_name"))
-                        else "Unknown Product"
-                    )
-                    zone = (
-                        str(row["zone"]).strip()
-                        if pd.notna(row.get("zone"))
-                        else "UNKNOWN"
-                    )
-
-                    # Обрабатываем числовые поля
-                    try:
-                        quantity = (
-                            int(float(row["quantity"]))
-                            if pd.notna(row.get("quantity"))
-                            else 0
-                        )
-                    except (ValueError, TypeError):
-                        quantity = 0
-
-                    try:
-                        row_number = (
-                            int(float(row["row"])) if pd.notna(row.get("row")) else None
-                        )
-                    except (ValueError, TypeError):
-                        row_number = None
-
-                    try:
-                        shelf_number = (
-                            int(float(row["shelf"]))
-                            if pd.notna(row.get("shelf"))
-                            else None
-                        )
-                    except (ValueError, TypeError):
-                        shelf_number = None
-
-                    # Обрабатываем дату
-                    date_str = row.get("date")
-                    scanned_at = None
-                    if pd.notna(date_str) and date_str:
-                        try:
-                            date_str_clean = str(date_str).strip()
-                            if "T" in date_str_clean:
-                                scanned_at = datetime.fromisoformat(
-                                    date_str_clean.replace("Z", "+00:00")
-                                )
-                            else:
-                                # Пробуем разные форматы даты
-                                try:
-                                    scanned_at = datetime.strptime(
-                                        date_str_clean, "%Y-%m-%d"
-                                    )
-                                except ValueError:
-                                    try:
-                                        scanned_at = datetime.strptime(
-                                            date_str_clean, "%d.%m.%Y"
-                                        )
-                                    except ValueError:
-                                        scanned_at = datetime.now()
-                        except (ValueError, TypeError) as e:
-                            scanned_at = datetime.now()
-                    else:
-                        scanned_at = datetime.now()
-
-                    # Проверяем обязательные поля
-                    if not product_id:
-                        errors.append(f"Row {index + 1}: Missing product_id")
-                        continue
-
-                    # 1. ПРОВЕРЯЕМ/СОЗДАЕМ ПРОДУКТ
-                    result = await _s.execute(
-                        select(self.Product).filter(self.Product.id == product_id)
-                    )
-                    existing_product = result.scalar_one_or_none()
-                    if not existing_product:
-                        # Создаем новый продукт
-                        try:
-                            new_product = self.Product(
-                                id=product_id,
-                                name=product_name,
-                                category="Electronics",  # можно сделать умное определение категории
-                                min_stock=10,
-                                optimal_stock=50,
-                            )
-                            _s.add(new_product)
-                        except Exception as e:
-                            errors.append(
-                                f"Row {index + 1}: Failed to create product {product_id}: {str(e)}"
-                            )
-                            continue
-                    else:
-                        # Обновляем имя продукта если оно изменилось
-                        if existing_product.name != product_name:
-                            existing_product.name = product_name
-
-                    # 2. СОЗДАЕМ ЗАПИСЬ ИНВЕНТАРИЗАЦИИ (robot_id оставляем пустым)
-                    new_inventory_history = self.InventoryHistory(
-                        robot_id=None,  # Оставляем пустым для CSV импорта
-                        zone=zone,
-                        row_number=row_number,
-                        shelf_number=shelf_number,
-                        product_id=product_id,
-                        quantity=quantity,
-                        status=default_status,
-                        scanned_at=scanned_at,
-                    )
-                    _s.add(new_inventory_history)
-                    success_count += 1
-
-                except Exception as e:
-                    error_msg = f"Row {index + 1}: {str(e)}"
-                    errors.append(error_msg)
-                    logging.error(f"Error with row {index}: {e}")
-                    continue
-
             try:
+                products = distinct_products(frame)
+                known_products = await self._insert_new_products(
+                    _s,
+                    products,
+                    rename=False,
+                    category=dialect.category,
+                    min_stock=dialect.min_stock,
+                    optimal_stock=dialect.optimal_stock,
+                )
+                conn = await _s.connection()
+                if dialect.status is None:
+                    levels = await product_stock_levels(conn, list(products))
+                    frame["status"] = derive_status(frame, levels, dialect)
+                ids = await allocate_history_ids(conn, len(frame))
+                await copy_history_rows(conn, frame, ids)
                 await _s.commit()
-                result = {
-                    "status": "success",
-                    "records_processed": success_count,
-                    "total_records": total_records,
-                    "message": f"Successfully imported {success_count} inventory records",
-                }
-                if errors:
-                    result["errors"] = errors
-                return result
-
-            except IntegrityError as e:
+            except Exception:
                 await _s.rollback()
+                raise
 
-    async def add_ai_prediction(self, predictions: List[Dict]):
+        self._remember_products(known_products)
+        yesterday = datetime.now().astimezone().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) - timedelta(days=1)
+        self._notify_ingested([], ingested_rows(frame, ids, since=yesterday))
+
+    # Работа с CSV файлом
+    async def process_csv_file(self, file_csv, dialect: str = "robot_csv"):
+        """Импорт загруженного CSV файла через общий потоковый импорт"""
+        return await self.import_inventory_stream(
+            file_csv.file, dialect=DIALECTS[dialect]
+        )
+
+    async def add_ai_prediction(
+        self, predictions: List[Dict], input_hash: str | None = None
+    ):
         """
         Добавляет предсказания AI в таблицу ai_predictions.
         Если 'created_at' отсутствует, генерирует его автоматически.
+        input_hash — хеш входных данных LLM, по нему пачку находит кеш
+        предсказаний (app/core/ai/prediction_cache.py).
         """
         if not predictions:
             logging.warning("Received empty predictions list, nothing to save.")
@@ -1023,6 +1091,7 @@ class DataBaseManager:
 
         async with self.DBSession() as _s:
             saved_predictions_data = []
+            new_predictions = []
 
             for prediction in predictions:
                 product_id = prediction.get("product_id")
@@ -1047,22 +1116,28 @@ class DataBaseManager:
                     product_id=product_id,
                     days_until_stockout=days_until_stockout,
                     recommended_order=recommended_order,
-                    confidence_score=0.75,
+                    # У локального прогноза своя уверенность, у LLM — 0.75
+                    confidence_score=prediction.get("confidence_score", 0.75),
                     prediction_date=prediction_date,
+                    input_hash=input_hash,
                 )
                 _s.add(new_prediction)
+                new_predictions.append(new_prediction)
 
                 saved_predictions_data.append(
                     {
                         "product_id": product_id,
                         "days_until_stockout": days_until_stockout,
                         "recommended_order": recommended_order,
+                        "confidence_score": new_prediction.confidence_score,
                         "created_at": prediction_date.isoformat(),  # <-- Всегда будет строка
                     }
                 )
                 logging.info(f"Added AI prediction for product {product_id}")
 
             try:
+                await _s.flush()
+                await self._update_current_predictions(_s, new_predictions)
                 await _s.commit()
                 logging.info(f"Successfully added {len(predictions)} AI predictions.")
                 return saved_predictions_data
@@ -1073,6 +1148,127 @@ class DataBaseManager:
                 )
                 return None
 
+    async def _update_current_predictions(self, _s, new_predictions):
+        """
+        Переносит самые свежие из new_predictions в current_ai_predictions.
+        Более старое предсказание не перетирает уже сохраненное новое.
+        Вся пачка получает один updated_at, по нему пачку можно прочитать целиком.
+        Upsert идет кусками, чтобы не превысить MAX_QUERY_PARAMS.
+        """
+        updated_at = datetime.utcnow()
+        latest = {}
+        for prediction in new_predictions:
+            if prediction.product_id is None:
+                continue
+            prediction_date = prediction.prediction_date
+            if isinstance(prediction_date, datetime):
+                prediction_date = prediction_date.date()
+            known = latest.get(prediction.product_id)
+            if known is None or prediction_date >= known["prediction_date"]:
+                latest[prediction.product_id] = {
+                    "product_id": prediction.product_id,
+                    "prediction_id": prediction.id,
+                    "prediction_date": prediction_date,
+                    "days_until_stockout": prediction.days_until_stockout,
+                    "recommended_order": prediction.recommended_order,
+                    "confidence_score": prediction.confidence_score,
+                    "updated_at": updated_at,
+                }
+        if not latest:
+            return
+
+        rows = list(latest.values())
+        batch_size = MAX_QUERY_PARAMS // len(rows[0])
+        for start in range(0, len(rows), batch_size):
+            stmt = pg_insert(self.CurrentAIPrediction).values(
+                rows[start : start + batch_size]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[self.CurrentAIPrediction.product_id],
+                set_={
+                    "prediction_id": stmt.excluded.prediction_id,
+                    "prediction_date": stmt.excluded.prediction_date,
+                    "days_until_stockout": stmt.excluded.days_until_stockout,
+                    "recommended_order": stmt.excluded.recommended_order,
+                    "confidence_score": stmt.excluded.confidence_score,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+                where=self.CurrentAIPrediction.prediction_date
+                <= stmt.excluded.prediction_date,
+            )
+            await _s.execute(stmt)
+
+    async def get_latest_prediction_batch(self):
+        """
+        Последняя сохраненная пачка предсказаний: строки current_ai_predictions
+        с максимальным updated_at. None, если предсказаний еще нет.
+        """
+        async with self.DBSession() as _s:
+            latest = select(
+                func.max(self.CurrentAIPrediction.updated_at)
+            ).scalar_subquery()
+            result = await _s.execute(
+                select(self.CurrentAIPrediction, self.AIPrediction.input_hash)
+                .outerjoin(
+                    self.AIPrediction,
+                    self.AIPrediction.id == self.CurrentAIPrediction.prediction_id,
+                )
+                .where(self.CurrentAIPrediction.updated_at == latest)
+                .order_by(self.CurrentAIPrediction.days_until_stockout)
+            )
+            rows_with_hash = result.all()
+        rows = [row for row, _ in rows_with_hash]
+
+        if not rows:
+            return None
+        scores = [
+            float(row.confidence_score)
+            for row in rows
+            if row.confidence_score is not None
+        ]
+        return {
+            "predictions": [
+                {
+                    "product_id": row.product_id,
+                    "days_until_stockout": row.days_until_stockout,
+                    "recommended_order": row.recommended_order,
+                    "confidence_score": float(row.confidence_score)
+                    if row.confidence_score is not None
+                    else None,
+                    "created_at": row.prediction_date.isoformat(),
+                }
+                for row in rows
+            ],
+            "failed": [],
+            "confidence": round(sum(scores) / len(scores), 2) if scores else 0.0,
+            "generated_at": rows[0].updated_at,
+            # Пачка от LLM целиком сохраняется с одним хешем входных данных
+            "input_hash": rows_with_hash[0][1],
+        }
+
+    async def get_predictions_by_input_hash(self, input_hash: str):
+        """
+        Предсказания, сохраненные для входных данных с этим хешем (последнее
+        по каждому товару). Пустой список, если LLM их еще не видел.
+        """
+        async with self.DBSession() as _s:
+            result = await _s.execute(
+                select(self.AIPrediction)
+                .where(self.AIPrediction.input_hash == input_hash)
+                .order_by(self.AIPrediction.product_id, self.AIPrediction.id.desc())
+                .distinct(self.AIPrediction.product_id)
+            )
+            rows = result.scalars().all()
+        return [
+            {
+                "product_id": row.product_id,
+                "days_until_stockout": row.days_until_stockout,
+                "recommended_order": row.recommended_order,
+                "created_at": row.prediction_date.isoformat(),
+            }
+            for row in rows
+        ]
+
     async def get_data_for_predict(self):
         current_date = datetime.now().date()
         to_date = current_date + timedelta(days=1)
@@ -1092,6 +1288,32 @@ class DataBaseManager:
             return PredictResponse(predictions=[], confidence=0.0)
         return inventory_data, historical_data
 
+    async def get_forecast_data(self, days: int = 14):
+        """
+        Данные для локального прогноза (app.core.ai.forecaster): сканирования
+        товаров за последние days дней и min_stock/optimal_stock каталога,
+        двумя DataFrame без ORM-объектов.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        async with self.DBSession() as _s:
+            history = await _s.execute(
+                select(
+                    InventoryHistory.product_id,
+                    InventoryHistory.zone,
+                    InventoryHistory.shelf_number,
+                    InventoryHistory.quantity,
+                    InventoryHistory.scanned_at,
+                )
+                .where(InventoryHistory.scanned_at >= since)
+                .where(InventoryHistory.product_id.is_not(None))
+            )
+            history_df = pd.DataFrame(history.all(), columns=list(HISTORY_COLUMNS))
+            products = await _s.execute(
+                select(Product.id, Product.min_stock, Product.optimal_stock)
+            )
+            products_df = pd.DataFrame(products.all(), columns=list(PRODUCT_COLUMNS))
+        return history_df, products_df
+
     # def get_ai_predictions(self):
     #     with self.DBSession() as _s:
     #         prediction = _s.query(self.AIPrediction).order_by(self.AIPrediction.prediction_date.desc()).limit(10).all()
@@ -1144,6 +1366,72 @@ class DataBaseManager:
 
         return inventory_data
 
+    def _inventory_history_query(
+        self, from_date=None, to_date=None, zone=None, shelf=None, status=None
+    ):
+        """
+        Колонки inventory_history с именем продукта, текущим AI предсказанием
+        по товару (LEFT JOIN по первичному ключу current_ai_predictions)
+        и примененными фильтрами
+        """
+        query = (
+            select(
+                InventoryHistory.id,
+                InventoryHistory.robot_id,
+                InventoryHistory.product_id,
+                InventoryHistory.quantity,
+                InventoryHistory.zone,
+                InventoryHistory.shelf_number,
+                InventoryHistory.status,
+                InventoryHistory.scanned_at,
+                Product.name.label("product_name"),
+                CurrentAIPrediction.product_id.label("predicted_product_id"),
+                CurrentAIPrediction.recommended_order,
+                CurrentAIPrediction.confidence_score,
+            )
+            .join(Product, InventoryHistory.product_id == Product.id)
+            .outerjoin(
+                CurrentAIPrediction,
+                CurrentAIPrediction.product_id == InventoryHistory.product_id,
+            )
+        )
+
+        if from_date is not None:
+            query = query.filter(InventoryHistory.scanned_at >= from_date)
+        if to_date is not None:
+            query = query.filter(InventoryHistory.scanned_at <= to_date)
+        if zone is not None:
+            query = query.filter(InventoryHistory.zone == zone)
+        if shelf is not None:
+            query = query.filter(InventoryHistory.shelf_number == shelf)
+        if status is not None:
+            query = query.filter(InventoryHistory.status == status)
+        return query
+
+    @staticmethod
+    def _history_record(row) -> Dict:
+        result_json = {
+            "id": row.id,
+            "robot_id": row.robot_id,
+            "product_id": row.product_id,
+            "product_name": row.product_name,  # Добавлено имя продукта
+            "quantity": row.quantity,
+            "zone": row.zone,
+            "shelf_number": row.shelf_number,
+            "status": row.status,
+            "scanned_at": row.scanned_at.isoformat() if row.scanned_at else None,
+        }
+        # Текущее AI предсказание для этого product_id
+        if row.predicted_product_id is not None:
+            result_json["recommended_order"] = row.recommended_order
+            result_json["discrepancy"] = abs(row.quantity - row.recommended_order)
+            result_json["prediction_confidence"] = row.confidence_score
+        else:
+            result_json["recommended_order"] = 0
+            result_json["discrepancy"] = row.quantity
+            result_json["prediction_confidence"] = None
+        return result_json
+
     # # Сводка работы роботов по фильтрам
     async def get_filter_inventory_history(
         self,
@@ -1156,100 +1444,98 @@ class DataBaseManager:
         limit=None,
     ):
         async with self.DBSession() as _s:
-            # Базовый запрос для inventory_history с JOIN к products
-            query = select(InventoryHistory, Product.name.label("product_name")).join(
-                Product, InventoryHistory.product_id == Product.id
-            )
-
-            # Применяем фильтры
-            if from_date is not None:
-                query = query.filter(InventoryHistory.scanned_at >= from_date)
-            if to_date is not None:
-                query = query.filter(InventoryHistory.scanned_at <= to_date)
-            if zone is not None:
-                query = query.filter(InventoryHistory.zone == zone)
-            if shelf is not None:
-                query = query.filter(InventoryHistory.shelf_number == shelf)
-            if status is not None:
-                query = query.filter(InventoryHistory.status == status)
+            query = self._inventory_history_query(from_date, to_date, zone, shelf, status)
             if limit is not None:
-                query = query.limit(limit)
-            filtered_history = []
-            # Получаем все записи inventory_history с именами продуктов
+                # Без порядка LIMIT возвращает произвольные строки, а от этих
+                # данных зависит ключ кеша предсказаний
+                query = query.order_by(
+                    InventoryHistory.scanned_at.desc(), InventoryHistory.id.desc()
+                ).limit(limit)
             result = await _s.execute(query)
-            records = result.all()
-            # Собираем все product_id для batch запроса к AI predictions
-            product_ids = [
-                inv_his.product_id
-                for inv_his, product_name in records
-                if inv_his.product_id
-            ]
-            # Получаем все AI predictions для этих product_ids одним запросом
-            ai_predictions = {}
-            if product_ids:
-                predictions_query = select(AIPrediction).filter(
-                    AIPrediction.product_id.in_(product_ids)
+            return [self._history_record(row) for row in result.all()]
+
+    async def get_inventory_history_page(
+        self,
+        from_date=None,
+        to_date=None,
+        zone=None,
+        shelf=None,
+        status=None,
+        cursor=None,
+        page_size=100,
+    ):
+        """
+        Страница истории, от новых записей к старым, с keyset-пагинацией
+        по (scanned_at, id). cursor — значение next_cursor предыдущей страницы.
+        """
+        async with self.DBSession() as _s:
+            query = self._inventory_history_query(from_date, to_date, zone, shelf, status)
+            if cursor:
+                cursor_scanned_at, cursor_id = decode_cursor(cursor)
+                query = query.filter(
+                    tuple_(InventoryHistory.scanned_at, InventoryHistory.id)
+                    < tuple_(literal(cursor_scanned_at), literal(cursor_id))
                 )
-                predictions_result = await _s.execute(predictions_query)
-                predictions = predictions_result.scalars().all()
+            query = query.order_by(
+                InventoryHistory.scanned_at.desc(), InventoryHistory.id.desc()
+            ).limit(page_size + 1)
 
-                # Группируем predictions по product_id, берем последнее по дате
-                for pred in predictions:
-                    if pred.product_id not in ai_predictions:
-                        ai_predictions[pred.product_id] = pred
-                    else:
-                        # Если есть несколько predictions, берем самую свежую
-                        existing_pred = ai_predictions[pred.product_id]
-                        if pred.prediction_date and existing_pred.prediction_date:
-                            if pred.prediction_date > existing_pred.prediction_date:
-                                ai_predictions[pred.product_id] = pred
-            # Формируем результат
-            for inv_his, product_name in records:
-                result_json = {
-                    "id": inv_his.id,
-                    "robot_id": inv_his.robot_id,
-                    "product_id": inv_his.product_id,
-                    "product_name": product_name,  # Добавлено имя продукта
-                    "quantity": inv_his.quantity,
-                    "zone": inv_his.zone,
-                    "shelf_number": inv_his.shelf_number,
-                    "status": inv_his.status,
-                    "scanned_at": inv_his.scanned_at.isoformat()
-                    if inv_his.scanned_at
-                    else None,
-                }
-                # Ищем AI предсказание для этого product_id
-                ai_pred = ai_predictions.get(inv_his.product_id)
-                if ai_pred:
-                    result_json["recommended_order"] = ai_pred.recommended_order
-                    result_json["discrepancy"] = abs(
-                        inv_his.quantity - ai_pred.recommended_order
-                    )
-                    result_json["prediction_confidence"] = ai_pred.confidence_score
-                else:
-                    result_json["recommended_order"] = 0
-                    result_json["discrepancy"] = inv_his.quantity
-                    result_json["prediction_confidence"] = None
-                filtered_history.append(result_json)
-            return filtered_history
+            result = await _s.execute(query)
+            records = result.all()
+            has_more = len(records) > page_size
+            records = records[:page_size]
+
+            items = [self._history_record(row) for row in records]
+            next_cursor = (
+                encode_cursor(records[-1].scanned_at, records[-1].id)
+                if has_more
+                else None
+            )
+            return {
+                "items": items,
+                "pagination": {
+                    "page_size": page_size,
+                    "next_cursor": next_cursor,
+                    "has_more": has_more,
+                },
+            }
 
-    # Сводка количества активных роботов, возвращает кортеж формата (n активных роботов, m всего роботов)
-    async def get_active_robots(self):  # Не проверено
+    async def stream_inventory_history(
+        self,
+        from_date=None,
+        to_date=None,
+        zone=None,
+        shelf=None,
+        status=None,
+        chunk_size=1000,
+    ):
+        """
+        Асинхронный генератор записей истории через серверный курсор:
+        строки читаются порциями по chunk_size, память не растет с диапазоном.
+        """
         async with self.DBSession() as _s:
-            result = await _s.execute(select(Robot).filter(Robot.status == "active"))
-            active_robots_count = len(result.scalars().all())
+            query = (
+                self._inventory_history_query(from_date, to_date, zone, shelf, status)
+                .order_by(InventoryHistory.scanned_at.desc(), InventoryHistory.id.desc())
+                .execution_options(yield_per=chunk_size)
+            )
+            result = await _s.stream(query)
+            async for partition in result.partitions(chunk_size):
+                for row in partition:
+                    yield self._history_record(row)
 
-            result = await _s.execute(select(Robot))
-            count_robots = len(result.scalars().all())
-            return (active_robots_count, count_robots)
+    # Сводка количества активных роботов, возвращает кортеж формата (n активных роботов, m всего роботов)
+    async def get_active_robots(self):
+        async with self.DBSession() as _s:
+            result = await _s.execute(robot_statistics_query())
+            stats = result.one()
+            return (stats.active_robots, stats.total_robots)
 
     # Средний заряд батареи роботов, возвращает чило
     async def average_battery_charge(self):
         async with self.DBSession() as _s:
-            result = await _s.execute(
-                select(func.avg(Robot.battery_level)).filter(Robot.status == "active")
-            )
-            avg_battery = result.scalar()
+            result = await _s.execute(robot_statistics_query())
+            avg_battery = result.one().average_battery
         return avg_battery
 
     async def fetch_robots_last_hour_data(self):
@@ -0,0 +1,343 @@
+"""
+Массовый импорт инвентаризации.
+
+Формат файла описывает CsvDialect: разделитель, форматы дат, статус строк
+(фиксированный или по остатку относительно min_stock товара) и параметры
+новых товаров. Колонки проверяются и приводятся к типам векторно в DataFrame, новые
+товары добавляются одним INSERT ... SELECT FROM unnest (без лимита
+asyncpg на число параметров), а строки истории идут в Postgres через
+COPY (asyncpg copy_records_to_table) без ORM-объектов. id строк заранее
+берутся из последовательности inventory_history: дашборд сравнивает
+последние сканирования по id.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from sqlalchemy import text
+
+HISTORY_TABLE = "inventory_history"
+
+REQUIRED_COLUMNS = ["product_id", "product_name", "quantity"]
+
+# Порядок колонок COPY и нормализованного DataFrame
+COPY_COLUMNS = (
+    "id",
+    "robot_id",
+    "product_id",
+    "quantity",
+    "zone",
+    "row_number",
+    "shelf_number",
+    "status",
+    "scanned_at",
+)
+
+# Ограничения колонок моделей Product и InventoryHistory
+PRODUCT_ID_LENGTH = 50
+PRODUCT_NAME_LENGTH = 255
+ZONE_LENGTH = 10
+
+UNKNOWN_PRODUCT_NAME = "Unknown Product"
+
+# Сколько ошибок по строкам возвращать в ответе импорта
+MAX_ERROR_DETAILS = 100
+
+_INSERT_PRODUCTS = text(
+    """
+    INSERT INTO products (id, name, category, min_stock, optimal_stock)
+    SELECT id, name, :category, :min_stock, :optimal_stock
+    FROM unnest(CAST(:ids AS VARCHAR[]), CAST(:names AS VARCHAR[])) AS t(id, name)
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id, name
+    """
+)
+
+_STOCK_LEVELS = text(
+    "SELECT id, min_stock, optimal_stock FROM products "
+    "WHERE id = ANY(CAST(:ids AS VARCHAR[]))"
+)
+
+_ALLOCATE_IDS = text(
+    "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+    "FROM generate_series(1, :count)"
+)
+
+
+class CsvDialect(BaseModel):
+    """Формат CSV импорта"""
+
+    delimiter: str = ";"
+    encoding: str = "utf-8"
+    # Форматы pd.to_datetime по порядку; "ISO8601" — любые ISO-даты
+    date_formats: Tuple[str, ...] = ("ISO8601",)
+    # None — статус по остатку: CRITICAL не выше min_stock, LOW_STOCK ниже
+    # optimal_stock, иначе OK
+    status: Optional[str] = "OK"
+    # Новые товары импорта
+    category: Optional[str] = None
+    min_stock: int = 10
+    optimal_stock: int = 100
+
+
+DIALECTS = {
+    "default": CsvDialect(),
+    # Выгрузки с датами YYYY-MM-DD и DD.MM.YYYY и без статуса
+    "robot_csv": CsvDialect(
+        date_formats=("ISO8601", "%Y-%m-%d", "%d.%m.%Y"),
+        status=None,
+        category="Electronics",
+        optimal_stock=50,
+    ),
+}
+
+
+def _strings(column: pd.Series) -> pd.Series:
+    """
+    Строки без пробелов по краям; пустые и NaN -> NA. id, названия и зоны
+    в файле сильно повторяются, поэтому строки чистятся по уникальным
+    значениям (factorize), а не по каждой ячейке.
+    """
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    cleaned = pd.Series(uniques, dtype="object").astype("string").str.strip()
+    cleaned = cleaned.mask(cleaned == "").to_numpy(dtype=object, na_value=None)
+    # Код -1 (NA) попадает на добавленный в конец None
+    return pd.Series(np.append(cleaned, None)[codes], dtype="string")
+
+
+def _numbers(column: pd.Series) -> pd.Series:
+    """Числа из строк (нераспознанные -> NaN), тоже по уникальным значениям"""
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    numbers = pd.to_numeric(pd.Series(uniques, dtype="object"), errors="coerce")
+    values = numbers.to_numpy(dtype="float64", na_value=np.nan)
+    return pd.Series(np.append(values, np.nan)[codes])
+
+
+def parse_dates(dates: pd.Series, formats: Sequence[str]) -> pd.Series:
+    """
+    Даты по списку форматов, каждый формат — один векторный pd.to_datetime
+    по еще не разобранным значениям. Даты без часового пояса считаются UTC,
+    нераспознанные — NaT.
+    """
+    parsed = pd.Series(pd.NaT, index=dates.index, dtype="datetime64[ns, UTC]")
+    pending = dates.notna()
+    for date_format in formats:
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(
+            dates[pending], errors="coerce", utc=True, format=date_format
+        )
+        pending = pending & parsed.isna()
+    return parsed
+
+
+def normalize_inventory_frame(
+    df: pd.DataFrame,
+    status: Optional[str] = "OK",
+    now: Optional[datetime] = None,
+    first_row: int = 1,
+    date_formats: Sequence[str] = ("ISO8601",),
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Проверяет и приводит строки CSV к колонкам inventory_history.
+
+    Возвращает (строки для записи, ошибки вида "Row N: ..."), N — номер
+    строки данных в файле (first_row — номер первой строки df, если файл
+    читается кусками). Строка с ошибкой пропускается целиком. Нераспознанная
+    или пустая дата заменяется текущим временем. status=None оставляет
+    статус пустым для derive_status.
+    """
+    now = now or datetime.now(timezone.utc)
+    size = len(df)
+
+    def column(name: str) -> pd.Series:
+        if name in df.columns:
+            return df[name].reset_index(drop=True)
+        return pd.Series([None] * size, dtype="object")
+
+    product_id = _strings(column("product_id"))
+    product_name = _strings(column("product_name")).fillna(UNKNOWN_PRODUCT_NAME)
+    zone = _strings(column("zone"))
+    quantity = _numbers(column("quantity"))
+    row_number = _numbers(column("row"))
+    shelf_number = _numbers(column("shelf"))
+
+    scanned_at = parse_dates(_strings(column("date")), date_formats)
+    scanned_at = scanned_at.fillna(pd.Timestamp(now).tz_convert("UTC"))
+
+    # Первая нарушенная проверка дает текст ошибки строки
+    checks = [
+        (product_id.isna().to_numpy(), "Missing product_id"),
+        (
+            (product_id.str.len() > PRODUCT_ID_LENGTH).fillna(False).to_numpy(),
+            f"product_id is longer than {PRODUCT_ID_LENGTH} characters",
+        ),
+        (quantity.isna().to_numpy(), "Invalid quantity"),
+        (zone.isna().to_numpy(), "Missing zone"),
+        (
+            (zone.str.len() > ZONE_LENGTH).fillna(False).to_numpy(),
+            f"zone is longer than {ZONE_LENGTH} characters",
+        ),
+    ]
+    invalid = np.logical_or.reduce([mask for mask, _ in checks])
+    errors = []
+    if invalid.any():
+        messages = np.select(
+            [mask for mask, _ in checks], [message for _, message in checks], ""
+        )
+        positions = np.flatnonzero(invalid)
+        errors = [f"Row {i + first_row}: {messages[i]}" for i in positions]
+
+    valid = ~invalid
+    frame = pd.DataFrame(
+        {
+            "product_id": product_id[valid].astype(object),
+            "product_name": product_name[valid]
+            .str.slice(0, PRODUCT_NAME_LENGTH)
+            .astype(object),
+            "quantity": np.trunc(quantity[valid]).astype("int64"),
+            "zone": zone[valid].astype(object),
+            "row_number": np.trunc(row_number[valid]).astype("Int64"),
+            "shelf_number": np.trunc(shelf_number[valid]).astype("Int64"),
+            "status": status,
+            "scanned_at": scanned_at[valid],
+        }
+    ).reset_index(drop=True)
+    return frame, errors
+
+
+def distinct_products(frame: pd.DataFrame) -> Dict[str, str]:
+    """Товары импорта: первое встретившееся название для каждого id"""
+    products = frame.drop_duplicates("product_id", keep="first")
+    return dict(zip(products["product_id"], products["product_name"]))
+
+
+async def insert_products(
+    connection,
+    products: Dict[str, str],
+    category=None,
+    min_stock: int = 10,
+    optimal_stock: int = 100,
+) -> Dict[str, str]:
+    """
+    Новые товары одним INSERT ... ON CONFLICT DO NOTHING. Возвращает только
+    действительно вставленные строки (id -> name): уже существующие товары
+    конфликтуют и в RETURNING не попадают.
+    """
+    if not products:
+        return {}
+    result = await connection.execute(
+        _INSERT_PRODUCTS,
+        {
+            "ids": list(products),
+            "names": list(products.values()),
+            "category": category,
+            "min_stock": min_stock,
+            "optimal_stock": optimal_stock,
+        },
+    )
+    return dict(result.all())
+
+
+async def product_stock_levels(connection, product_ids: Sequence[str]) -> pd.DataFrame:
+    """min_stock и optimal_stock товаров одним запросом"""
+    result = await connection.execute(_STOCK_LEVELS, {"ids": list(product_ids)})
+    return pd.DataFrame(
+        result.all(), columns=["product_id", "min_stock", "optimal_stock"]
+    )
+
+
+def derive_status(
+    frame: pd.DataFrame, levels: pd.DataFrame, dialect: CsvDialect
+) -> pd.Series:
+    """
+    Статус строк по остатку: CRITICAL при quantity <= min_stock, LOW_STOCK
+    при quantity < optimal_stock, иначе OK. Пороги товара без записи в
+    levels берутся из dialect.
+    """
+    levels = levels.set_index("product_id")
+    min_stock = frame["product_id"].map(levels["min_stock"]).fillna(dialect.min_stock)
+    optimal_stock = (
+        frame["product_id"].map(levels["optimal_stock"]).fillna(dialect.optimal_stock)
+    )
+    quantity = frame["quantity"]
+    return pd.Series(
+        np.select(
+            [quantity <= min_stock, quantity < optimal_stock],
+            ["CRITICAL", "LOW_STOCK"],
+            "OK",
+        ),
+        index=frame.index,
+        dtype=object,
+    )
+
+
+async def allocate_history_ids(
+    connection, count: int, table: str = HISTORY_TABLE
+) -> List[int]:
+    if not count:
+        return []
+    result = await connection.execute(_ALLOCATE_IDS, {"table": table, "count": count})
+    return result.scalars().all()
+
+
+def _nullable(column: pd.Series) -> list:
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def history_records(frame: pd.DataFrame, ids: Sequence[int]):
+    """Кортежи строк в порядке COPY_COLUMNS с типами Python для asyncpg"""
+    return zip(
+        ids,
+        [None] * len(frame),
+        frame["product_id"].tolist(),
+        frame["quantity"].tolist(),
+        frame["zone"].tolist(),
+        _nullable(frame["row_number"]),
+        _nullable(frame["shelf_number"]),
+        frame["status"].tolist(),
+        frame["scanned_at"].dt.to_pydatetime().tolist(),
+    )
+
+
+async def copy_history_rows(
+    connection,
+    frame: pd.DataFrame,
+    ids: Sequence[int],
+    table: str = HISTORY_TABLE,
+    schema: Optional[str] = None,
+):
+    """
+    COPY строк в inventory_history в транзакции connection (AsyncConnection
+    SQLAlchemy поверх asyncpg). Секционированная таблица сама раскладывает
+    строки по секциям.
+    """
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table,
+        records=history_records(frame, ids),
+        columns=COPY_COLUMNS,
+        schema_name=schema,
+    )
+
+
+def ingested_rows(
+    frame: pd.DataFrame, ids: Sequence[int], since: datetime
+) -> List[Dict]:
+    """
+    Строки для события INVENTORY_INGESTED. Дашборд считает только сегодня
+    и вчера, поэтому более старые сканирования в событие не попадают.
+    """
+    recent = frame.assign(id=list(ids), robot_id=None)
+    recent = recent[recent["scanned_at"] >= pd.Timestamp(since)]
+    records = recent[
+        ["id", "robot_id", "product_id", "quantity", "zone", "shelf_number", "status"]
+    ].astype(object)
+    records = records.where(records.notna(), None).to_dict("records")
+    for record, scanned_at in zip(
+        records, recent["scanned_at"].dt.to_pydatetime().tolist()
+    ):
+        record["scanned_at"] = scanned_at
+    return records
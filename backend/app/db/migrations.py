@@ -0,0 +1,38 @@
+import logging
+import pathlib
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from settings import settings
+
+MIGRATIONS_DIR = pathlib.Path(__file__).resolve().parents[2] / "migrations"
+
+# Ревизия, соответствующая схеме, которую раньше создавал create_all
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.set_main_option("sqlalchemy.url", settings.CONN_STR)
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_schema(connection):
+    """
+    Доводит схему до последней миграции. Синхронная функция для
+    AsyncConnection.run_sync. База, созданная через create_all до
+    появления миграций, сначала помечается базовой ревизией.
+    """
+    config = alembic_config(connection)
+    tables = inspect(connection).get_table_names()
+    if "alembic_version" not in tables and "inventory_history" in tables:
+        logging.info(
+            f"Existing schema without alembic_version, stamping {BASELINE_REVISION}"
+        )
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
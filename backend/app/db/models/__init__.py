@@ -3,6 +3,6 @@ from .user import User
 from .product import Product
 from .robot import Robot
 from .inventory import InventoryHistory
-from .ai_prediction import AIPrediction
+from .ai_prediction import AIPrediction, CurrentAIPrediction
 
-__all__ = ["User", "Product", "Robot", "InventoryHistory", "AIPrediction"]
+__all__ = ["User", "Product", "Robot", "InventoryHistory", "AIPrediction", "CurrentAIPrediction"]
@@ -1,4 +1,14 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Date, DECIMAL, DateTime
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    String,
+    Date,
+    DECIMAL,
+    DateTime,
+    Index,
+    text,
+)
 from datetime import datetime
 from app.db.base import Base
 
@@ -13,3 +23,32 @@ class AIPrediction(Base):
     recommended_order = Column(Integer)
     confidence_score = Column(DECIMAL(3, 2))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # sha256 входных данных LLM (см. миграцию 0005, app/core/ai/prediction_cache.py)
+    input_hash = Column(String(64))
+
+    __table_args__ = (
+        Index(
+            "ix_ai_predictions_input_hash",
+            input_hash,
+            id.desc(),
+            postgresql_where=text("input_hash IS NOT NULL"),
+        ),
+    )
+
+
+class CurrentAIPrediction(Base):
+    """
+    Последнее предсказание по каждому товару (одна строка на product_id).
+    Поддерживается DataBaseManager.add_ai_prediction, чтобы история не
+    перебирала все накопленные ai_predictions.
+    """
+
+    __tablename__ = "current_ai_predictions"
+
+    product_id = Column(String(50), ForeignKey("products.id"), primary_key=True)
+    prediction_id = Column(Integer, ForeignKey("ai_predictions.id"))
+    prediction_date = Column(Date, nullable=False)
+    days_until_stockout = Column(Integer)
+    recommended_order = Column(Integer)
+    confidence_score = Column(DECIMAL(3, 2))
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, func
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, Index, func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 
 class InventoryHistory(Base):
+    # В БД таблица секционирована по scanned_at (миграция 0003,
+    # app/db/partitions.py), первичный ключ там (id, scanned_at).
+    # Для ORM id остается уникальным идентификатором строки.
     __tablename__ = "inventory_history"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -18,6 +21,31 @@ class InventoryHistory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     product = relationship("Product", backref="inventory_history")
 
+    # Индексы под горячие запросы (см. миграцию 0002):
+    # последние сканирования / keyset-пагинация, статистика за день,
+    # фильтры истории по статусу, зоне и товару
+    __table_args__ = (
+        Index(
+            "ix_inventory_history_scanned_at_id",
+            scanned_at.desc(),
+            id.desc(),
+            postgresql_include=["status"],
+        ),
+        Index("ix_inventory_history_status_scanned_at", status, scanned_at),
+        Index("ix_inventory_history_zone_scanned_at", zone, scanned_at),
+        Index("ix_inventory_history_product_scanned_at", product_id, scanned_at),
+        # Естественный ключ сканирования робота (миграция 0006): повтор
+        # отчета не создает вторую строку. Строки импорта без robot_id
+        # ключом не ограничены — NULL в уникальном индексе не совпадают.
+        Index(
+            "ux_inventory_history_robot_scan",
+            robot_id,
+            scanned_at,
+            product_id,
+            unique=True,
+        ),
+    )
+
     def convert_json(self):
         data = {
             "robot_id": self.robot_id,
@@ -0,0 +1,19 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(scanned_at: datetime, row_id: int) -> str:
+    """Курсор keyset-пагинации по (scanned_at, id)"""
+    raw = f"{scanned_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбирает курсор encode_cursor. Бросает ValueError для битого курсора"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        scanned_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(scanned_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
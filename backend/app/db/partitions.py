@@ -0,0 +1,297 @@
+"""
+Партиционирование inventory_history по диапазонам scanned_at.
+
+Таблица переводится на PARTITION BY RANGE (scanned_at) миграцией 0003.
+Секции (день или неделя, границы по UTC) создаются заранее фоновой
+задачей PartitionManager. Политика хранения включается явно
+(HISTORY_RETENTION_DAYS > 0): старые секции отсоединяются (остаются
+отдельными таблицами для архивации) или удаляются. Строки вне существующих секций попадают в секцию DEFAULT.
+
+Функции уровня модуля работают с синхронным Connection: их вызывают и
+миграции (op.get_bind()), и менеджер (через AsyncConnection.run_sync).
+"""
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db.session import engine
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "inventory_history"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+INTERVALS = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+RETENTION_ACTIONS = ("detach", "drop")
+
+# Ключ advisory lock: обслуживание секций не должно идти параллельно
+# из нескольких экземпляров приложения
+_MAINTENANCE_LOCK = "inventory_history_partitions"
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+Bounds = Tuple[datetime, datetime]
+
+
+# --- Границы и имена секций ---
+
+
+def partition_start(moment: datetime, interval: str = "day") -> datetime:
+    """Начало секции, в которую попадает moment (полночь UTC, для недели - понедельник)"""
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    moment = moment.astimezone(timezone.utc)
+    start = datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+    if interval == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def partition_ranges(since: datetime, until: datetime, interval: str = "day") -> List[Bounds]:
+    """Границы секций, покрывающих отрезок [since, until]"""
+    step = INTERVALS[interval]
+    start = partition_start(since, interval)
+    ranges = []
+    while start <= until:
+        ranges.append((start, start + step))
+        start += step
+    return ranges
+
+
+def partition_name(start: datetime, interval: str = "day") -> str:
+    return f"{PARENT_TABLE}_{interval[0]}{start:%Y%m%d}"
+
+
+def parse_bound(expr: str) -> Optional[Bounds]:
+    """Разбирает pg_get_expr(relpartbound). None для секции DEFAULT"""
+    match = _BOUND_RE.search(expr)
+    if match is None:
+        return None
+    return (
+        datetime.fromisoformat(match.group(1)),
+        datetime.fromisoformat(match.group(2)),
+    )
+
+
+def expired_partitions(partitions: Dict[str, Optional[Bounds]], cutoff: datetime) -> List[str]:
+    """Секции, целиком лежащие раньше cutoff (DEFAULT не трогаем)"""
+    return sorted(
+        name
+        for name, bounds in partitions.items()
+        if bounds is not None and bounds[1] <= cutoff
+    )
+
+
+def _overlaps(bounds: Bounds, existing: Dict[str, Optional[Bounds]]) -> bool:
+    start, end = bounds
+    return any(
+        other is not None and start < other[1] and other[0] < end
+        for other in existing.values()
+    )
+
+
+# --- Операции с БД (синхронный Connection) ---
+
+
+def is_partitioned(connection) -> bool:
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": PARENT_TABLE},
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(connection) -> Dict[str, Optional[Bounds]]:
+    """Присоединенные секции inventory_history с их границами"""
+    rows = connection.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ),
+        {"name": PARENT_TABLE},
+    ).all()
+    return {name: parse_bound(expr) for name, expr in rows}
+
+
+def _bounds_sql(start: datetime, end: datetime) -> str:
+    return f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+def default_partition_ddl() -> str:
+    return f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"
+
+
+def partition_ddl(start: datetime, end: datetime, name: str) -> str:
+    return f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES {_bounds_sql(start, end)}"
+
+
+def create_default_partition(connection):
+    connection.execute(text(default_partition_ddl()))
+
+
+def create_partition(connection, start: datetime, end: datetime, name: str):
+    """
+    Создает секцию [start, end). Если такие строки уже лежат в DEFAULT,
+    они переносятся в новую таблицу до ATTACH, иначе Postgres откажет.
+    """
+    params = {"start": start, "end": end}
+    has_default = DEFAULT_PARTITION in list_partitions(connection)
+    stray = has_default and connection.execute(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE scanned_at >= :start AND scanned_at < :end)"
+        ),
+        params,
+    ).scalar()
+
+    if not stray:
+        connection.execute(text(partition_ddl(start, end, name)))
+        return
+
+    logger.info(f"Moving rows from {DEFAULT_PARTITION} into new partition {name}")
+    connection.execute(
+        text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)")
+    )
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE scanned_at >= :start AND scanned_at < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        params,
+    )
+    connection.execute(
+        text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES {_bounds_sql(start, end)}"
+        )
+    )
+
+
+def ensure_partitions(
+    connection, since: datetime, until: datetime, interval: str = "day"
+) -> List[str]:
+    """
+    Создает недостающие секции на отрезке [since, until]. Диапазоны,
+    пересекающиеся с уже существующими секциями (например, после смены
+    интервала), пропускаются. Возвращает имена созданных секций.
+    """
+    existing = list_partitions(connection)
+    created = []
+    for start, end in partition_ranges(since, until, interval):
+        name = partition_name(start, interval)
+        if name in existing or _overlaps((start, end), existing):
+            continue
+        create_partition(connection, start, end, name)
+        existing[name] = (start, end)
+        created.append(name)
+    return created
+
+
+def apply_retention(
+    connection, retention_days: int, action: str = "detach", now: Optional[datetime] = None
+) -> List[str]:
+    """
+    Отсоединяет (detach) или удаляет (drop) секции старше retention_days.
+    Отсоединенная секция остается обычной таблицей с тем же именем:
+    ее можно выгрузить pg_dump и удалить вручную.
+    """
+    if retention_days <= 0:
+        return []
+    if action not in RETENTION_ACTIONS:
+        raise ValueError(f"Unknown retention action: {action}")
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    expired = expired_partitions(list_partitions(connection), cutoff)
+    for name in expired:
+        connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        if action == "drop":
+            connection.execute(text(f"DROP TABLE {name}"))
+    return expired
+
+
+class PartitionManager:
+    """
+    Фоновое обслуживание секций inventory_history: раз в check_interval
+    создает секции на premake интервалов вперед и применяет политику
+    хранения. Если таблица не партиционирована, ничего не делает.
+    """
+
+    def __init__(
+        self,
+        interval: str = "day",
+        premake: int = 7,
+        retention_days: int = 0,
+        retention_action: str = "detach",
+        check_interval: float = 3600.0,
+    ):
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown partition interval: {interval}")
+        if retention_action not in RETENTION_ACTIONS:
+            raise ValueError(f"Unknown retention action: {retention_action}")
+        self.interval = interval
+        self.premake = premake
+        self.retention_days = retention_days
+        self.retention_action = retention_action
+        self.check_interval = check_interval
+        self._task: asyncio.Task | None = None
+
+    def maintain_sync(self, connection, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        now = now or datetime.now(timezone.utc)
+        if not is_partitioned(connection):
+            return {"created": [], "expired": []}
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": _MAINTENANCE_LOCK},
+        )
+        create_default_partition(connection)
+        created = ensure_partitions(
+            connection, now, now + INTERVALS[self.interval] * self.premake, self.interval
+        )
+        expired = apply_retention(
+            connection, self.retention_days, self.retention_action, now
+        )
+        return {"created": created, "expired": expired}
+
+    async def maintain(self) -> Dict[str, List[str]]:
+        async with engine.begin() as conn:
+            result = await conn.run_sync(self.maintain_sync)
+        if result["created"] or result["expired"]:
+            logger.info(
+                f"inventory_history partitions created: {result['created']}, "
+                f"expired ({self.retention_action}): {result['expired']}"
+            )
+        return result
+
+    async def _run(self):
+        while True:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Error maintaining inventory_history partitions: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+partition_manager = PartitionManager(
+    interval=settings.HISTORY_PARTITION_INTERVAL,
+    premake=settings.HISTORY_PARTITION_PREMAKE,
+    retention_days=settings.HISTORY_RETENTION_DAYS,
+    retention_action=settings.HISTORY_RETENTION_ACTION,
+    check_interval=settings.HISTORY_PARTITION_CHECK_INTERVAL,
+)
@@ -0,0 +1,53 @@
+from typing import Dict, Iterable, Tuple
+
+
+class ProductRegistry:
+    """
+    Процессный кэш справочника товаров (id -> название).
+
+    Позволяет путям импорта проверять существование товара без запроса
+    к БД. Прогревается при старте и обновляется методами DataBaseManager
+    после успешного коммита.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self.warmed = False
+
+    def warm(self, rows: Iterable[Tuple[str, str]]):
+        """Полностью заменить содержимое кэша строками (id, name)"""
+        self._names = {product_id: name for product_id, name in rows}
+        self.warmed = True
+
+    def invalidate(self):
+        """Пометить кэш устаревшим — при следующем обращении он будет перечитан"""
+        self.warmed = False
+
+    def put(self, product_id: str, name: str):
+        self._names[product_id] = name
+
+    def discard(self, product_id: str):
+        self._names.pop(product_id, None)
+
+    def get_name(self, product_id: str):
+        return self._names.get(product_id)
+
+    def split(self, products: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Разделить товары из отчета на новые (нет в справочнике)
+        и переименованные (название отличается от известного).
+        """
+        new, renamed = {}, {}
+        for product_id, name in products.items():
+            known_name = self._names.get(product_id)
+            if known_name is None:
+                new[product_id] = name
+            elif name and known_name != name:
+                renamed[product_id] = name
+        return new, renamed
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
@@ -0,0 +1,48 @@
+"""
+Агрегатные запросы статистики дашборда.
+
+Вся работа выполняется в Postgres: COUNT(*) FILTER (WHERE ...) и AVG
+вместо загрузки ORM-объектов и подсчета их в Python.
+"""
+from datetime import datetime
+
+from sqlalchemy import Select, func, select, true
+
+from app.db.models import InventoryHistory, Robot
+
+
+def robot_statistics_query() -> Select:
+    """(active_robots, total_robots, average_battery) одной строкой"""
+    return select(
+        func.count().filter(Robot.status == "active").label("active_robots"),
+        func.count().label("total_robots"),
+        func.avg(Robot.battery_level)
+        .filter(Robot.status == "active")
+        .label("average_battery"),
+    )
+
+
+def history_statistics_query(since: datetime) -> Select:
+    """(scanned_today, critical_stocks) начиная с момента since"""
+    return select(
+        func.count().label("scanned_today"),
+        func.count()
+        .filter(InventoryHistory.status == "CRITICAL")
+        .label("critical_stocks"),
+    ).where(InventoryHistory.scanned_at >= since)
+
+
+def dashboard_statistics_query(since: datetime) -> Select:
+    """
+    Вся статистика дашборда за один round-trip: два однострочных
+    агрегатных подзапроса, соединенных через JOIN ON true.
+    """
+    robots = robot_statistics_query().subquery("robot_stats")
+    history = history_statistics_query(since).subquery("history_stats")
+    return select(
+        robots.c.active_robots,
+        robots.c.total_robots,
+        robots.c.average_battery,
+        history.c.scanned_today,
+        history.c.critical_stocks,
+    ).select_from(robots.join(history, true()))
@@ -8,7 +8,15 @@ from app.api.v1.router import api_router
 from app.db.session import engine
 from app.db.base import Base
 from app.api.v1.dashboard.websocket_manager import ws_manager
-from settings import REDIS, CACHE
+from app.api.v1.dashboard.cluster import dashboard_cluster
+from app.core.ingestion.buffer import ingestion_buffer
+from app.core.dashboard.aggregator import dashboard_state
+from app.db.partitions import partition_manager
+from app.core.ai.yandex_gpt_client import yandex_client
+from app.core.ai.prediction_worker import prediction_service
+from app.core.ai.prediction_cache import prediction_cache
+from app.core.ingestion.import_jobs import import_jobs
+from settings import REDIS, CACHE, settings
 from app.db.DataBaseManager import db
 from redis.asyncio import Redis
 from fastapi_cache import FastAPICache
@@ -23,6 +31,12 @@ async def lifespan(app: FastAPI):
 
     await db.create_tables()
     await db.init_default_user()
+    await partition_manager.start()
+    await db.warm_product_registry()
+    await dashboard_state.start()
+    await ingestion_buffer.start()
+    # Общий пул соединений к YandexGPT
+    await yandex_client.start()
     # Redis + Cache
     redis = Redis(
         host=REDIS.host,
@@ -33,9 +47,21 @@ async def lifespan(app: FastAPI):
         RedisBackend(redis),
         prefix=CACHE.prefix,
     )
-    # Запуск broadcast
+    # Кеш ответов LLM по хешу входных данных
+    await prediction_cache.start(redis)
+    # Состояние фоновых импортов CSV видно всем воркерам
+    await import_jobs.start(redis)
+    if settings.PREDICTION_WORKER_ENABLED:
+        await prediction_service.start()
+    # Несколько воркеров: общий лидер дашборда и рассылка через Redis
+    if settings.WS_CLUSTER_ENABLED:
+        await dashboard_cluster.start(redis)
+    # Запуск broadcast по событиям изменения дашборда
     broadcast_task = asyncio.create_task(
-        ws_manager.broadcast_dashboard_updates(interval=5)
+        ws_manager.broadcast_dashboard_updates(
+            min_interval=settings.WS_PUSH_MIN_INTERVAL,
+            idle_interval=settings.WS_PUSH_IDLE_INTERVAL,
+        )
     )
     app.state.broadcast_task = broadcast_task
 
@@ -48,11 +74,18 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         pass
 
-    for ws in ws_manager.active_connections[:]:
-        try:
-            await ws.close()
-        except:
-            pass
+    if settings.WS_CLUSTER_ENABLED:
+        await dashboard_cluster.stop()
+
+    await import_jobs.stop()
+    # Сбрасываем в БД отчеты, оставшиеся в очереди
+    await ingestion_buffer.stop()
+    await dashboard_state.stop()
+    await partition_manager.stop()
+    await prediction_service.stop()
+    await yandex_client.stop()
+
+    await ws_manager.close_all()
 
 
 app = FastAPI(title="Simple FastAPI Service", version="1.0.0", lifespan=lifespan)
@@ -73,4 +106,7 @@ async def health_check():
     return {
         "status": "healthy",
         "websocket_connections": ws_manager.get_connections_count(),
+        "cluster_websocket_connections": await ws_manager.get_cluster_connections(),
+        "ingestion": ingestion_buffer.get_stats(),
+        "import_jobs": import_jobs.get_stats(),
     }
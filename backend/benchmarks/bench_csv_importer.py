@@ -0,0 +1,148 @@
+"""
+Бенчмарк разбора CSV импорта без БД.
+
+Сравнивается векторный normalize_inventory_frame с диалектом robot_csv
+(даты ISO, YYYY-MM-DD и DD.MM.YYYY) и разбор df.iterrows() из удаленного
+DataBaseManager.add_robot_data_csv_from_dataframe: по строке, с try/except
+по формату даты (--iterrows, на больших объемах долго). Запись в БД
+сравнивает bench_inventory_import --legacy.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_csv_importer --rows 10000 100000 1000000 --iterrows
+"""
+import argparse
+import io
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.db.bulk_import import DIALECTS, normalize_inventory_frame
+
+
+def make_csv(rows: int, products: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    product = rng.integers(0, products, rows)
+    scanned_at = pd.Timestamp("2026-10-01") + pd.to_timedelta(
+        rng.integers(0, 14 * 86400, rows), unit="s"
+    )
+    # Треть дат в каждом из форматов диалекта
+    formats = np.array(["%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%d.%m.%Y"])
+    dates = [stamp.strftime(formats[i % 3]) for i, stamp in enumerate(scanned_at)]
+    frame = pd.DataFrame(
+        {
+            "product_id": [f"TEL-{i:06d}" for i in product],
+            "product_name": [f"Product {i}" for i in product],
+            "quantity": rng.integers(0, 150, rows),
+            "zone": np.array(list("ABCDE"))[rng.integers(0, 5, rows)],
+            "row": rng.integers(1, 21, rows),
+            "shelf": rng.integers(1, 11, rows),
+            "date": dates,
+        }
+    )
+    return frame.to_csv(sep=";", index=False)
+
+
+def vectorized(csv_text: str):
+    dialect = DIALECTS["robot_csv"]
+    df = pd.read_csv(io.StringIO(csv_text), delimiter=dialect.delimiter, dtype=str)
+    return normalize_inventory_frame(
+        df, dialect.status, date_formats=dialect.date_formats
+    )
+
+
+def iterrows(csv_text: str):
+    """Разбор строк прежнего импорта, без ORM-объектов и записи в БД"""
+    df = pd.read_csv(io.StringIO(csv_text), delimiter=";")
+    rows, errors = [], []
+    for index, row in df.iterrows():
+        product_id = (
+            str(row["product_id"]).strip() if pd.notna(row.get("product_id")) else None
+        )
+        product_name = (
+            str(row["product_name"]).strip()
+            if pd.notna(row.get("product_name"))
+            else "Unknown Product"
+        )
+        zone = str(row["zone"]).strip() if pd.notna(row.get("zone")) else "UNKNOWN"
+        try:
+            quantity = (
+                int(float(row["quantity"])) if pd.notna(row.get("quantity")) else 0
+            )
+        except (ValueError, TypeError):
+            quantity = 0
+        try:
+            row_number = int(float(row["row"])) if pd.notna(row.get("row")) else None
+        except (ValueError, TypeError):
+            row_number = None
+        try:
+            shelf_number = (
+                int(float(row["shelf"])) if pd.notna(row.get("shelf")) else None
+            )
+        except (ValueError, TypeError):
+            shelf_number = None
+
+        date_str = row.get("date")
+        scanned_at = datetime.now()
+        if pd.notna(date_str) and date_str:
+            date_str_clean = str(date_str).strip()
+            if "T" in date_str_clean:
+                scanned_at = datetime.fromisoformat(
+                    date_str_clean.replace("Z", "+00:00")
+                )
+            else:
+                try:
+                    scanned_at = datetime.strptime(date_str_clean, "%Y-%m-%d")
+                except ValueError:
+                    try:
+                        scanned_at = datetime.strptime(date_str_clean, "%d.%m.%Y")
+                    except ValueError:
+                        pass
+
+        if not product_id:
+            errors.append(f"Row {index + 1}: Missing product_id")
+            continue
+        rows.append(
+            (
+                product_id,
+                product_name,
+                quantity,
+                zone,
+                row_number,
+                shelf_number,
+                scanned_at,
+            )
+        )
+    return rows, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument(
+        "--iterrows",
+        action="store_true",
+        help="Also time the old df.iterrows() parsing (slow)",
+    )
+    args = parser.parse_args()
+
+    methods = [("vector", vectorized)]
+    if args.iterrows:
+        methods.append(("iterrows", iterrows))
+
+    print(f"{'rows':>10} {'method':>9} {'seconds':>10} {'rows/s':>12}")
+    for rows in sorted(args.rows):
+        csv_text = make_csv(rows, args.products)
+        for name, method in methods:
+            started = time.perf_counter()
+            method(csv_text)
+            elapsed = time.perf_counter() - started
+            print(f"{rows:>10,} {name:>9} {elapsed:>10.2f} {rows / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
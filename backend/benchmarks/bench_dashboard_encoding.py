@@ -0,0 +1,126 @@
+"""
+Бенчмарк форматов WebSocket-сообщений дашборда.
+
+Для синтетического снимка get_current_state с N роботами сравнивает
+байты во фрейме и время кодирования одной рассылки для JSON и MessagePack
+(если установлен) в раскладках rows и columns. Колонка deflate —
+размер после сжатия raw deflate, как при permessage-deflate.
+К БД и Redis не обращается.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_dashboard_encoding --robots 50 500 5000
+"""
+import argparse
+import statistics
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from app.api.v1.dashboard import encoding
+from app.api.v1.dashboard.encoding import Codec
+
+STATUSES = ["active", "charging", "low_battery", "offline"]
+SCAN_STATUSES = ["OK", "LOW_STOCK", "CRITICAL"]
+
+
+def make_state(robots: int, scans: int = 20) -> dict:
+    now = datetime.now()
+    return {
+        "statistics": {
+            "active_robots": robots * 3 // 4,
+            "total_robots": robots,
+            "scanned_today": robots * 120,
+            "critical_stocks": robots // 10,
+            "average_battery": 63.4,
+        },
+        "robots": [
+            {
+                "id": f"RB-{i:04d}",
+                "status": STATUSES[i % len(STATUSES)],
+                "battery_level": 20 + i % 80,
+                "last_update": (now - timedelta(seconds=i)).strftime(
+                    "%H:%M:%S %d.%m.%Y"
+                ),
+                "current_zone": chr(65 + i % 5),
+                "current_row": i % 20 + 1,
+                "current_shelf": i % 10 + 1,
+            }
+            for i in range(robots)
+        ],
+        "recent_scans": [
+            {
+                "id": 1_000_000 + i,
+                "robot_id": f"RB-{i % robots:04d}",
+                "product_id": f"TEL-{i:04d}",
+                "product_name": f"Product {i}",
+                "quantity": i * 7 % 150,
+                "zone": chr(65 + i % 5),
+                "shelf_number": i % 10 + 1,
+                "status": SCAN_STATUSES[i % len(SCAN_STATUSES)],
+                "scanned_at": (now - timedelta(seconds=i)).strftime(
+                    "%H:%M:%S %d.%m.%Y"
+                ),
+            }
+            for i in range(scans)
+        ],
+    }
+
+
+def deflated_size(payload) -> int:
+    if isinstance(payload, str):
+        payload = payload.encode()
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return len(compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+
+def time_it(codec: Codec, message: dict, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = codec.encode(message)
+        samples.append((time.perf_counter() - started) * 1000)
+    return payload, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--robots", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    encodings = [encoding.ENCODING_JSON]
+    if encoding.msgpack is not None:
+        encodings.append(encoding.ENCODING_MSGPACK)
+    else:
+        print("msgpack is not installed, only json is measured")
+    codecs = [
+        Codec(name, layout)
+        for name in encodings
+        for layout in (encoding.LAYOUT_ROWS, encoding.LAYOUT_COLUMNS)
+    ]
+
+    print(
+        f"{'robots':>7} {'format':>16} {'bytes':>10} {'deflate':>10} "
+        f"{'vs json':>8} {'encode ms':>10}"
+    )
+    for robots in sorted(args.robots):
+        message = {
+            "type": "dashboard_update",
+            "version": 1,
+            "data": make_state(robots),
+            "timestamp": datetime.now().isoformat(),
+        }
+        baseline = None
+        for codec in codecs:
+            payload, median = time_it(codec, message, args.repeat)
+            size = len(payload) if isinstance(payload, bytes) else len(payload.encode())
+            baseline = baseline or size
+            name = f"{codec.encoding}/{codec.layout}"
+            print(
+                f"{robots:>7} {name:>16} {size:>10,} {deflated_size(payload):>10,} "
+                f"{size / baseline:>8.2f} {median:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
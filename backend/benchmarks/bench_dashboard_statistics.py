@@ -0,0 +1,162 @@
+"""
+Бенчмарк статистики дашборда на больших объемах inventory_history.
+
+Данные генерируются в отдельной схеме (по умолчанию bench) через
+generate_series, рабочие таблицы не затрагиваются. Сравниваются
+агрегатный запрос из app.db.statistics и прежний подход с загрузкой
+ORM-объектов и len() в Python.
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_dashboard_statistics --rows 1000000 10000000 50000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import InventoryHistory
+from app.db.statistics import dashboard_statistics_query
+from settings import settings
+
+SEED_SQL = """
+INSERT INTO {schema}.inventory_history
+    (robot_id, product_id, quantity, zone, row_number, shelf_number, status, scanned_at)
+SELECT
+    'RB-' || lpad((g % :robots)::text, 4, '0'),
+    'TEL-' || lpad((g % :products)::text, 4, '0'),
+    (g * 7919) % 150,
+    chr(65 + (g % 5)),
+    g % 20 + 1,
+    g % 10 + 1,
+    CASE WHEN g % 10 = 0 THEN 'CRITICAL' WHEN g % 3 = 0 THEN 'LOW_STOCK' ELSE 'OK' END,
+    now() - ((g % (:days * 86400)) || ' seconds')::interval
+FROM generate_series(:start, :stop) AS g
+"""
+
+
+async def seed(conn, schema: str, rows: int, robots: int, products: int, days: int):
+    existing = (
+        await conn.execute(text(f"SELECT count(*) FROM {schema}.inventory_history"))
+    ).scalar()
+    if existing >= rows:
+        return
+    await conn.execute(
+        text(
+            f"INSERT INTO {schema}.robots (id, status, battery_level) "
+            "SELECT 'RB-' || lpad(g::text, 4, '0'), "
+            "CASE WHEN g % 4 = 0 THEN 'low_battery' ELSE 'active' END, g % 100 "
+            "FROM generate_series(0, :robots - 1) AS g ON CONFLICT DO NOTHING"
+        ),
+        {"robots": robots},
+    )
+    await conn.execute(
+        text(
+            f"INSERT INTO {schema}.products (id, name) "
+            "SELECT 'TEL-' || lpad(g::text, 4, '0'), 'Product ' || g "
+            "FROM generate_series(0, :products - 1) AS g ON CONFLICT DO NOTHING"
+        ),
+        {"products": products},
+    )
+    # Порциями, чтобы не держать одну гигантскую транзакцию в WAL
+    step = 1_000_000
+    for start in range(existing + 1, rows + 1, step):
+        stop = min(start + step - 1, rows)
+        await conn.execute(
+            text(SEED_SQL.format(schema=schema)),
+            {
+                "robots": robots,
+                "products": products,
+                "days": days,
+                "start": start,
+                "stop": stop,
+            },
+        )
+        await conn.commit()
+        print(f"  seeded {stop:,} / {rows:,} rows")
+    await conn.execute(text(f"ANALYZE {schema}.inventory_history"))
+    await conn.commit()
+
+
+async def time_it(coro_factory, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+async def run(args):
+    engine = create_async_engine(
+        args.conn_str,
+        execution_options={"schema_translate_map": {None: args.schema}},
+    )
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async with engine.connect() as conn:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {args.schema}"))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.commit()
+
+    async def aggregate():
+        async with sessions() as _s:
+            (await _s.execute(dashboard_statistics_query(today_start))).one()
+
+    async def legacy():
+        async with sessions() as _s:
+            result = await _s.execute(
+                select(InventoryHistory).filter(InventoryHistory.scanned_at >= today_start)
+            )
+            len(result.scalars().all())
+            result = await _s.execute(
+                select(InventoryHistory)
+                .filter(InventoryHistory.status == "CRITICAL")
+                .filter(InventoryHistory.scanned_at >= today_start)
+            )
+            len(result.scalars().all())
+
+    print(f"{'rows':>12} {'query':>10} {'median ms':>12} {'min ms':>10}")
+    for rows in sorted(args.rows):
+        async with engine.connect() as conn:
+            await seed(conn, args.schema, rows, args.robots, args.products, args.days)
+        median, best = await time_it(aggregate, args.repeat)
+        print(f"{rows:>12,} {'aggregate':>10} {median:>12.1f} {best:>10.1f}")
+        if args.legacy:
+            median, best = await time_it(legacy, args.repeat)
+            print(f"{rows:>12,} {'legacy':>10} {median:>12.1f} {best:>10.1f}")
+
+    if args.drop:
+        async with engine.connect() as conn:
+            await conn.execute(text(f"DROP SCHEMA {args.schema} CASCADE"))
+            await conn.commit()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conn-str", default=settings.CONN_STR)
+    parser.add_argument("--schema", default="bench")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000]
+    )
+    parser.add_argument("--robots", type=int, default=300)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=30, help="Spread of scanned_at")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also time the old ORM load + len() path (slow, memory heavy)",
+    )
+    parser.add_argument("--drop", action="store_true", help="Drop the schema afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
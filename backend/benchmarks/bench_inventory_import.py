@@ -0,0 +1,146 @@
+"""
+Бенчмарк массового импорта инвентаризации из CSV.
+
+CSV генерируется в памяти, таблицы создаются в отдельной схеме (по
+умолчанию bench) через search_path, рабочие таблицы не затрагиваются.
+Сравниваются импорт через app.db.bulk_import (векторная проверка, товары
+одним запросом, COPY) и прежний подход с ORM-объектом на строку (--legacy).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_inventory_import --rows 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.bulk_import import (
+    allocate_history_ids,
+    copy_history_rows,
+    distinct_products,
+    insert_products,
+    normalize_inventory_frame,
+)
+from app.db.models import InventoryHistory
+from settings import settings
+
+
+def make_csv(rows: int, products: int, seed: int = 0) -> str:
+    rng = np.random.default_rng(seed)
+    product = rng.integers(0, products, rows)
+    scanned_at = pd.Timestamp("2026-10-01") + pd.to_timedelta(
+        rng.integers(0, 14 * 86400, rows), unit="s"
+    )
+    frame = pd.DataFrame(
+        {
+            "product_id": [f"TEL-{i:06d}" for i in product],
+            "product_name": [f"Product {i}" for i in product],
+            "quantity": rng.integers(0, 150, rows),
+            "zone": np.array(list("ABCDE"))[rng.integers(0, 5, rows)],
+            "row": rng.integers(1, 21, rows),
+            "shelf": rng.integers(1, 11, rows),
+            "date": scanned_at.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    )
+    return frame.to_csv(sep=";", index=False)
+
+
+async def bulk_import(sessions, csv_text: str):
+    df = pd.read_csv(io.StringIO(csv_text), delimiter=";", dtype=str)
+    frame, _ = normalize_inventory_frame(df)
+    async with sessions() as _s:
+        await insert_products(_s, distinct_products(frame))
+        conn = await _s.connection()
+        ids = await allocate_history_ids(conn, len(frame))
+        await copy_history_rows(conn, frame, ids)
+        await _s.commit()
+
+
+async def legacy_import(sessions, csv_text: str):
+    df = pd.read_csv(io.StringIO(csv_text), delimiter=";")
+    records = df.where(pd.notnull(df), None).to_dict("records")
+    async with sessions() as _s:
+        await insert_products(
+            _s,
+            {record["product_id"]: record["product_name"] for record in records},
+        )
+        _s.add_all(
+            InventoryHistory(
+                robot_id=None,
+                zone=record["zone"],
+                row_number=record["row"],
+                shelf_number=record["shelf"],
+                product_id=record["product_id"],
+                quantity=record["quantity"],
+                status="OK",
+                scanned_at=pd.Timestamp(record["date"], tz="UTC").to_pydatetime(),
+            )
+            for record in records
+        )
+        await _s.commit()
+
+
+async def run(args):
+    admin = create_async_engine(args.conn_str)
+    async with admin.connect() as conn:
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {args.schema}"))
+        await conn.commit()
+    await admin.dispose()
+
+    engine = create_async_engine(
+        args.conn_str,
+        connect_args={"server_settings": {"search_path": args.schema}},
+    )
+    sessions = async_sessionmaker(bind=engine, class_=AsyncSession)
+    async with engine.connect() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.commit()
+
+    methods = [("copy", bulk_import)]
+    if args.legacy:
+        methods.append(("legacy", legacy_import))
+
+    print(f"{'rows':>10} {'method':>8} {'seconds':>10} {'rows/s':>12}")
+    for rows in sorted(args.rows):
+        csv_text = make_csv(rows, args.products)
+        for name, method in methods:
+            async with engine.connect() as conn:
+                await conn.execute(text("TRUNCATE inventory_history"))
+                await conn.commit()
+            started = time.perf_counter()
+            await method(sessions, csv_text)
+            elapsed = time.perf_counter() - started
+            print(f"{rows:>10,} {name:>8} {elapsed:>10.2f} {rows / elapsed:>12,.0f}")
+
+    if args.drop:
+        async with engine.connect() as conn:
+            await conn.execute(text(f"DROP SCHEMA {args.schema} CASCADE"))
+            await conn.commit()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conn-str", default=settings.CONN_STR)
+    parser.add_argument("--schema", default="bench")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also time the old ORM object per row path (slow, memory heavy)",
+    )
+    parser.add_argument("--drop", action="store_true", help="Drop the schema afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Бенчмарк локального прогноза остатков (app.core.ai.forecaster).
+
+История сканирований генерируется в памяти: у каждого товара одно место
+хранения и ряд остатков с линейным расходом и шумом. Сравнивается
+векторный StockForecaster и наивный подход с np.polyfit в цикле по
+товарам (--naive).
+
+Запуск из каталога backend:
+    python -m benchmarks.bench_prediction_forecaster --products 1000 10000 100000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.ai.forecaster import StockForecaster
+
+
+def make_history(products: int, points: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    step = np.tile(np.arange(points), products)
+    rate = np.repeat(rng.uniform(0, 15, products), points)
+    start = np.repeat(rng.integers(50, 500, products), points)
+    quantity = np.maximum(start - rate * step + rng.normal(0, 5, products * points), 0)
+    return pd.DataFrame(
+        {
+            "product_id": np.repeat(
+                np.array([f"TEL-{i:06d}" for i in range(products)]), points
+            ),
+            "zone": "A",
+            "shelf_number": 1,
+            "quantity": quantity.astype(np.int64),
+            "scanned_at": pd.Timestamp("2026-10-01", tz="UTC")
+            + pd.to_timedelta(step * 6, unit="h"),
+        }
+    )
+
+
+def naive(history: pd.DataFrame):
+    t = (history["scanned_at"] - history["scanned_at"].min()).dt.total_seconds()
+    history = history.assign(t=t / 86400)
+    result = {}
+    for product_id, group in history.groupby("product_id"):
+        if len(group) > 1:
+            slope = np.polyfit(group["t"], group["quantity"], 1)[0]
+        else:
+            slope = 0.0
+        result[product_id] = max(-slope, 0.0)
+    return result
+
+
+def time_it(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def report(products: int, rows: int, method: str, median: float, best: float):
+    print(f"{products:>10,} {rows:>12,} {method:>10} {median:>12.1f} {best:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--products", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--points", type=int, default=10, help="Scans per product")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--naive",
+        action="store_true",
+        help="Also time np.polyfit in a per-product loop (slow)",
+    )
+    args = parser.parse_args()
+
+    forecaster = StockForecaster()
+    print(
+        f"{'products':>10} {'rows':>12} {'method':>10} "
+        f"{'median ms':>12} {'min ms':>10}"
+    )
+    for products in sorted(args.products):
+        history = make_history(products, args.points)
+        rows = len(history)
+        products_df = pd.DataFrame(
+            {
+                "product_id": history["product_id"].unique(),
+                "min_stock": 10,
+                "optimal_stock": 100,
+            }
+        )
+        median, best = time_it(
+            lambda: forecaster.forecast(history, products_df), args.repeat
+        )
+        report(products, rows, "vector", median, best)
+        if args.naive:
+            median, best = time_it(lambda: naive(history), 1)
+            report(products, rows, "naive", median, best)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Начальная схема (то, что раньше создавал Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("password_hash", sa.LargeBinary, nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("role", sa.String(50), nullable=False),
+        sa.Column("created_at", sa.DateTime),
+    )
+    op.create_table(
+        "robots",
+        sa.Column("id", sa.String(50), primary_key=True),
+        sa.Column("status", sa.String(50)),
+        sa.Column("battery_level", sa.Integer),
+        sa.Column("last_update", sa.DateTime(timezone=True)),
+        sa.Column("current_zone", sa.String(10)),
+        sa.Column("current_row", sa.Integer),
+        sa.Column("current_shelf", sa.Integer),
+    )
+    op.create_table(
+        "products",
+        sa.Column("id", sa.String(50), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("category", sa.String(100)),
+        sa.Column("min_stock", sa.Integer),
+        sa.Column("optimal_stock", sa.Integer),
+    )
+    op.create_table(
+        "inventory_history",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("robot_id", sa.String(50), sa.ForeignKey("robots.id")),
+        sa.Column(
+            "product_id", sa.String(50), sa.ForeignKey("products.id"), nullable=True
+        ),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("zone", sa.String(10), nullable=False),
+        sa.Column("row_number", sa.Integer),
+        sa.Column("shelf_number", sa.Integer, nullable=True),
+        sa.Column("status", sa.String(50)),
+        sa.Column("scanned_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    )
+    op.create_table(
+        "ai_predictions",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.String(50), sa.ForeignKey("products.id")),
+        sa.Column("prediction_date", sa.Date, nullable=False),
+        sa.Column("days_until_stockout", sa.Integer),
+        sa.Column("recommended_order", sa.Integer),
+        sa.Column("confidence_score", sa.DECIMAL(3, 2)),
+        sa.Column("created_at", sa.DateTime),
+    )
+
+
+def downgrade():
+    op.drop_table("ai_predictions")
+    op.drop_table("inventory_history")
+    op.drop_table("products")
+    op.drop_table("robots")
+    op.drop_table("users")
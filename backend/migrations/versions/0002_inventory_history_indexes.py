@@ -0,0 +1,50 @@
+"""Составные индексы inventory_history под горячие запросы
+
+- (scanned_at DESC, id DESC) INCLUDE (status): последние 20 сканирований,
+  keyset-пагинация истории и index-only подсчет статистики за день;
+- (status, scanned_at): критические остатки за период;
+- (zone, scanned_at) и (product_id, scanned_at): фильтры истории.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_inventory_history_scanned_at_id",
+        "inventory_history",
+        [sa.text("scanned_at DESC"), sa.text("id DESC")],
+        postgresql_include=["status"],
+    )
+    op.create_index(
+        "ix_inventory_history_status_scanned_at",
+        "inventory_history",
+        ["status", "scanned_at"],
+    )
+    op.create_index(
+        "ix_inventory_history_zone_scanned_at",
+        "inventory_history",
+        ["zone", "scanned_at"],
+    )
+    op.create_index(
+        "ix_inventory_history_product_scanned_at",
+        "inventory_history",
+        ["product_id", "scanned_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_inventory_history_product_scanned_at", "inventory_history")
+    op.drop_index("ix_inventory_history_zone_scanned_at", "inventory_history")
+    op.drop_index("ix_inventory_history_status_scanned_at", "inventory_history")
+    op.drop_index("ix_inventory_history_scanned_at_id", "inventory_history")
@@ -0,0 +1,168 @@
+"""Партиционирование inventory_history по scanned_at
+
+Таблица пересоздается как PARTITION BY RANGE (scanned_at), данные
+переносятся в секции. Первичный ключ секционированной таблицы обязан
+включать ключ секционирования, поэтому в БД он (id, scanned_at); id
+по-прежнему выдается той же последовательностью и уникален, ORM-модель
+не меняется. Индексы из 0002 создаются на родительской таблице и
+наследуются секциями.
+
+Перенос данных идет одним INSERT ... SELECT под эксклюзивной
+блокировкой: на больших таблицах миграцию стоит запускать в окно
+обслуживания.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from datetime import datetime, timedelta, timezone
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.db.partitions import (
+    INTERVALS,
+    default_partition_ddl,
+    ensure_partitions,
+    partition_ddl,
+    partition_name,
+    partition_ranges,
+)
+from settings import settings
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, robot_id, product_id, quantity, zone, row_number, "
+    "shelf_number, status, scanned_at, created_at"
+)
+
+
+def history_columns():
+    return [
+        sa.Column(
+            "id",
+            sa.Integer,
+            server_default=sa.text("nextval('inventory_history_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("robot_id", sa.String(50)),
+        sa.Column("product_id", sa.String(50), nullable=True),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("zone", sa.String(10), nullable=False),
+        sa.Column("row_number", sa.Integer),
+        sa.Column("shelf_number", sa.Integer, nullable=True),
+        sa.Column("status", sa.String(50)),
+        sa.Column("scanned_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.ForeignKeyConstraint(
+            ["robot_id"], ["robots.id"], name="inventory_history_robot_id_fkey"
+        ),
+        sa.ForeignKeyConstraint(
+            ["product_id"], ["products.id"], name="inventory_history_product_id_fkey"
+        ),
+    ]
+
+
+def create_history_indexes():
+    op.create_index(
+        "ix_inventory_history_scanned_at_id",
+        "inventory_history",
+        [sa.text("scanned_at DESC"), sa.text("id DESC")],
+        postgresql_include=["status"],
+    )
+    op.create_index(
+        "ix_inventory_history_status_scanned_at",
+        "inventory_history",
+        ["status", "scanned_at"],
+    )
+    op.create_index(
+        "ix_inventory_history_zone_scanned_at",
+        "inventory_history",
+        ["zone", "scanned_at"],
+    )
+    op.create_index(
+        "ix_inventory_history_product_scanned_at",
+        "inventory_history",
+        ["product_id", "scanned_at"],
+    )
+
+
+def drop_history_indexes(table):
+    for name in (
+        "ix_inventory_history_product_scanned_at",
+        "ix_inventory_history_zone_scanned_at",
+        "ix_inventory_history_status_scanned_at",
+        "ix_inventory_history_scanned_at_id",
+    ):
+        op.drop_index(name, table)
+
+
+def upgrade():
+    op.rename_table("inventory_history", "inventory_history_legacy")
+    op.execute(
+        "ALTER TABLE inventory_history_legacy "
+        "RENAME CONSTRAINT inventory_history_pkey TO inventory_history_legacy_pkey"
+    )
+    drop_history_indexes("inventory_history_legacy")
+    # Последовательность переживет удаление старой таблицы
+    op.execute("ALTER SEQUENCE inventory_history_id_seq OWNED BY NONE")
+
+    op.create_table(
+        "inventory_history",
+        *history_columns(),
+        sa.PrimaryKeyConstraint("id", "scanned_at", name="inventory_history_pkey"),
+        postgresql_partition_by="RANGE (scanned_at)",
+    )
+    create_history_indexes()
+
+    interval = settings.HISTORY_PARTITION_INTERVAL
+    now = datetime.now(timezone.utc)
+    until = now + INTERVALS[interval] * settings.HISTORY_PARTITION_PREMAKE
+    op.execute(default_partition_ddl())
+    if context.is_offline_mode():
+        # Без соединения не узнать диапазон данных: только секции вперед,
+        # старые строки лягут в DEFAULT и переедут при создании секций
+        for start, end in partition_ranges(now, until, interval):
+            op.execute(partition_ddl(start, end, partition_name(start, interval)))
+    else:
+        bind = op.get_bind()
+        oldest = bind.execute(
+            sa.text("SELECT min(scanned_at) FROM inventory_history_legacy")
+        ).scalar()
+        ensure_partitions(bind, oldest or now, until, interval)
+
+    op.execute(
+        f"INSERT INTO inventory_history ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM inventory_history_legacy"
+    )
+    op.drop_table("inventory_history_legacy")
+    op.execute("ALTER SEQUENCE inventory_history_id_seq OWNED BY inventory_history.id")
+
+
+def downgrade():
+    # Отсоединенные по политике хранения секции не возвращаются
+    op.execute("ALTER SEQUENCE inventory_history_id_seq OWNED BY NONE")
+    op.create_table(
+        "inventory_history_plain",
+        *history_columns(),
+        sa.PrimaryKeyConstraint("id", name="inventory_history_plain_pkey"),
+    )
+    op.execute(
+        f"INSERT INTO inventory_history_plain ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM inventory_history"
+    )
+    op.drop_table("inventory_history")
+    op.rename_table("inventory_history_plain", "inventory_history")
+    op.execute(
+        "ALTER TABLE inventory_history "
+        "RENAME CONSTRAINT inventory_history_plain_pkey TO inventory_history_pkey"
+    )
+    create_history_indexes()
+    op.execute("ALTER SEQUENCE inventory_history_id_seq OWNED BY inventory_history.id")
@@ -0,0 +1,50 @@
+"""Таблица current_ai_predictions: последнее предсказание по товару
+
+Заполняется из накопленных ai_predictions через DISTINCT ON, дальше ее
+поддерживает DataBaseManager.add_ai_prediction.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "current_ai_predictions",
+        sa.Column(
+            "product_id", sa.String(50), sa.ForeignKey("products.id"), primary_key=True
+        ),
+        sa.Column("prediction_id", sa.Integer, sa.ForeignKey("ai_predictions.id")),
+        sa.Column("prediction_date", sa.Date, nullable=False),
+        sa.Column("days_until_stockout", sa.Integer),
+        sa.Column("recommended_order", sa.Integer),
+        sa.Column("confidence_score", sa.DECIMAL(3, 2)),
+        sa.Column("updated_at", sa.DateTime),
+    )
+    op.execute(
+        """
+        INSERT INTO current_ai_predictions (
+            product_id, prediction_id, prediction_date, days_until_stockout,
+            recommended_order, confidence_score, updated_at
+        )
+        SELECT DISTINCT ON (product_id)
+            product_id, id, prediction_date, days_until_stockout,
+            recommended_order, confidence_score, created_at
+        FROM ai_predictions
+        WHERE product_id IS NOT NULL
+        ORDER BY product_id, prediction_date DESC, id DESC
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("current_ai_predictions")
@@ -0,0 +1,33 @@
+"""Хеш входных данных предсказания в ai_predictions
+
+input_hash — sha256 нормализованных данных, по которым LLM дал
+предсказание (app/core/ai/prediction_cache.py). Индекс нужен для поиска
+готовых предсказаний по тем же данным, когда в Redis их уже нет.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("ai_predictions", sa.Column("input_hash", sa.String(64)))
+    op.create_index(
+        "ix_ai_predictions_input_hash",
+        "ai_predictions",
+        ["input_hash", sa.text("id DESC")],
+        postgresql_where=sa.text("input_hash IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_ai_predictions_input_hash", table_name="ai_predictions")
+    op.drop_column("ai_predictions", "input_hash")
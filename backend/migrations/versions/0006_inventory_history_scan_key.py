@@ -0,0 +1,45 @@
+"""Уникальный ключ сканирования робота в inventory_history
+
+(robot_id, scanned_at, product_id) — естественный ключ строки отчета
+робота: повтор POST после обрыва связи не должен добавлять вторую строку
+(add_robot_data_batch пишет с ON CONFLICT DO NOTHING). scanned_at — ключ
+секционирования, поэтому уникальный индекс допустим на секционированной
+таблице и наследуется секциями. Строки CSV импорта (robot_id NULL) ключ не
+ограничивает.
+
+Перед созданием индекса удаляются уже накопившиеся дубли (остается строка
+с меньшим id). Индекс строится без CONCURRENTLY под блокировкой записи: на
+больших таблицах миграцию стоит запускать в окно обслуживания.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM inventory_history AS dup "
+        "USING inventory_history AS kept "
+        "WHERE dup.robot_id = kept.robot_id "
+        "AND dup.scanned_at = kept.scanned_at "
+        "AND dup.product_id = kept.product_id "
+        "AND dup.id > kept.id"
+    )
+    op.create_index(
+        "ux_inventory_history_robot_scan",
+        "inventory_history",
+        ["robot_id", "scanned_at", "product_id"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ux_inventory_history_robot_scan", table_name="inventory_history")
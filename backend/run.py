@@ -10,6 +10,8 @@ if __name__ == "__main__":
         "backend.app.main:app",
         host="0.0.0.0",
         port=settings.API_PORT,
-        log_level="info"
+        log_level="info",
+        # Сжатие фреймов, если клиент его предлагает при рукопожатии
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
     )
 
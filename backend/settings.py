@@ -26,6 +26,22 @@ class Settings(BaseSettings):
     YANDEX_MODEL: str = Field(default="gpt://b1grt4ckppkm30rupg8p/yandexgpt-lite", description="Yandex GPT model name", alias="YANDEX_MODEL")
     TEMPERATURE_MODEL: float = Field(default=0.1, description="Temperature model", alias="TEMPERATURE_MODEL")
     MAX_TOKENS: int = Field(default=2000, description="Max tokens", alias="MAX_TOKENS")
+    YANDEX_MAX_CONCURRENCY: int = Field(default=4, description="Concurrent YandexGPT requests (and pooled connections)", alias="YANDEX_MAX_CONCURRENCY")
+    YANDEX_MAX_RETRIES: int = Field(default=3, description="Retries on 429/5xx and network errors", alias="YANDEX_MAX_RETRIES")
+    YANDEX_BACKOFF_BASE: float = Field(default=0.5, description="Base of the jittered exponential backoff, seconds", alias="YANDEX_BACKOFF_BASE")
+    YANDEX_BACKOFF_MAX: float = Field(default=8.0, description="Maximum backoff between retries, seconds", alias="YANDEX_BACKOFF_MAX")
+    YANDEX_CONNECT_TIMEOUT: float = Field(default=10.0, description="YandexGPT connect timeout, seconds", alias="YANDEX_CONNECT_TIMEOUT")
+    YANDEX_READ_TIMEOUT: float = Field(default=30.0, description="YandexGPT read timeout, seconds", alias="YANDEX_READ_TIMEOUT")
+    YANDEX_BREAKER_THRESHOLD: int = Field(default=5, description="Consecutive failed calls that open the circuit breaker", alias="YANDEX_BREAKER_THRESHOLD")
+    YANDEX_BREAKER_RESET: float = Field(default=30.0, description="Seconds the breaker stays open before a trial call", alias="YANDEX_BREAKER_RESET")
+    PREDICTION_CHUNK_TOKENS: int = Field(default=1500, description="Estimated prompt tokens per AI prediction chunk", alias="PREDICTION_CHUNK_TOKENS")
+    PREDICTION_WORKER_ENABLED: bool = Field(default=True, description="Refresh AI predictions in the background instead of on request", alias="PREDICTION_WORKER_ENABLED")
+    PREDICTION_REFRESH_INTERVAL: float = Field(default=3600.0, description="Seconds between background AI prediction refreshes", alias="PREDICTION_REFRESH_INTERVAL")
+    PREDICTION_ENGINE: str = Field(default="llm", description="Prediction engine: llm (with local fallback) or statistical", alias="PREDICTION_ENGINE")
+    PREDICTION_HISTORY_DAYS: int = Field(default=14, description="Days of inventory history used by the local forecaster", alias="PREDICTION_HISTORY_DAYS")
+    PREDICTION_CHECK_INTERVAL: float = Field(default=60.0, description="Seconds between checks of LLM prediction inputs; the LLM is called only when they change", alias="PREDICTION_CHECK_INTERVAL")
+    PREDICTION_CACHE_TTL: int = Field(default=86400, description="Redis TTL of cached LLM predictions by input hash, seconds", alias="PREDICTION_CACHE_TTL")
+    PREDICTION_STALE_AFTER: float = Field(default=7200.0, description="Age in seconds after which /ai/predict triggers a background refresh", alias="PREDICTION_STALE_AFTER")
     
     REDIS_HOST: str = Field(default="localhost", description="Redis host", alias="REDIS_HOST")
     REDIS_DB: int = Field(default=0, description="Redis DB", alias="REDIS_DB")
@@ -35,6 +51,30 @@ class Settings(BaseSettings):
     DEFAULT_ADMIN_EMAIL: str = Field(default="admin@admin.com", alias="DEFAULT_ADMIN_EMAIL")
     DEFAULT_ADMIN_PASSWORD: str = Field(default="admin1234", alias="DEFAULT_ADMIN_PASSWORD")
 
+    INGEST_BATCH_SIZE: int = Field(default=200, description="Max robot reports per flush", alias="INGEST_BATCH_SIZE")
+    INGEST_FLUSH_INTERVAL: float = Field(default=0.5, description="Max seconds a report waits in the ingestion queue", alias="INGEST_FLUSH_INTERVAL")
+    INGEST_QUEUE_MAXSIZE: int = Field(default=10000, description="Ingestion queue capacity before rejecting reports", alias="INGEST_QUEUE_MAXSIZE")
+    INGEST_DEDUP_SIZE: int = Field(default=50000, description="Recent report keys remembered to drop robot retries before the DB, 0 disables", alias="INGEST_DEDUP_SIZE")
+    IMPORT_CHUNK_ROWS: int = Field(default=50000, description="CSV rows parsed and committed per chunk during inventory import", alias="IMPORT_CHUNK_ROWS")
+    IMPORT_MAX_JOBS: int = Field(default=2, description="Background CSV imports running at the same time", alias="IMPORT_MAX_JOBS")
+    IMPORT_JOB_TTL: int = Field(default=86400, description="Seconds an import job state is kept in Redis", alias="IMPORT_JOB_TTL")
+
+    DASHBOARD_RECONCILE_INTERVAL: float = Field(default=60.0, description="Seconds between dashboard state reconciliations with the DB", alias="DASHBOARD_RECONCILE_INTERVAL")
+
+    HISTORY_PARTITION_INTERVAL: str = Field(default="day", description="inventory_history partition size: day or week", alias="HISTORY_PARTITION_INTERVAL")
+    HISTORY_PARTITION_PREMAKE: int = Field(default=7, description="Partitions created ahead of time", alias="HISTORY_PARTITION_PREMAKE")
+    HISTORY_RETENTION_DAYS: int = Field(default=0, description="Opt-in retention: partitions older than this many days are detached or dropped (HISTORY_RETENTION_ACTION) and vanish from history and statistics; 0 (default) keeps everything", alias="HISTORY_RETENTION_DAYS")
+    HISTORY_RETENTION_ACTION: str = Field(default="detach", description="What to do with expired partitions: detach or drop", alias="HISTORY_RETENTION_ACTION")
+    HISTORY_PARTITION_CHECK_INTERVAL: float = Field(default=3600.0, description="Seconds between partition maintenance runs", alias="HISTORY_PARTITION_CHECK_INTERVAL")
+
+    WS_SEND_TIMEOUT: float = Field(default=2.0, description="Seconds a WebSocket send may take before the client is evicted", alias="WS_SEND_TIMEOUT")
+    WS_SEND_QUEUE_SIZE: int = Field(default=32, description="Messages queued per WebSocket client before it is evicted as too slow", alias="WS_SEND_QUEUE_SIZE")
+    WS_PER_MESSAGE_DEFLATE: bool = Field(default=True, description="Accept permessage-deflate compression when the WebSocket client offers it", alias="WS_PER_MESSAGE_DEFLATE")
+    WS_PUSH_MIN_INTERVAL: float = Field(default=0.25, description="Seconds dashboard change events are coalesced before one WebSocket push", alias="WS_PUSH_MIN_INTERVAL")
+    WS_PUSH_IDLE_INTERVAL: float = Field(default=30.0, description="Seconds between snapshot checks when no change events arrive", alias="WS_PUSH_IDLE_INTERVAL")
+    WS_CLUSTER_ENABLED: bool = Field(default=False, description="Fan out dashboard updates across workers via Redis pub/sub", alias="WS_CLUSTER_ENABLED")
+    WS_CLUSTER_LEASE_MS: int = Field(default=5000, description="Dashboard leader lease in milliseconds", alias="WS_CLUSTER_LEASE_MS")
+
 
 class CacheNamespace(BaseModel):
     predict_list: str = "predict_list"
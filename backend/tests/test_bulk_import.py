@@ -0,0 +1,141 @@
+import asyncio
+import io
+import pandas as pd
+import pytest
+from datetime import datetime, timezone
+from app.db.bulk_import import (
+    COPY_COLUMNS,
+    DIALECTS,
+    copy_history_rows,
+    derive_status,
+    distinct_products,
+    ingested_rows,
+    normalize_inventory_frame,
+    parse_dates,
+)
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+CSV = """product_id;product_name;quantity;zone;row;shelf;date
+TEL-0001;Phone;12;A;3;2;2026-10-17T08:30:00Z
+ TEL-0002 ;;7.0;B;;;2026-10-16
+;Orphan;5;A;1;1;2026-10-17T08:00:00
+TEL-0003;Cable;many;A;1;1;2026-10-17T08:00:00
+TEL-0001;Phone renamed;4;C;1;5;not a date
+TEL-0004;Charger;3;;1;1;2026-10-17T08:00:00
+"""
+
+
+def read(csv=CSV):
+    return pd.read_csv(io.StringIO(csv), delimiter=";", dtype=str)
+
+
+class FakeDriverConnection:
+    def __init__(self):
+        self.copied = None
+
+    async def copy_records_to_table(self, table, records, columns, schema_name):
+        self.copied = (table, list(records), columns, schema_name)
+
+
+class FakeRawConnection:
+    def __init__(self):
+        self.driver_connection = FakeDriverConnection()
+
+
+class FakeConnection:
+    def __init__(self):
+        self.raw = FakeRawConnection()
+
+    async def get_raw_connection(self):
+        return self.raw
+
+
+@pytest.mark.unit
+class TestBulkImport:
+    """Тесты векторной подготовки и COPY массового импорта."""
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        frame, errors = normalize_inventory_frame(read(), now=NOW)
+
+        assert list(frame["product_id"]) == ["TEL-0001", "TEL-0002", "TEL-0001"]
+        assert errors == [
+            "Row 3: Missing product_id",
+            "Row 4: Invalid quantity",
+            "Row 6: Missing zone",
+        ]
+
+    def test_columns_are_normalized(self):
+        frame, _ = normalize_inventory_frame(read(), status="OK", now=NOW)
+
+        assert frame["quantity"].tolist() == [12, 7, 4]
+        assert frame["row_number"].tolist()[0] == 3
+        assert frame["shelf_number"].isna().tolist() == [False, True, False]
+        assert frame["product_name"].tolist()[1] == "Unknown Product"
+        assert frame["scanned_at"].tolist() == [
+            pd.Timestamp("2026-10-17T08:30:00Z"),
+            pd.Timestamp("2026-10-16T00:00:00Z"),
+            # Нераспознанная дата — время импорта
+            pd.Timestamp(NOW),
+        ]
+        assert distinct_products(frame) == {
+            "TEL-0001": "Phone",
+            "TEL-0002": "Unknown Product",
+        }
+
+    def test_copy_sends_python_values_in_column_order(self):
+        frame, _ = normalize_inventory_frame(read(), status="OK", now=NOW)
+        connection = FakeConnection()
+
+        asyncio.run(copy_history_rows(connection, frame, [101, 102, 103]))
+
+        table, records, columns, schema = connection.raw.driver_connection.copied
+        assert table == "inventory_history" and schema is None
+        assert columns == COPY_COLUMNS
+        first = dict(zip(columns, records[0]))
+        assert first["id"] == 101 and first["robot_id"] is None
+        assert type(first["quantity"]) is int and type(first["row_number"]) is int
+        assert first["scanned_at"] == datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+        assert dict(zip(columns, records[1]))["shelf_number"] is None
+
+    def test_event_contains_only_recent_rows(self):
+        frame, _ = normalize_inventory_frame(read(), now=NOW)
+
+        rows = ingested_rows(
+            frame, [101, 102, 103], since=datetime(2026, 10, 17, tzinfo=timezone.utc)
+        )
+
+        assert [row["id"] for row in rows] == [101, 103]
+        assert rows[0]["status"] == "OK" and rows[0]["robot_id"] is None
+        assert isinstance(rows[0]["scanned_at"], datetime)
+
+    def test_dates_are_tried_in_dialect_format_order(self):
+        dates = pd.Series(
+            ["2026-10-17T08:30:00+03:00", "2026-10-16", "17.10.2026", "bad", None],
+            dtype="string",
+        )
+
+        parsed = parse_dates(dates, DIALECTS["robot_csv"].date_formats)
+
+        assert parsed.tolist()[:3] == [
+            pd.Timestamp("2026-10-17T05:30:00Z"),
+            pd.Timestamp("2026-10-16T00:00:00Z"),
+            pd.Timestamp("2026-10-17T00:00:00Z"),
+        ]
+        assert parsed.isna().tolist()[3:] == [True, True]
+        # Формат по умолчанию — только ISO
+        assert parse_dates(dates, DIALECTS["default"].date_formats).isna().sum() == 3
+
+    def test_status_is_derived_from_product_stock_levels(self):
+        frame, _ = normalize_inventory_frame(
+            read(), status=None, now=NOW, date_formats=("ISO8601", "%d.%m.%Y")
+        )
+        assert frame["status"].isna().all()
+        levels = pd.DataFrame(
+            [("TEL-0001", 5, 20)], columns=["product_id", "min_stock", "optimal_stock"]
+        )
+
+        status = derive_status(frame, levels, DIALECTS["robot_csv"])
+
+        # TEL-0001: 12 < 20 и 4 <= 5; TEL-0002 без записи: 7 <= 10 из диалекта
+        assert status.tolist() == ["LOW_STOCK", "CRITICAL", "CRITICAL"]
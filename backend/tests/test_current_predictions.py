@@ -0,0 +1,187 @@
+import asyncio
+import pandas as pd
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from app.core.ai.forecaster import StockForecaster
+from app.db.DataBaseManager import MAX_QUERY_PARAMS, db
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+
+class FakeSession(RecordingSession):
+    """Сессия add_ai_prediction: id новым строкам назначает flush"""
+
+    def __init__(self):
+        super().__init__()
+        self.added = []
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def flush(self):
+        for index, obj in enumerate(self.added, start=1):
+            obj.id = index
+
+    async def commit(self):
+        self.committed = True
+
+
+def history_row(**overrides):
+    row = {
+        "id": 1,
+        "robot_id": "RB-001",
+        "product_id": "TEL-4567",
+        "product_name": "Роутер",
+        "quantity": 40,
+        "zone": "A",
+        "shelf_number": 3,
+        "status": "OK",
+        "scanned_at": datetime(2025, 10, 26, 12, 0),
+        "predicted_product_id": None,
+        "recommended_order": None,
+        "confidence_score": None,
+    }
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+@pytest.mark.unit
+class TestCurrentPredictions:
+    """Тесты текущего AI предсказания по товару в истории."""
+
+    def test_history_query_joins_current_predictions(self):
+        sql = str(db._inventory_history_query().compile(dialect=postgresql.dialect()))
+
+        assert "LEFT OUTER JOIN current_ai_predictions" in sql
+        assert "ai_predictions.id" not in sql
+
+    def test_record_with_prediction(self):
+        row = history_row(
+            predicted_product_id="TEL-4567",
+            recommended_order=100,
+            confidence_score=Decimal("0.75"),
+        )
+
+        record = db._history_record(row)
+
+        assert record["recommended_order"] == 100
+        assert record["discrepancy"] == 60
+        assert record["prediction_confidence"] == Decimal("0.75")
+
+    def test_record_without_prediction(self):
+        record = db._history_record(history_row())
+
+        assert record["recommended_order"] == 0
+        assert record["discrepancy"] == 40
+        assert record["prediction_confidence"] is None
+
+    def test_only_latest_prediction_per_product_is_upserted(self):
+        predictions = [
+            SimpleNamespace(
+                id=1,
+                product_id="TEL-4567",
+                prediction_date=datetime(2025, 10, 25, 9, 0),
+                days_until_stockout=5,
+                recommended_order=10,
+                confidence_score=0.75,
+            ),
+            SimpleNamespace(
+                id=2,
+                product_id="TEL-4567",
+                prediction_date=datetime(2025, 10, 26, 9, 0),
+                days_until_stockout=3,
+                recommended_order=20,
+                confidence_score=0.75,
+            ),
+            SimpleNamespace(
+                id=3,
+                product_id="TEL-8901",
+                prediction_date=date(2025, 10, 26),
+                days_until_stockout=7,
+                recommended_order=30,
+                confidence_score=0.75,
+            ),
+        ]
+        session = RecordingSession()
+
+        asyncio.run(db._update_current_predictions(session, predictions))
+
+        (statement,) = session.statements
+        params = statement.compile(dialect=postgresql.dialect()).params
+        rows = {
+            params[f"product_id_m{i}"]: params[f"prediction_id_m{i}"] for i in range(2)
+        }
+        assert rows == {"TEL-4567": 2, "TEL-8901": 3}
+        assert params["prediction_date_m0"] == date(2025, 10, 26)
+
+    def test_nothing_to_upsert(self):
+        session = RecordingSession()
+
+        asyncio.run(db._update_current_predictions(session, []))
+
+        assert session.statements == []
+
+    def test_large_upsert_is_split_under_parameter_limit(self):
+        predictions = [
+            SimpleNamespace(
+                id=i,
+                product_id=f"TEL-{i:05d}",
+                prediction_date=datetime(2025, 10, 26, 9, 0),
+                days_until_stockout=3,
+                recommended_order=20,
+                confidence_score=0.5,
+            )
+            for i in range(5000)
+        ]
+        session = RecordingSession()
+
+        asyncio.run(db._update_current_predictions(session, predictions))
+
+        params = [
+            statement.compile(dialect=postgresql.dialect()).params
+            for statement in session.statements
+        ]
+        assert len(session.statements) > 1
+        assert all(len(batch) <= MAX_QUERY_PARAMS for batch in params)
+        assert sum(len(batch) for batch in params) == 5000 * 7
+
+    def test_whole_catalog_forecast_is_saved(self, monkeypatch):
+        catalog = pd.DataFrame(
+            {
+                "product_id": [f"TEL-{i:05d}" for i in range(6000)],
+                "min_stock": 10,
+                "optimal_stock": 100,
+            }
+        )
+        predictions = StockForecaster().predict(
+            pd.DataFrame(columns=["product_id", "quantity"]), catalog
+        )
+        session = FakeSession()
+        monkeypatch.setattr(db, "DBSession", lambda: session)
+
+        saved = asyncio.run(db.add_ai_prediction(predictions))
+
+        assert len(saved) == 6000
+        assert session.committed
+        upserted = [
+            statement.compile(dialect=postgresql.dialect()).params
+            for statement in session.statements
+        ]
+        assert all(len(params) <= MAX_QUERY_PARAMS for params in upserted)
+        assert sum(len(params) for params in upserted) == 6000 * 7
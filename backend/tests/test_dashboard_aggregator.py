@@ -0,0 +1,195 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from app.core.dashboard import aggregator as aggregator_module
+from app.core.dashboard.aggregator import DashboardAggregator
+
+
+def make_robot(robot_id, status="active", battery=80, zone="A"):
+    return {
+        "id": robot_id,
+        "status": status,
+        "battery_level": battery,
+        "last_update": datetime.now(timezone.utc),
+        "current_zone": zone,
+        "current_row": 1,
+        "current_shelf": 1,
+    }
+
+
+def make_scan(scan_id, status="OK", scanned_at=None, product_id="TEL-0001"):
+    return {
+        "id": scan_id,
+        "robot_id": "RB-0001",
+        "product_id": product_id,
+        "quantity": 5,
+        "zone": "A",
+        "shelf_number": 1,
+        "status": status,
+        "scanned_at": scanned_at or datetime.now(timezone.utc),
+    }
+
+
+@pytest.mark.unit
+class TestDashboardAggregator:
+    """Тесты инкрементального состояния дашборда."""
+
+    @pytest.fixture
+    def aggregator(self):
+        aggregator = DashboardAggregator(recent_limit=3)
+        aggregator.load(
+            {
+                "active_robots": 1,
+                "total_robots": 2,
+                "scanned_today": 10,
+                "critical_stocks": 2,
+                "average_battery": 60.0,
+                "robots": [
+                    make_robot("RB-0001", battery=60),
+                    make_robot("RB-0002", status="low_battery", battery=10),
+                ],
+                "recent_scans": [],
+            }
+        )
+        return aggregator
+
+    def test_load_matches_db_statistics(self, aggregator):
+        stats = aggregator.snapshot()["statistics"]
+
+        assert stats == {
+            "active_robots": 1,
+            "total_robots": 2,
+            "scanned_today": 10,
+            "critical_stocks": 2,
+            "average_battery": 60.0,
+        }
+
+    def test_apply_ingested_updates_counters_and_battery(self, aggregator):
+        aggregator.apply_ingested(
+            [make_robot("RB-0002", battery=90), make_robot("RB-0003", battery=30)],
+            [make_scan(1), make_scan(2, status="CRITICAL")],
+        )
+
+        stats = aggregator.snapshot()["statistics"]
+        assert stats["active_robots"] == 3
+        assert stats["total_robots"] == 3
+        assert stats["scanned_today"] == 12
+        assert stats["critical_stocks"] == 3
+        assert stats["average_battery"] == 60.0
+
+    def test_recent_scans_ring_buffer_keeps_newest(self, aggregator):
+        now = datetime.now(timezone.utc)
+        scans = [make_scan(i, scanned_at=now - timedelta(seconds=10 - i)) for i in range(5)]
+
+        aggregator.apply_ingested([], scans)
+
+        recent = aggregator.snapshot()["recent_scans"]
+        assert [scan["id"] for scan in recent] == [4, 3, 2]
+
+    def test_old_scans_do_not_count_for_today(self, aggregator):
+        two_days_ago = datetime.now(timezone.utc) - timedelta(days=2)
+
+        aggregator.apply_ingested([], [make_scan(1, scanned_at=two_days_ago)])
+
+        assert aggregator.snapshot()["statistics"]["scanned_today"] == 10
+
+    def test_snapshot_is_cached_until_version_changes(self, aggregator):
+        first = aggregator.snapshot()
+        assert aggregator.snapshot() is first
+
+        aggregator.apply_ingested([], [make_scan(1)])
+        assert aggregator.snapshot() is not first
+
+    def test_snapshot_version_moves_only_on_rebuild(self, aggregator):
+        aggregator.snapshot()
+        version = aggregator.snapshot_version
+        aggregator.snapshot()
+        assert aggregator.snapshot_version == version
+
+        aggregator.apply_ingested([], [make_scan(1)])
+        aggregator.snapshot()
+        assert aggregator.snapshot_version == version + 1
+
+    def test_reconcile_rereads_when_ingested_during_read(self, aggregator, monkeypatch):
+        reads = []
+
+        async def get_dashboard_data():
+            reads.append(1)
+            if len(reads) == 1:
+                # Данные записаны и применены, пока чтение БД еще идет
+                aggregator.apply_ingested([], [make_scan(1)])
+                return self.db_data(scanned=10)
+            return self.db_data(scanned=11)
+
+        monkeypatch.setattr(
+            aggregator_module.db, "get_dashboard_data", get_dashboard_data
+        )
+        asyncio.run(aggregator.reconcile())
+
+        assert len(reads) == 2
+        assert aggregator.snapshot()["statistics"]["scanned_today"] == 11
+
+    def test_reconcile_keeps_state_when_it_keeps_changing(
+        self, aggregator, monkeypatch
+    ):
+        async def get_dashboard_data():
+            aggregator.apply_ingested([], [make_scan(1)])
+            return self.db_data(scanned=0)
+
+        monkeypatch.setattr(
+            aggregator_module.db, "get_dashboard_data", get_dashboard_data
+        )
+        asyncio.run(aggregator.reconcile())
+
+        # Устаревший снимок не затер примененные события
+        stats = aggregator.snapshot()["statistics"]
+        assert stats["scanned_today"] == 10 + aggregator_module.RECONCILE_ATTEMPTS
+
+    @staticmethod
+    def db_data(scanned):
+        return {
+            "active_robots": 1,
+            "total_robots": 1,
+            "scanned_today": scanned,
+            "critical_stocks": 2,
+            "average_battery": 60.0,
+            "robots": [make_robot("RB-0001", battery=60)],
+            "recent_scans": [],
+        }
+
+    def test_active_robot_without_battery_counts_as_active(self, aggregator):
+        aggregator.apply_ingested([make_robot("RB-0003", battery=None)], [])
+
+        stats = aggregator.snapshot()["statistics"]
+        # Как COUNT(*) FILTER и AVG в SQL: активен, но в среднем не участвует
+        assert stats["active_robots"] == 2
+        assert stats["average_battery"] == 60.0
+
+        aggregator.apply_ingested([make_robot("RB-0003", battery=20)], [])
+
+        stats = aggregator.snapshot()["statistics"]
+        assert stats["active_robots"] == 2
+        assert stats["average_battery"] == 40.0
+
+    def test_periodic_reconcile_runs_only_on_cluster_leader(self, monkeypatch):
+        aggregator = DashboardAggregator(reconcile_interval=0.01)
+        aggregator.cluster = SimpleNamespace(is_leader=False)
+        calls = []
+
+        async def reconcile():
+            calls.append(aggregator.cluster.is_leader)
+
+        monkeypatch.setattr(aggregator, "reconcile", reconcile)
+
+        async def scenario():
+            task = asyncio.create_task(aggregator._run_reconciler())
+            await asyncio.sleep(0.05)
+            aggregator.cluster.is_leader = True
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(scenario())
+
+        # Ведомый не ходит в БД, лидер сверяется по расписанию
+        assert calls and all(calls)
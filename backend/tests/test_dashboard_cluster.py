@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from app.api.v1.dashboard.cluster import DashboardCluster, decode_ingested
+from app.api.v1.dashboard.encoding import encode_json
+from app.api.v1.dashboard.websocket_manager import WebSocketConnectionManager
+from app.core.dashboard import aggregator
+
+
+class FakeRedis:
+    """Минимум команд Redis для аренды лидера (без истечения TTL)"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def eval(self, script, numkeys, key, owner, *args):
+        if self.data.get(key) != owner:
+            return 0
+        if "del" in script:
+            del self.data[key]
+        return 1
+
+
+@pytest.fixture
+def no_reconcile(monkeypatch):
+    async def reconcile():
+        pass
+
+    monkeypatch.setattr(aggregator.dashboard_state, "reconcile", reconcile)
+
+
+@pytest.mark.unit
+class TestDashboardCluster:
+    """Тесты лидерства и обработки сообщений кластера дашборда."""
+
+    def test_single_leader_and_failover(self, no_reconcile):
+        redis = FakeRedis()
+        first = DashboardCluster(WebSocketConnectionManager(), prefix="test")
+        second = DashboardCluster(WebSocketConnectionManager(), prefix="test")
+        first.redis = second.redis = redis
+
+        async def scenario():
+            assert await first.try_acquire_lease()
+            assert not await second.try_acquire_lease()
+            # Продление своей аренды
+            assert await first.try_acquire_lease()
+            # Лидер уходит и освобождает аренду
+            await redis.eval("del", 1, first.leader_key, first.instance_id)
+            first.is_leader = False
+            assert await second.try_acquire_lease()
+
+        asyncio.run(scenario())
+
+        assert redis.data[second.leader_key] == second.instance_id
+
+    def test_lost_lease_is_detected(self, no_reconcile):
+        redis = FakeRedis()
+        cluster = DashboardCluster(WebSocketConnectionManager(), prefix="test")
+        cluster.redis = redis
+
+        async def scenario():
+            await cluster.try_acquire_lease()
+            redis.data[cluster.leader_key] = "someone-else"
+            return await cluster.try_acquire_lease()
+
+        assert asyncio.run(scenario()) is False
+
+    def test_state_message_is_cached_and_broadcast(self):
+        manager = WebSocketConnectionManager()
+        cluster = DashboardCluster(manager, prefix="test")
+        broadcasts = []
+
+        async def broadcast_state(version, state, base_version, delta):
+            broadcasts.append((version, base_version))
+
+        manager.broadcast_state = broadcast_state
+        message = encode_json(
+            {"version": "t:2", "base_version": "t:1", "state": {"a": 1}, "delta": None}
+        )
+
+        asyncio.run(cluster._handle_message(cluster.state_channel, message))
+
+        assert cluster.latest == ("t:2", {"a": 1})
+        assert broadcasts == [("t:2", "t:1")]
+
+    def test_leader_applies_relayed_ingest(self, monkeypatch):
+        cluster = DashboardCluster(WebSocketConnectionManager(), prefix="test")
+        cluster.is_leader = True
+        applied = []
+        monkeypatch.setattr(
+            aggregator.dashboard_state,
+            "apply_ingested",
+            lambda robots, rows: applied.append((robots, rows)),
+        )
+        scanned_at = datetime(2025, 10, 26, 12, 0, tzinfo=timezone.utc)
+        message = encode_json(
+            {
+                "source": "other-worker",
+                "robots": [],
+                "history_rows": [{"id": 1, "scanned_at": scanned_at}],
+            }
+        )
+
+        asyncio.run(cluster._handle_message(cluster.ingest_channel, message))
+
+        assert applied == [([], [{"id": 1, "scanned_at": scanned_at}])]
+
+    def test_decode_ingested_restores_datetimes(self):
+        last_update = datetime(2025, 10, 26, 12, 0, tzinfo=timezone.utc)
+        payload = {
+            "robots": [{"id": "RB-0001", "last_update": str(last_update)}],
+            "history_rows": [{"id": 1, "scanned_at": None}],
+        }
+
+        decoded = decode_ingested(payload)
+
+        assert decoded["robots"][0]["last_update"] == last_update
+        assert decoded["history_rows"][0]["scanned_at"] is None
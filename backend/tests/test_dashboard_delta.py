@@ -0,0 +1,69 @@
+import copy
+import pytest
+from app.core.dashboard.delta import diff_states
+
+
+def make_state(scan_ids=(3, 2, 1)):
+    return {
+        "statistics": {
+            "active_robots": 2,
+            "total_robots": 2,
+            "scanned_today": 10,
+            "critical_stocks": 1,
+            "average_battery": 75.0,
+        },
+        "robots": [
+            {"id": "RB-0001", "status": "active", "battery_level": 80},
+            {"id": "RB-0002", "status": "active", "battery_level": 70},
+        ],
+        "recent_scans": [{"id": scan_id, "status": "OK"} for scan_id in scan_ids],
+    }
+
+
+@pytest.mark.unit
+class TestDashboardDelta:
+    """Тесты разницы снимков дашборда для delta-протокола."""
+
+    def test_identical_states(self):
+        assert diff_states(make_state(), make_state()) is None
+
+    def test_changed_counters_only(self):
+        current = make_state()
+        current["statistics"]["scanned_today"] = 12
+
+        assert diff_states(make_state(), current) == {
+            "statistics": {"scanned_today": 12}
+        }
+
+    def test_changed_and_removed_robots(self):
+        current = make_state()
+        current["robots"][0]["battery_level"] = 60
+        del current["robots"][1]
+        current["robots"].append({"id": "RB-0003", "status": "charging", "battery_level": 5})
+
+        delta = diff_states(make_state(), current)
+
+        assert [robot["id"] for robot in delta["robots"]["upsert"]] == [
+            "RB-0001",
+            "RB-0003",
+        ]
+        assert delta["robots"]["removed"] == ["RB-0002"]
+
+    def test_appended_scans(self):
+        previous = make_state()
+        current = make_state(scan_ids=(5, 4, 3))
+
+        delta = diff_states(previous, current)
+
+        assert [scan["id"] for scan in delta["recent_scans"]["added"]] == [5, 4]
+        assert delta["recent_scans"]["limit"] == 3
+        # Клиент восстанавливает список из предыдущего и дельты
+        rebuilt = (delta["recent_scans"]["added"] + previous["recent_scans"])[:3]
+        assert rebuilt == current["recent_scans"]
+
+    def test_rebuilt_scans_are_replaced(self):
+        current = make_state(scan_ids=(3, 1))
+
+        delta = diff_states(make_state(), copy.deepcopy(current))
+
+        assert delta["recent_scans"] == {"replace": current["recent_scans"]}
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from app.api.v1.dashboard import encoding
+from app.api.v1.dashboard.encoding import Codec, to_columnar, to_columns
+from app.api.v1.dashboard.websocket_manager import WebSocketConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+ROBOTS = [
+    {"id": "RB-1", "status": "active", "current_zone": "A"},
+    {"id": "RB-2", "status": "charging", "current_zone": "B"},
+]
+
+
+@pytest.mark.unit
+class TestDashboardEncoding:
+    """Тесты согласуемых форматов сообщений WebSocket дашборда."""
+
+    def test_to_columns(self):
+        assert to_columns(ROBOTS) == {
+            "id": ["RB-1", "RB-2"],
+            "status": ["active", "charging"],
+            "current_zone": ["A", "B"],
+        }
+        assert to_columns([]) == {}
+
+    def test_columnar_delta_keeps_structure(self):
+        message = {
+            "type": "dashboard_delta",
+            "data": {
+                "statistics": {"scanned_today": 3},
+                "robots": {"upsert": ROBOTS, "removed": ["RB-3"]},
+                "recent_scans": {"added": [{"id": 1, "zone": "A"}], "limit": 20},
+            },
+        }
+
+        data = to_columnar(message)["data"]
+
+        assert data["statistics"] == {"scanned_today": 3}
+        assert data["robots"]["upsert"]["id"] == ["RB-1", "RB-2"]
+        assert data["robots"]["removed"] == ["RB-3"]
+        assert data["recent_scans"] == {"added": {"id": [1], "zone": ["A"]}, "limit": 20}
+        assert message["data"]["robots"]["upsert"] is ROBOTS
+
+    def test_negotiate_falls_back_to_json(self, monkeypatch):
+        monkeypatch.setattr(encoding, "msgpack", None)
+
+        assert Codec.negotiate("msgpack", "columns").key == ("json", "columns")
+        assert Codec.negotiate("xml", "diagonal").is_default
+        assert Codec.negotiate().is_default
+
+    def test_msgpack_is_binary(self):
+        msgpack = pytest.importorskip("msgpack")
+        codec = Codec.negotiate("msgpack")
+
+        payload = codec.encode({"type": "dashboard_update", "data": {"robots": ROBOTS}})
+
+        assert isinstance(payload, bytes)
+        assert msgpack.unpackb(payload)["data"]["robots"] == ROBOTS
+
+    def test_broadcast_encodes_once_per_codec(self):
+        plain = [FakeWebSocket(), FakeWebSocket()]
+        columnar = FakeWebSocket()
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            for client in plain:
+                await manager.connect(client)
+            await manager.connect(columnar, codec=Codec("json", "columns"))
+            await manager.broadcast_state(
+                1, {"statistics": {}, "robots": ROBOTS, "recent_scans": []}
+            )
+            await manager.drain()
+
+        asyncio.run(scenario())
+
+        assert plain[0].sent[0] is plain[1].sent[0]
+        assert json.loads(plain[0].sent[0])["data"]["robots"] == ROBOTS
+        robots = json.loads(columnar.sent[0])["data"]["robots"]
+        assert robots["id"] == ["RB-1", "RB-2"]
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import pytest
+from app.api.v1.dashboard.websocket_manager import (
+    PROTOCOL_DELTA,
+    WebSocketConnectionManager,
+    WebSocketHandler,
+)
+from app.core.dashboard.delta import diff_states
+from app.core.dashboard.subscriptions import Subscription, filter_delta, filter_state
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        pass
+
+
+def robot(robot_id, zone, battery=80):
+    return {
+        "id": robot_id,
+        "status": "active",
+        "battery_level": battery,
+        "current_zone": zone,
+    }
+
+
+def scan(scan_id, robot_id, zone, status="OK"):
+    return {"id": scan_id, "robot_id": robot_id, "zone": zone, "status": status}
+
+
+def state(robots, scans, scanned_today=0):
+    return {
+        "statistics": {"scanned_today": scanned_today},
+        "robots": robots,
+        "recent_scans": scans,
+    }
+
+
+@pytest.mark.unit
+class TestDashboardSubscriptions:
+    """Тесты подписок WebSocket-клиентов на зоны, роботов и статусы."""
+
+    def test_filter_state_by_zone_and_status(self):
+        snapshot = state(
+            [robot("RB-1", "A"), robot("RB-2", "B")],
+            [
+                scan(1, "RB-1", "A", "CRITICAL"),
+                scan(2, "RB-1", "A"),
+                scan(3, "RB-2", "B", "CRITICAL"),
+            ],
+        )
+
+        sliced = filter_state(snapshot, Subscription(zones=["A"], statuses=["critical"]))
+
+        assert [r["id"] for r in sliced["robots"]] == ["RB-1"]
+        assert [s["id"] for s in sliced["recent_scans"]] == [1]
+        assert sliced["statistics"] == snapshot["statistics"]
+
+    def test_invalid_subscription_is_rejected(self):
+        with pytest.raises(ValueError):
+            Subscription.from_message({"type": "subscribe", "zones": {"A": 1}})
+
+    def test_robot_leaving_zone_is_removed_for_zone_subscriber(self):
+        previous = state([robot("RB-1", "A")], [])
+        current = state([robot("RB-1", "B")], [])
+        delta = diff_states(previous, current)
+
+        sliced = filter_delta(delta, Subscription(zones=["A"]), {"RB-1": "A"})
+
+        assert sliced == {"robots": {"upsert": [], "removed": ["RB-1"]}}
+
+    def test_only_touched_subscribers_receive_delta(self):
+        zone_a = FakeWebSocket()
+        zone_b = FakeWebSocket()
+        everything = FakeWebSocket()
+        previous = state([robot("RB-1", "A"), robot("RB-2", "B")], [])
+        current = state([robot("RB-1", "A", battery=50), robot("RB-2", "B")], [])
+        delta = diff_states(previous, current)
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            for client in (zone_a, zone_b, everything):
+                await manager.connect(client, protocol=PROTOCOL_DELTA)
+                manager.connections[client].version = 1
+            manager.subscribe(zone_a, Subscription(zones=["A"]))
+            manager.subscribe(zone_b, Subscription(zones=["B"]))
+            await manager.broadcast_state(1, previous)
+            await manager.drain()
+            for client in (zone_a, zone_b, everything):
+                client.sent.clear()
+            await manager.broadcast_state(2, current, 1, delta)
+            await manager.drain()
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        assert zone_b.sent == []
+        assert json.loads(zone_a.sent[0])["data"]["robots"]["upsert"][0]["id"] == "RB-1"
+        assert json.loads(everything.sent[0])["data"] == delta
+        # Пропущенный подписчик остается в синхроне и дальше получает дельты
+        assert manager.connections[zone_b].version == 2
+
+    def test_status_subscriber_receives_robot_changes(self):
+        critical = FakeWebSocket()
+        previous = state([robot("RB-1", "A")], [])
+        current = state([robot("RB-1", "A", battery=50)], [])
+        delta = diff_states(previous, current)
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            await manager.connect(critical, protocol=PROTOCOL_DELTA)
+            manager.connections[critical].version = 1
+            # Без фильтра по зонам и роботам в срезе все роботы
+            manager.subscribe(
+                critical, Subscription(statuses=["CRITICAL"], statistics=False)
+            )
+            await manager.broadcast_state(1, previous)
+            await manager.drain()
+            critical.sent.clear()
+            await manager.broadcast_state(2, current, 1, delta)
+            await manager.drain()
+
+        asyncio.run(scenario())
+
+        message = json.loads(critical.sent[0])
+        assert message["version"] == 2
+        assert message["data"]["robots"]["upsert"][0]["battery_level"] == 50
+
+    def test_subscribe_message_updates_index_and_sends_slice(self):
+        client = FakeWebSocket()
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+
+            async def versioned_state():
+                return 3, state([robot("RB-1", "A"), robot("RB-2", "B")], [])
+
+            manager.get_versioned_state = versioned_state
+            handler = WebSocketHandler(manager)
+            await manager.connect(client)
+            await handler._handle_json_message(
+                {"type": "subscribe", "robots": ["RB-2"]}, client
+            )
+            await manager.drain()
+            indexed = {
+                topic: {connection.websocket for connection in connections}
+                for topic, connections in manager.topic_index.items()
+            }
+            manager.disconnect(client)
+            return indexed, manager
+
+        indexed, manager = asyncio.run(scenario())
+
+        ack, snapshot = (json.loads(text) for text in client.sent)
+        assert ack["status"] == "success"
+        assert ack["subscription"]["robots"] == ["RB-2"]
+        assert [r["id"] for r in snapshot["data"]["robots"]] == ["RB-2"]
+        assert client in indexed[("robot", "RB-2")]
+        assert not manager.topic_index and not manager.connections
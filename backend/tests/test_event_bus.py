@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timezone
+from app.api.v1.dashboard.websocket_manager import WebSocketConnectionManager
+from app.core.dashboard.aggregator import dashboard_state
+from app.core.events import EventBus
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+def make_scan(scan_id):
+    return {
+        "id": scan_id,
+        "robot_id": "RB-0001",
+        "product_id": "TEL-0001",
+        "quantity": 5,
+        "zone": "A",
+        "shelf_number": 1,
+        "status": "OK",
+        "scanned_at": datetime.now(timezone.utc),
+    }
+
+
+@pytest.mark.unit
+class TestEventBus:
+    """Тесты шины событий и событийной рассылки дашборда."""
+
+    def test_publish_reaches_subscribers_in_order(self):
+        bus = EventBus()
+        received = []
+        bus.subscribe("topic", lambda payload: received.append(("a", payload)))
+        bus.subscribe("topic", lambda payload: received.append(("b", payload)))
+
+        bus.publish("topic", 1)
+        bus.publish("other", 2)
+
+        assert received == [("a", 1), ("b", 1)]
+
+    def test_failing_subscriber_does_not_break_others(self):
+        bus = EventBus()
+        received = []
+
+        def broken(payload):
+            raise RuntimeError("boom")
+
+        bus.subscribe("topic", broken)
+        bus.subscribe("topic", received.append)
+        bus.publish("topic", 1)
+        bus.unsubscribe("topic", received.append)
+        bus.publish("topic", 2)
+
+        assert received == [1]
+
+    def test_burst_of_reports_produces_one_push(self):
+        dashboard_state.load(
+            {
+                "active_robots": 0,
+                "total_robots": 0,
+                "scanned_today": 0,
+                "critical_stocks": 0,
+                "average_battery": 0.0,
+                "robots": [],
+                "recent_scans": [],
+            }
+        )
+        client = FakeWebSocket()
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            await manager.connect(client)
+            task = asyncio.create_task(
+                manager.broadcast_dashboard_updates(min_interval=0.05, idle_interval=10)
+            )
+            await asyncio.sleep(0)
+            for scan_id in range(500):
+                dashboard_state.apply_ingested([], [make_scan(scan_id)])
+            await asyncio.sleep(0.2)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        asyncio.run(scenario())
+
+        assert len(client.sent) == 1
+        message = json.loads(client.sent[0])
+        assert message["type"] == "dashboard_update"
+        assert message["data"]["statistics"]["scanned_today"] == 500
@@ -0,0 +1,140 @@
+import asyncio
+import io
+import os
+import pytest
+import orjson
+from app.core.ingestion.import_jobs import ImportJobs
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class FakeDB:
+    """import_inventory_stream с прогрессом по кускам из двух строк"""
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.sources = []
+        self.progress = []
+
+    async def import_inventory_stream(self, source, dialect=None, on_progress=None):
+        self.sources.append(source.name)
+        lines = source.read().decode().splitlines()[1:]
+        if self.fail:
+            raise self.fail
+        processed = 0
+        for start in range(0, len(lines), 2):
+            processed += len(lines[start : start + 2])
+            progress = {
+                "status": "running",
+                "records_processed": processed,
+                "total_records": processed,
+                "errors_count": 0,
+                "error_details": [],
+            }
+            self.progress.append(progress)
+            await on_progress(progress)
+        return {
+            "status": "partial_success",
+            "records_processed": processed - 1,
+            "total_records": processed,
+            "errors_count": 1,
+            "error_details": ["Row 2: Invalid quantity"],
+            "message": "Imported",
+        }
+
+
+CSV = b"product_id;product_name;quantity\n" + b"".join(
+    f"TEL-{i:04d};Item;{i}\n".encode() for i in range(5)
+)
+
+
+async def finish(jobs, job_id):
+    while jobs._tasks.get(job_id):
+        await asyncio.sleep(0)
+    return await jobs.get(job_id)
+
+
+@pytest.mark.unit
+class TestImportJobs:
+    """Фоновые импорты CSV и их состояние в Redis"""
+
+    def test_submit_returns_job_and_tracks_progress_in_redis(self):
+        async def run():
+            db, redis = FakeDB(), FakeRedis()
+            jobs = ImportJobs(prefix="test", db=db)
+            await jobs.start(redis)
+            job = await jobs.submit(io.BytesIO(CSV), "stock.csv")
+            assert job["status"] == "queued"
+
+            state = await finish(jobs, job["job_id"])
+            return db, redis, job, state
+
+        db, redis, job, state = asyncio.run(run())
+        assert len(db.progress) == 3
+        assert state["status"] == "partial_success"
+        assert state["records_processed"] == 4
+        assert state["total_records"] == 5
+        assert state["error_samples"] == ["Row 2: Invalid quantity"]
+        assert state["rows_per_sec"] > 0
+        assert state["finished_at"] is not None
+        # Состояние читается из Redis, временный файл удален
+        stored = orjson.loads(redis.data[f"test:import:job:{job['job_id']}"])
+        assert stored == state
+        assert not os.path.exists(db.sources[0])
+
+    def test_failed_import_is_reported_in_job_state(self):
+        async def run():
+            jobs = ImportJobs(prefix="test", db=FakeDB(fail=RuntimeError("db down")))
+            job = await jobs.submit(io.BytesIO(CSV), "stock.csv")
+            return await finish(jobs, job["job_id"])
+
+        state = asyncio.run(run())
+        assert state["status"] == "error"
+        assert state["error"] == "db down"
+
+    def test_unknown_job_returns_none(self):
+        async def run():
+            jobs = ImportJobs(prefix="test", db=FakeDB())
+            await jobs.start(FakeRedis())
+            return await jobs.get("missing")
+
+        assert asyncio.run(run()) is None
+
+    def test_jobs_over_limit_wait_in_queue(self):
+        async def run():
+            release = asyncio.Event()
+
+            class SlowDB(FakeDB):
+                async def import_inventory_stream(
+                    self, source, dialect=None, on_progress=None
+                ):
+                    await release.wait()
+                    return await super().import_inventory_stream(
+                        source, dialect, on_progress
+                    )
+
+            jobs = ImportJobs(prefix="test", max_jobs=1, db=SlowDB())
+            first = await jobs.submit(io.BytesIO(CSV), "a.csv")
+            second = await jobs.submit(io.BytesIO(CSV), "b.csv")
+            await asyncio.sleep(0.01)
+            statuses = [
+                (await jobs.get(first["job_id"]))["status"],
+                (await jobs.get(second["job_id"]))["status"],
+            ]
+            release.set()
+            await finish(jobs, first["job_id"])
+            await finish(jobs, second["job_id"])
+            return statuses, (await jobs.get(second["job_id"]))["status"]
+
+        statuses, final = asyncio.run(run())
+        assert statuses == ["running", "queued"]
+        assert final == "partial_success"
@@ -0,0 +1,175 @@
+import asyncio
+import pytest
+from app.core.ingestion.buffer import IngestionBuffer, IngestionQueueFull
+from app.core.ingestion.dedup import RecentKeys
+
+
+def make_report(robot_id="RB-0001"):
+    return {
+        "robot_id": robot_id,
+        "battery_level": 80,
+        "location": {"zone": "A", "row": 1, "shelf": 1},
+        "scan_results": [],
+    }
+
+
+@pytest.mark.unit
+class TestIngestionBuffer:
+    """Тесты write-behind буфера приема отчетов роботов."""
+
+    def test_flush_by_batch_size(self):
+        batches = []
+
+        async def flush(batch):
+            batches.append(list(batch))
+            return True
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, batch_size=3, flush_interval=10)
+            await buffer.start()
+            for i in range(6):
+                buffer.submit(make_report(f"RB-{i}"))
+            await asyncio.sleep(0.05)
+            await buffer.stop()
+            return buffer
+
+        buffer = asyncio.run(scenario())
+
+        assert [len(b) for b in batches] == [3, 3]
+        assert buffer.get_stats()["reports_flushed"] == 6
+
+    def test_flush_by_interval(self):
+        batches = []
+
+        async def flush(batch):
+            batches.append(list(batch))
+            return True
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, batch_size=100, flush_interval=0.05)
+            await buffer.start()
+            buffer.submit(make_report())
+            await asyncio.sleep(0.2)
+            flushed_before_stop = len(batches)
+            await buffer.stop()
+            return flushed_before_stop
+
+        assert asyncio.run(scenario()) == 1
+
+    def test_backpressure_rejects_when_full(self):
+        async def flush(batch):
+            return True
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, max_queue_size=2)
+            buffer.submit(make_report())
+            buffer.submit(make_report())
+            with pytest.raises(IngestionQueueFull):
+                buffer.submit(make_report())
+            return buffer.get_stats()
+
+        stats = asyncio.run(scenario())
+
+        assert stats["queue_depth"] == 2
+        assert stats["reports_rejected"] == 1
+
+    def test_stop_flushes_pending_reports(self):
+        flushed = []
+
+        async def flush(batch):
+            flushed.extend(batch)
+            return True
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, batch_size=2, flush_interval=10)
+            for i in range(5):
+                buffer.submit(make_report(f"RB-{i}"))
+            await buffer.stop()
+
+        asyncio.run(scenario())
+
+        assert len(flushed) == 5
+
+    def test_failed_batch_is_retried_per_report(self):
+        calls = []
+
+        async def flush(batch):
+            calls.append(len(batch))
+            return not any(r["robot_id"] == "BAD" for r in batch)
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, batch_size=3, flush_interval=10)
+            buffer.submit(make_report("RB-1"))
+            buffer.submit(make_report("BAD"))
+            buffer.submit(make_report("RB-2"))
+            await buffer.stop()
+            return buffer.get_stats()
+
+        stats = asyncio.run(scenario())
+
+        assert calls == [3, 1, 1, 1]
+        assert stats["reports_flushed"] == 2
+        assert stats["reports_failed"] == 1
+
+    def test_retried_report_is_dropped_as_duplicate(self):
+        flushed = []
+
+        async def flush(batch):
+            flushed.extend(batch)
+            return True
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, batch_size=10, flush_interval=10)
+            retry = dict(make_report(), request_id="req-1")
+            scan = dict(make_report("RB-2"), timestamp="2026-10-17T08:00:00Z")
+            accepted = [
+                buffer.submit(retry),
+                buffer.submit(dict(retry)),
+                buffer.submit(scan),
+                buffer.submit(dict(scan)),
+                # Без request_id и timestamp повтор не распознать
+                buffer.submit(make_report("RB-3")),
+                buffer.submit(make_report("RB-3")),
+            ]
+            await buffer.stop()
+            return accepted, buffer.get_stats()
+
+        accepted, stats = asyncio.run(scenario())
+
+        assert accepted == [True, False, True, False, True, True]
+        assert len(flushed) == 4
+        assert stats["reports_duplicate"] == 2
+
+    def test_failed_report_can_be_retried(self):
+        calls = []
+
+        async def flush(batch):
+            calls.append(len(batch))
+            return len(calls) > 1
+
+        async def scenario():
+            buffer = IngestionBuffer(flush, batch_size=10, flush_interval=0.01)
+            await buffer.start()
+            report = dict(make_report(), request_id="req-1")
+            buffer.submit(report)
+            await asyncio.sleep(0.05)
+            # Отчет не записан — повтор робота принимается заново
+            accepted = buffer.submit(dict(report))
+            await buffer.stop()
+            return accepted, buffer.get_stats()
+
+        accepted, stats = asyncio.run(scenario())
+
+        assert accepted is True
+        assert stats["reports_failed"] == 1
+        assert stats["reports_flushed"] == 1
+
+    def test_recent_keys_evicts_least_recent(self):
+        keys = RecentKeys(maxsize=2)
+
+        assert [keys.seen("a"), keys.seen("b"), keys.seen("a")] == [False, False, True]
+        keys.seen("c")
+
+        assert len(keys) == 2
+        assert keys.seen("a") is True
+        assert keys.seen("b") is False
@@ -0,0 +1,121 @@
+import asyncio
+import io
+import json
+import pandas as pd
+import pytest
+from app.api.v1.inventory.streaming import _progress_lines
+from app.db.DataBaseManager import db
+from app.db.bulk_import import CsvDialect
+
+HEADER = "product_id;product_name;quantity;zone;row;shelf;date\n"
+
+
+def csv_file(rows, broken=()):
+    lines = [
+        f"TEL-{i:04d};Product {i};{'x' if i in broken else i};A;1;1;2026-10-17T08:00:00"
+        for i in range(rows)
+    ]
+    return io.BytesIO((HEADER + "\n".join(lines) + "\n").encode("utf-8"))
+
+
+@pytest.fixture
+def written(monkeypatch):
+    frames = []
+
+    async def write(frame, dialect):
+        frames.append((frame, dialect))
+
+    monkeypatch.setattr(db, "_write_inventory_frame", write)
+    return frames
+
+
+@pytest.mark.unit
+class TestInventoryImportStream:
+    """Тесты потокового импорта CSV кусками."""
+
+    def test_file_is_committed_in_chunks(self, written):
+        progress = []
+
+        async def on_progress(update):
+            progress.append(update)
+
+        result = asyncio.run(
+            db.import_inventory_stream(
+                csv_file(25, broken={3, 17}), chunk_rows=10, on_progress=on_progress
+            )
+        )
+
+        assert [len(frame) for frame, _ in written] == [9, 9, 5]
+        assert [update["records_processed"] for update in progress] == [9, 18, 23]
+        assert all(update["status"] == "running" for update in progress)
+        assert result["status"] == "success"
+        assert result["records_processed"] == 23
+        assert result["total_records"] == 25
+        # Номера строк считаются по всему файлу, а не по куску
+        assert result["error_details"] == [
+            "Row 4: Invalid quantity",
+            "Row 18: Invalid quantity",
+        ]
+
+    def test_missing_columns_stop_before_writing(self, written):
+        source = io.StringIO("product_id;zone\nTEL-0001;A\n")
+
+        result = asyncio.run(db.import_inventory_stream(source))
+
+        assert result == {
+            "status": "error",
+            "error": "Missing required columns: product_name, quantity",
+        }
+        assert written == []
+
+    def test_database_error_keeps_committed_chunks(self, monkeypatch):
+        calls = []
+
+        async def write(frame, dialect):
+            calls.append(len(frame))
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+
+        monkeypatch.setattr(db, "_write_inventory_frame", write)
+
+        result = asyncio.run(db.import_inventory_stream(csv_file(30), chunk_rows=10))
+
+        assert result["status"] == "error"
+        assert result["error"] == "Database commit failed: connection lost"
+        assert result["records_processed"] == 10
+
+    def test_progress_lines_end_with_result(self, written):
+        async def collect():
+            lines = _progress_lines(
+                lambda on_progress: db.import_inventory_stream(
+                    csv_file(12), chunk_rows=5, on_progress=on_progress
+                )
+            )
+            return [json.loads(line) async for line in lines]
+
+        messages = asyncio.run(collect())
+
+        assert [message["type"] for message in messages] == [
+            "progress",
+            "progress",
+            "progress",
+            "result",
+        ]
+        assert messages[-1]["status"] == "success"
+        assert messages[-1]["records_processed"] == 12
+
+    def test_dialect_sets_delimiter_and_date_formats(self, written):
+        dialect = CsvDialect(delimiter=",", date_formats=("%d.%m.%Y",), status=None)
+        source = io.StringIO(
+            "product_id,product_name,quantity,zone,date\n"
+            "TEL-0001,Phone,3,A,16.10.2026\n"
+        )
+
+        result = asyncio.run(db.import_inventory_stream(source, dialect=dialect))
+
+        frame, used = written[0]
+        assert result["status"] == "success"
+        assert used is dialect
+        assert frame["scanned_at"].tolist() == [pd.Timestamp("2026-10-16", tz="UTC")]
+        # Статус по остатку выставляет запись в БД
+        assert frame["status"].isna().all()
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from app.api.v1.inventory.router import get_inventory_history
+from app.api.v1.inventory.streaming import DEFAULT_PAGE_SIZE
+from app.db.DataBaseManager import db
+from app.db.pagination import encode_cursor, decode_cursor
+
+
+@pytest.mark.unit
+class TestKeysetCursor:
+    """Тесты курсора keyset-пагинации истории."""
+
+    def test_round_trip(self):
+        scanned_at = datetime(2025, 10, 26, 19, 30, 0, 123456, tzinfo=timezone.utc)
+
+        cursor = encode_cursor(scanned_at, 42)
+
+        assert decode_cursor(cursor) == (scanned_at, 42)
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor(datetime(2025, 10, 26, tzinfo=timezone.utc), 7)
+
+        assert "=" not in cursor
+        assert "/" not in cursor and "+" not in cursor
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", "bm9waXBl"])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.unit
+class TestHistoryEndpoint:
+    """Ответ /inventory/history с курсором и без него."""
+
+    @staticmethod
+    def call(**params):
+        options = dict(
+            from_date=None,
+            to_date=None,
+            zone=None,
+            status=None,
+            cursor=None,
+            page_size=None,
+            output="json",
+        )
+        options.update(params)
+        return asyncio.run(get_inventory_history(**options))
+
+    def test_without_cursor_and_page_size_returns_everything(self, monkeypatch):
+        items = [{"id": i} for i in range(1200)]
+
+        async def everything(**filters):
+            return items
+
+        monkeypatch.setattr(db, "get_filter_inventory_history", everything)
+
+        assert self.call() == {"total": 1200, "items": items, "pagination": {}}
+
+    def test_page_has_no_total(self, monkeypatch):
+        calls = []
+
+        async def page(**filters):
+            calls.append(filters["page_size"])
+            return {"items": [{"id": 1}], "pagination": {"next_cursor": "abc"}}
+
+        monkeypatch.setattr(db, "get_inventory_history_page", page)
+
+        response = self.call(cursor="abc")
+
+        assert response == {"items": [{"id": 1}], "pagination": {"next_cursor": "abc"}}
+        assert calls == [DEFAULT_PAGE_SIZE]
@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.db.partitions import (
+    PartitionManager,
+    expired_partitions,
+    parse_bound,
+    partition_name,
+    partition_ranges,
+    partition_start,
+)
+
+
+@pytest.mark.unit
+class TestPartitionBounds:
+    """Тесты расчета границ секций inventory_history."""
+
+    def test_day_start_is_utc_midnight(self):
+        moment = datetime(2025, 10, 26, 2, 30, tzinfo=timezone(timedelta(hours=3)))
+
+        assert partition_start(moment, "day") == datetime(
+            2025, 10, 25, tzinfo=timezone.utc
+        )
+
+    def test_week_starts_on_monday(self):
+        # 2025-10-26 - воскресенье
+        moment = datetime(2025, 10, 26, 12, 0, tzinfo=timezone.utc)
+
+        assert partition_start(moment, "week") == datetime(
+            2025, 10, 20, tzinfo=timezone.utc
+        )
+
+    def test_ranges_cover_interval_without_gaps(self):
+        since = datetime(2025, 10, 26, 12, 0, tzinfo=timezone.utc)
+
+        ranges = partition_ranges(since, since + timedelta(days=3), "day")
+
+        assert len(ranges) == 4
+        assert ranges[0][0] <= since and ranges[-1][1] > since + timedelta(days=3)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    def test_partition_name(self):
+        start = datetime(2025, 10, 20, tzinfo=timezone.utc)
+
+        assert partition_name(start, "day") == "inventory_history_d20251020"
+        assert partition_name(start, "week") == "inventory_history_w20251020"
+
+    def test_parse_bound(self):
+        expr = "FOR VALUES FROM ('2025-10-26 03:00:00+03') TO ('2025-10-27 03:00:00+03')"
+
+        start, end = parse_bound(expr)
+
+        assert start == datetime(2025, 10, 26, tzinfo=timezone.utc)
+        assert end - start == timedelta(days=1)
+        assert parse_bound("DEFAULT") is None
+
+    def test_expired_partitions(self):
+        day = timedelta(days=1)
+        base = datetime(2025, 10, 1, tzinfo=timezone.utc)
+        partitions = {
+            "inventory_history_d20251001": (base, base + day),
+            "inventory_history_d20251002": (base + day, base + 2 * day),
+            "inventory_history_default": None,
+        }
+
+        assert expired_partitions(partitions, base + day) == [
+            "inventory_history_d20251001"
+        ]
+
+    def test_unknown_interval_rejected(self):
+        with pytest.raises(ValueError):
+            PartitionManager(interval="month")
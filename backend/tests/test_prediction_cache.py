@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from app.core.ai.prediction_cache import PredictionCache, prediction_input_hash
+from app.core.ai.prediction_worker import PredictionService
+
+
+def scan(product_id, quantity, hour, **extra):
+    return dict(
+        {
+            "product_id": product_id,
+            "quantity": quantity,
+            "status": "CRITICAL",
+            "scanned_at": f"2026-10-17T{hour:02d}:00:00",
+        },
+        **extra,
+    )
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+class FakeDB:
+    """Критичные остатки и ai_predictions с input_hash"""
+
+    def __init__(self):
+        self.inventory = {"TEL-0001": 5, "TEL-0002": 8}
+        self.history = [scan("TEL-0001", 9, 8), scan("TEL-0001", 5, 10)]
+        self.rows = []
+
+    async def get_data_for_predict(self):
+        return dict(self.inventory), list(self.history)
+
+    async def add_ai_prediction(self, predictions, input_hash=None):
+        saved = [
+            dict(prediction, created_at="2026-10-17") for prediction in predictions
+        ]
+        self.rows.extend((input_hash, prediction) for prediction in saved)
+        return saved
+
+    async def get_predictions_by_input_hash(self, input_hash):
+        return [prediction for key, prediction in self.rows if key == input_hash]
+
+
+class FakeClient:
+    model = "test-model"
+    period_days = 7
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_prediction(self, inventory_data, historical_data):
+        self.calls += 1
+        return {
+            "period_days": 7,
+            "categories": [
+                {
+                    "product_id": product_id,
+                    "days_until_stockout": quantity,
+                    "recommended_order": 50,
+                }
+                for product_id, quantity in inventory_data.items()
+            ],
+            "failed": [],
+        }
+
+
+def make_service(db, client, redis=None):
+    cache = PredictionCache(prefix="test", db=db)
+    cache.redis = redis
+    service = PredictionService(db=db, client=client, cache=cache)
+
+    @asynccontextmanager
+    async def refresh_lock():
+        yield True
+
+    service.refresh_lock = refresh_lock
+    return service
+
+
+@pytest.mark.unit
+class TestPredictionCache:
+    """Тесты кеша предсказаний LLM по хешу входных данных."""
+
+    def test_hash_ignores_order_and_fields_outside_prompt(self):
+        inventory = {"TEL-0001": 5, "TEL-0002": 8}
+        history = [scan("TEL-0001", 9, 8), scan("TEL-0002", 8, 9)]
+        reordered = [
+            scan("TEL-0002", 8, 9, recommended_order=40),
+            scan("TEL-0001", 9, 8, discrepancy=3),
+        ]
+
+        key = prediction_input_hash(inventory, history, 7, "model")
+
+        assert key == prediction_input_hash(
+            {"TEL-0002": 8, "TEL-0001": 5}, reordered, 7, "model"
+        )
+        assert key != prediction_input_hash(
+            {"TEL-0001": 4, "TEL-0002": 8}, history, 7, "model"
+        )
+        assert key != prediction_input_hash(inventory, history, 14, "model")
+
+    def test_identical_inputs_call_llm_once(self):
+        db, client = FakeDB(), FakeClient()
+        service = make_service(db, client)
+
+        async def scenario():
+            first = await service.refresh()
+            second = await service.refresh()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        assert client.calls == 1
+        assert len(db.rows) == 2
+        assert second["predictions"] == first["predictions"]
+        assert second["input_hash"] == first["input_hash"]
+        stats = service.get_stats()["cache"]
+        assert stats["misses"] == 1
+        assert stats["hits_by_source"]["memory"] == 1
+
+    def test_changed_inputs_invalidate_immediately(self):
+        db, client = FakeDB(), FakeClient()
+        service = make_service(db, client)
+
+        async def scenario():
+            first = await service.refresh()
+            db.inventory["TEL-0002"] = 3
+            db.history.append(scan("TEL-0002", 3, 11))
+            return first, await service.refresh()
+
+        first, second = asyncio.run(scenario())
+
+        assert client.calls == 2
+        assert second["input_hash"] != first["input_hash"]
+        assert service.get_stats()["cache"]["misses"] == 2
+
+    def test_other_process_reuses_redis_and_database(self):
+        db, client = FakeDB(), FakeClient()
+        redis = FakeRedis()
+        asyncio.run(make_service(db, client, redis).refresh())
+
+        # Другой процесс с тем же Redis
+        via_redis = make_service(db, client, redis)
+        asyncio.run(via_redis.refresh())
+        # Redis потерял ключи — ответ находится в ai_predictions
+        redis.data.clear()
+        via_db = make_service(db, client, redis)
+        batch = asyncio.run(via_db.refresh())
+
+        assert client.calls == 1
+        assert via_redis.cache.get_stats()["hits_by_source"]["redis"] == 1
+        assert via_db.cache.get_stats()["hits_by_source"]["db"] == 1
+        assert len(redis.data) == 1
+        assert {item["product_id"] for item in batch["predictions"]} == {
+            "TEL-0001",
+            "TEL-0002",
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import re
+import pytest
+from datetime import datetime, timedelta
+from app.core.ai.circuit_breaker import CircuitOpenError
+from app.core.ai.prompting import (
+    OUTPUT_TOKENS_PER_PRODUCT,
+    chunk_rows,
+    encode_row,
+    encode_table,
+    estimate_tokens,
+    product_rows,
+)
+from app.core.ai.yandex_gpt_client import YandexGPTClient
+
+
+def history(product_id, quantities):
+    start = datetime(2026, 10, 17, 8, 0)
+    return [
+        {
+            "id": i,
+            "robot_id": "RB-0001",
+            "product_id": product_id,
+            "product_name": f"Product {product_id}",
+            "quantity": quantity,
+            "zone": "A",
+            "shelf_number": 1,
+            "status": "CRITICAL",
+            "scanned_at": (start + timedelta(hours=i)).isoformat(),
+            "recommended_order": 0,
+            "discrepancy": quantity,
+            "prediction_confidence": None,
+        }
+        for i, quantity in enumerate(quantities)
+    ]
+
+
+def table_ids(prompt):
+    return re.findall(r"^(TEL-\d+),", prompt, flags=re.MULTILINE)
+
+
+class ScriptedClient(YandexGPTClient):
+    """Отвечает на промпт предсказаниями для товаров из его таблицы"""
+
+    def __init__(self, drop_once=(), fail_ids=(), **kwargs):
+        super().__init__(url="http://localhost", api_key="test", **kwargs)
+        self.drop_once = set(drop_once)
+        self.fail_ids = set(fail_ids)
+        self.prompts = []
+
+    async def _complete(self, prompt):
+        self.prompts.append(prompt)
+        ids = table_ids(prompt)
+        if self.fail_ids & set(ids):
+            raise CircuitOpenError("circuit is open")
+        await asyncio.sleep(0.01)
+        answer = []
+        for product_id in ids:
+            if product_id in self.drop_once:
+                self.drop_once.discard(product_id)
+                continue
+            answer.append(
+                {
+                    "product_id": product_id,
+                    "days_until_stockout": 3,
+                    "recommended_order": "40",
+                }
+            )
+        return json.dumps(answer)
+
+
+@pytest.mark.unit
+class TestPredictionChunking:
+    """Тесты компактного промпта и параллельного предсказания по кускам."""
+
+    def test_table_is_more_compact_than_dict_repr(self):
+        rows = history("TEL-0001", [12, 9, 7, 4])
+        table = encode_table(product_rows({"TEL-0001": 4}, rows))
+
+        assert table == "product_id,qty,history,hours\nTEL-0001,4,12 9 7 4,3.0"
+        assert estimate_tokens(table) * 5 < estimate_tokens(str(rows))
+
+    def test_chunks_respect_input_and_output_budgets(self):
+        rows = [[f"TEL-{i:04d}", i, "10 8 6", 2.0] for i in range(100)]
+
+        by_output = chunk_rows(rows, input_budget=10_000, output_budget=300)
+        by_input = chunk_rows(rows, input_budget=60, output_budget=10_000)
+
+        max_products = 300 // OUTPUT_TOKENS_PER_PRODUCT
+        assert max(len(chunk) for chunk in by_output) == max_products
+        assert all(
+            sum(estimate_tokens(encode_row(row)) + 1 for row in chunk) <= 60
+            for chunk in by_input
+        )
+        assert [row for chunk in by_input for row in chunk] == rows
+
+    def test_every_product_gets_prediction_or_failure(self):
+        inventory = {f"TEL-{i:04d}": i for i in range(40)}
+        client = ScriptedClient(
+            drop_once={"TEL-0003", "TEL-0017"},
+            fail_ids={"TEL-0039"},
+            max_tokens=300,
+            max_concurrency=3,
+        )
+
+        predictions, failed = asyncio.run(client.predict_products(inventory, []))
+
+        predicted = {item["product_id"] for item in predictions}
+        failed_ids = {item["product_id"] for item in failed}
+        assert predicted | failed_ids == set(inventory)
+        assert not predicted & failed_ids
+        # Пропущенные моделью товары переспрошены, отказ сервиса — явная ошибка
+        assert {"TEL-0003", "TEL-0017"} <= predicted
+        assert "TEL-0039" in failed_ids
+        assert all(item["error"] == "circuit is open" for item in failed)
+        assert all(item["recommended_order"] == 40 for item in predictions)
+        assert len(client.prompts) > 2
+
+    def test_get_prediction_reports_failures(self):
+        client = ScriptedClient(fail_ids={"TEL-0002"}, max_tokens=30)
+
+        result = asyncio.run(
+            client.get_prediction({"TEL-0001": 1, "TEL-0002": 2}, [])
+        )
+
+        assert [item["product_id"] for item in result["categories"]] == ["TEL-0001"]
+        assert result["failed"] == [
+            {"product_id": "TEL-0002", "error": "circuit is open"}
+        ]
+
+    def test_bare_json_array_is_parsed(self):
+        parsed = YandexGPTClient.safe_parse_json('[{"product_id": "TEL-0001"}]')
+
+        assert parsed[0]["product_id"] == "TEL-0001"
+        assert YandexGPTClient.safe_parse_json("not a json string") is None
@@ -0,0 +1,191 @@
+import asyncio
+import pandas as pd
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from app.core.ai.prediction_cache import PredictionCache
+from app.core.ai.prediction_worker import PredictionService
+
+PREDICTION = {
+    "product_id": "TEL-0001",
+    "days_until_stockout": 3,
+    "recommended_order": 40,
+}
+
+
+class FakeDB:
+    def __init__(self, stored=None, critical=True):
+        self.stored = stored
+        self.critical = critical
+        self.saved = []
+
+    async def get_latest_prediction_batch(self):
+        return self.stored
+
+    async def get_data_for_predict(self):
+        if not self.critical:
+            return object()
+        return {"TEL-0001": 2}, [{"product_id": "TEL-0001", "status": "CRITICAL"}]
+
+    async def get_forecast_data(self, days):
+        history = pd.DataFrame(
+            {
+                "product_id": ["TEL-0001"] * 4 + ["TEL-0002"] * 4,
+                "zone": "A",
+                "shelf_number": 1,
+                "quantity": [40, 30, 20, 10, 50, 50, 50, 50],
+                "scanned_at": list(pd.date_range("2026-10-10", periods=4, freq="D"))
+                * 2,
+            }
+        )
+        products = pd.DataFrame(
+            {
+                "product_id": ["TEL-0001", "TEL-0002"],
+                "min_stock": [10, 10],
+                "optimal_stock": [100, 100],
+            }
+        )
+        return history, products
+
+    async def get_predictions_by_input_hash(self, input_hash):
+        return []
+
+    async def add_ai_prediction(self, predictions, input_hash=None):
+        self.saved.append(predictions)
+        return [
+            dict(prediction, created_at="2026-10-17T00:00:00")
+            for prediction in predictions
+        ]
+
+
+class FakeClient:
+    model = "test-model"
+    period_days = 7
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def get_prediction(self, inventory_data, historical_data):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return None
+        return {"period_days": 7, "categories": [dict(PREDICTION)]}
+
+
+def make_service(db, client, stale_after=7200.0, engine="llm"):
+    service = PredictionService(
+        refresh_interval=3600.0,
+        stale_after=stale_after,
+        db=db,
+        client=client,
+        engine=engine,
+        cache=PredictionCache(prefix="test", db=db),
+    )
+
+    @asynccontextmanager
+    async def refresh_lock():
+        yield True
+
+    service.refresh_lock = refresh_lock
+    return service
+
+
+def stored_batch(age_seconds):
+    return {
+        "predictions": [dict(PREDICTION, created_at="2026-10-16")],
+        "confidence": 0.75,
+        "generated_at": datetime.utcnow() - timedelta(seconds=age_seconds),
+    }
+
+
+@pytest.mark.unit
+class TestPredictionService:
+    """Тесты фонового обновления AI-предсказаний."""
+
+    def test_concurrent_misses_make_one_llm_call(self):
+        db = FakeDB()
+        client = FakeClient(delay=0.05)
+        service = make_service(db, client)
+
+        async def scenario():
+            return await asyncio.gather(*(service.get_latest() for _ in range(10)))
+
+        batches = asyncio.run(scenario())
+
+        assert client.calls == 1
+        assert len(db.saved) == 1
+        assert all(batch is batches[0] for batch in batches)
+        assert batches[0]["predictions"][0]["product_id"] == "TEL-0001"
+
+    def test_stored_batch_is_served_without_llm(self):
+        client = FakeClient()
+        service = make_service(FakeDB(stored=stored_batch(60)), client)
+
+        batch = asyncio.run(service.get_latest())
+
+        assert batch["confidence"] == 0.75
+        assert client.calls == 0
+
+    def test_stale_batch_is_served_while_revalidating(self):
+        db = FakeDB()
+        client = FakeClient(delay=0.05)
+        service = make_service(db, client, stale_after=10)
+        service.latest = stale = stored_batch(60)
+
+        async def scenario():
+            first = await service.get_latest()
+            second = await service.get_latest()
+            await asyncio.sleep(0.2)
+            return first, second, await service.get_latest()
+
+        first, second, third = asyncio.run(scenario())
+
+        assert first is stale and second is stale
+        assert client.calls == 1
+        assert third is not stale and not service.is_stale(third)
+
+    def test_failed_refresh_keeps_previous_batch(self):
+        db = FakeDB()
+        db.get_forecast_data = None  # локальный прогноз тоже недоступен
+        service = make_service(db, FakeClient(fail=True))
+        service.latest = previous = stored_batch(60)
+
+        batch = asyncio.run(service.refresh())
+
+        assert batch is previous
+        assert service.get_stats()["failures"] == 1
+        assert service.get_stats()["last_error"]
+
+    def test_no_critical_inventory_skips_llm(self):
+        client = FakeClient()
+        service = make_service(FakeDB(critical=False), client)
+
+        batch = asyncio.run(service.refresh())
+
+        assert batch["predictions"] == []
+        assert client.calls == 0
+
+    def test_llm_outage_falls_back_to_local_forecast(self):
+        db = FakeDB()
+        service = make_service(db, FakeClient(fail=True))
+
+        batch = asyncio.run(service.refresh())
+
+        by_id = {item["product_id"]: item for item in batch["predictions"]}
+        assert by_id["TEL-0001"]["days_until_stockout"] == 1
+        assert by_id["TEL-0001"]["recommended_order"] == 100
+        assert by_id["TEL-0002"]["recommended_order"] == 0
+        assert batch["confidence"] != 0.75
+        assert service.get_stats()["last_engine"] == "statistical"
+
+    def test_statistical_engine_skips_llm(self):
+        client = FakeClient()
+        service = make_service(FakeDB(), client, engine="statistical")
+
+        batch = asyncio.run(service.refresh())
+
+        assert client.calls == 0
+        assert len(batch["predictions"]) == 2
@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from app.db.DataBaseManager import db
+from app.db.product_registry import ProductRegistry
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Отдает заранее заданные строки RETURNING/SELECT по порядку запросов"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return FakeResult(self.results.pop(0))
+
+
+@pytest.mark.unit
+class TestProductRegistry:
+    """Тесты процессного кэша справочника товаров."""
+
+    def test_split_new_and_renamed(self):
+        registry = ProductRegistry()
+        registry.warm([("TEL-0001", "Роутер"), ("TEL-0002", "Модем")])
+
+        new, renamed = registry.split(
+            {"TEL-0001": "Роутер", "TEL-0002": "Модем DSL", "TEL-0003": "Свитч"}
+        )
+
+        assert new == {"TEL-0003": "Свитч"}
+        assert renamed == {"TEL-0002": "Модем DSL"}
+
+    def test_write_through_updates(self):
+        registry = ProductRegistry()
+        registry.warm([])
+
+        registry.put("TEL-0001", "Роутер")
+        assert "TEL-0001" in registry
+        assert registry.get_name("TEL-0001") == "Роутер"
+
+        registry.discard("TEL-0001")
+        assert "TEL-0001" not in registry
+        assert len(registry) == 0
+
+    def test_invalidate_requires_rewarm(self):
+        registry = ProductRegistry()
+        assert not registry.warmed
+
+        registry.warm([("TEL-0001", "Роутер")])
+        assert registry.warmed
+
+        registry.invalidate()
+        assert not registry.warmed
+
+
+@pytest.mark.unit
+class TestProductRegistryWrites:
+    """Кэш пополняется только товарами, которые действительно есть в БД."""
+
+    @pytest.fixture
+    def registry(self, monkeypatch):
+        registry = ProductRegistry()
+        registry.warm([("TEL-0001", "Роутер")])
+        monkeypatch.setattr(db, "product_registry", registry)
+        return registry
+
+    def test_only_returned_names_are_cached(self, registry):
+        session = FakeSession(
+            # INSERT ... RETURNING: TEL-0003 уже добавил другой процесс
+            [("TEL-0002", "Свитч")],
+            # SELECT названия конфликтного товара
+            [("TEL-0003", "Модем ADSL")],
+            # upsert переименования RETURNING
+            [("TEL-0001", "Роутер DSL")],
+        )
+
+        known = asyncio.run(
+            db._insert_new_products(
+                session,
+                {"TEL-0001": "Роутер DSL", "TEL-0002": "Свитч", "TEL-0003": "Модем"},
+            )
+        )
+        db._remember_products(known)
+
+        assert len(session.statements) == 3
+        assert known == {
+            "TEL-0001": "Роутер DSL",
+            "TEL-0002": "Свитч",
+            "TEL-0003": "Модем ADSL",
+        }
+        assert registry.get_name("TEL-0003") == "Модем ADSL"
+
+    def test_nothing_is_queried_for_known_products(self, registry):
+        session = FakeSession()
+
+        known = asyncio.run(db._insert_new_products(session, {"TEL-0001": "Роутер"}))
+
+        assert known == {}
+        assert session.statements == []
+
+    def test_none_names_are_not_cached(self, registry):
+        db._remember_products({"TEL-0002": None, "TEL-0003": "Свитч"})
+
+        assert "TEL-0002" not in registry
+        assert registry.get_name("TEL-0003") == "Свитч"
@@ -0,0 +1,188 @@
+"""
+EXPLAIN-проверки: горячие запросы дашборда и истории должны идти по
+индексам inventory_history, а не последовательным сканированием.
+
+Нужна отдельная (одноразовая!) база Postgres: TEST_CONN_STR=postgresql+asyncpg://...
+Без переменной окружения тесты пропускаются.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.DataBaseManager import db
+from app.db.migrations import upgrade_schema
+from app.db.models import InventoryHistory
+from app.db.partitions import (
+    DEFAULT_PARTITION,
+    ensure_partitions,
+    partition_name,
+    partition_start,
+)
+from app.db.statistics import history_statistics_query
+
+TEST_CONN_STR = os.getenv("TEST_CONN_STR")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_CONN_STR, reason="TEST_CONN_STR is not set, no Postgres for EXPLAIN"
+)
+
+SEED_ROWS = 200_000
+
+
+def to_sql(query) -> str:
+    return str(
+        query.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, query, index_parents):
+    result = await conn.execute(text("EXPLAIN (FORMAT JSON) " + to_sql(query)))
+    plan = result.scalar()[0]["Plan"]
+    nodes = list(plan_nodes(plan))
+    # Индексы секций называются автоматически, сводим их к индексу родителя
+    for node in nodes:
+        if "Index Name" in node:
+            node["Index Name"] = index_parents.get(node["Index Name"], node["Index Name"])
+    return nodes
+
+
+def history_scans(nodes):
+    return [
+        n for n in nodes if n.get("Relation Name", "").startswith("inventory_history")
+    ]
+
+
+def history_indexes(nodes):
+    # Index Scan / Index Only Scan / Bitmap Index Scan
+    return {
+        n["Index Name"]
+        for n in nodes
+        if n.get("Index Name", "").startswith("ix_inventory_history_")
+    }
+
+
+@pytest.fixture(scope="module")
+def plans():
+    async def collect():
+        engine = create_async_engine(TEST_CONN_STR)
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+            await conn.execute(text("TRUNCATE inventory_history, robots, products CASCADE"))
+            now = datetime.now(timezone.utc)
+            await conn.run_sync(
+                ensure_partitions, now - timedelta(days=31), now + timedelta(days=1)
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO products (id, name) SELECT 'TEL-' || g, 'P' || g "
+                    "FROM generate_series(0, 999) AS g"
+                )
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO inventory_history "
+                    "(product_id, quantity, zone, status, scanned_at) "
+                    "SELECT 'TEL-' || (g % 1000), g % 150, chr(65 + g % 5), "
+                    "CASE WHEN g % 10 = 0 THEN 'CRITICAL' ELSE 'OK' END, "
+                    "now() - (g || ' seconds')::interval * 13 "
+                    f"FROM generate_series(1, {SEED_ROWS}) AS g"
+                )
+            )
+            await conn.execute(text("ANALYZE"))
+
+        today_start = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+        queries = {
+            "recent_scans": db._inventory_history_query()
+            .order_by(InventoryHistory.scanned_at.desc())
+            .limit(20),
+            "today_statistics": history_statistics_query(today_start),
+            "history_page": db._inventory_history_query()
+            .order_by(InventoryHistory.scanned_at.desc(), InventoryHistory.id.desc())
+            .limit(501),
+            "critical_history": db._inventory_history_query(
+                from_date=week_ago, status="CRITICAL"
+            ),
+            "zone_history": db._inventory_history_query(from_date=week_ago, zone="A")
+            .order_by(InventoryHistory.scanned_at.desc())
+            .limit(501),
+        }
+        async with engine.connect() as conn:
+            index_parents = dict(
+                (
+                    await conn.execute(
+                        text(
+                            "SELECT c.relname, p.relname FROM pg_inherits i "
+                            "JOIN pg_class c ON c.oid = i.inhrelid "
+                            "JOIN pg_class p ON p.oid = i.inhparent "
+                            "WHERE c.relkind = 'i'"
+                        )
+                    )
+                ).all()
+            )
+            result = {
+                name: await explain(conn, q, index_parents)
+                for name, q in queries.items()
+            }
+        await engine.dispose()
+        return result
+
+    return asyncio.run(collect())
+
+
+class TestQueryPlans:
+    """Запросы дашборда и истории используют индексы inventory_history."""
+
+    @pytest.mark.parametrize(
+        "query_name",
+        [
+            "recent_scans",
+            "today_statistics",
+            "history_page",
+            "critical_history",
+            "zone_history",
+        ],
+    )
+    def test_no_seq_scan_on_history(self, plans, query_name):
+        nodes = plans[query_name]
+
+        assert history_scans(nodes), f"{query_name}: inventory_history not in plan"
+        assert all(n["Node Type"] != "Seq Scan" for n in history_scans(nodes))
+        assert history_indexes(nodes), f"{query_name}: no inventory_history index used"
+
+    def test_recent_scans_use_scanned_at_index(self, plans):
+        assert history_indexes(plans["recent_scans"]) == {
+            "ix_inventory_history_scanned_at_id"
+        }
+
+    def test_critical_history_uses_status_index(self, plans):
+        assert "ix_inventory_history_status_scanned_at" in history_indexes(
+            plans["critical_history"]
+        )
+
+    def test_today_statistics_prunes_old_partitions(self, plans):
+        today_start = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        oldest_allowed = partition_name(partition_start(today_start - timedelta(days=1)))
+        scanned = {n["Relation Name"] for n in history_scans(plans["today_statistics"])}
+
+        assert scanned
+        assert all(
+            name == DEFAULT_PARTITION or name >= oldest_allowed for name in scanned
+        )
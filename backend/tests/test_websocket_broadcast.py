@@ -0,0 +1,179 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from app.api.v1.dashboard.encoding import encode_text
+from app.api.v1.dashboard.websocket_manager import WebSocketConnectionManager
+from app.core.dashboard.subscriptions import Subscription
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+@pytest.mark.unit
+class TestWebSocketBroadcast:
+    """Тесты параллельной рассылки обновлений дашборда."""
+
+    def test_encode_text_matches_json(self):
+        message = {"type": "dashboard_update", "timestamp": datetime(2025, 10, 26, 12, 0)}
+
+        assert json.loads(encode_text(message)) == json.loads(
+            json.dumps(message, default=str)
+        )
+
+    def test_payload_is_encoded_once_for_all_clients(self):
+        clients = [FakeWebSocket() for _ in range(3)]
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            for client in clients:
+                await manager.connect(client)
+            await manager.broadcast({"type": "dashboard_update", "data": {"a": 1}})
+            await manager.drain()
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        texts = [client.sent[0] for client in clients]
+        assert all(text is texts[0] for text in texts)
+        assert manager.metrics.get_stats()["last_recipients"] == 3
+
+    def test_slow_client_is_evicted_without_delaying_others(self):
+        fast = FakeWebSocket()
+        slow = FakeWebSocket(delay=10)
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=0.05)
+            await manager.connect(slow)
+            await manager.connect(fast)
+            await asyncio.wait_for(manager.broadcast({"type": "ping"}), timeout=1)
+            await asyncio.wait_for(manager.drain(), timeout=1)
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        assert len(fast.sent) == 1
+        assert slow.closed
+        assert list(manager.connections) == [fast]
+        stats = manager.metrics.get_stats()
+        assert stats["evicted"] == 1
+        assert stats["last_latency_ms"] < 1000
+
+    def test_broken_client_is_evicted(self):
+        broken = FakeWebSocket(fail=True)
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            await manager.connect(broken)
+            await manager.broadcast({"type": "ping"})
+            await manager.drain()
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        assert manager.get_connections_count() == 0
+        assert manager.metrics.get_stats()["evicted"] == 1
+
+    def test_delta_clients_get_delta_only_when_in_sync(self):
+        full_client = FakeWebSocket()
+        synced = FakeWebSocket()
+        stale = FakeWebSocket()
+        delta = {"statistics": {"scanned_today": 12}}
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            await manager.connect(full_client)
+            await manager.connect(synced, protocol="delta")
+            await manager.connect(stale, protocol="delta")
+            manager.connections[synced].version = 1
+            manager.connections[stale].version = None
+            await manager.broadcast_state(2, {"statistics": {}}, 1, delta)
+            await manager.drain()
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        assert json.loads(full_client.sent[0])["type"] == "dashboard_update"
+        assert json.loads(stale.sent[0])["type"] == "dashboard_update"
+        message = json.loads(synced.sent[0])
+        assert message["type"] == "dashboard_delta"
+        assert (message["base_version"], message["version"]) == (1, 2)
+        assert message["data"] == delta
+        assert manager.connections[synced].version == 2
+        assert manager.connections[stale].version == 2
+
+    def test_full_queue_evicts_client_without_blocking_broadcast(self):
+        fast = FakeWebSocket()
+        slow = FakeWebSocket(delay=10)
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=5, queue_size=2)
+            await manager.connect(slow)
+            await manager.connect(fast)
+            for _ in range(4):
+                await asyncio.wait_for(manager.broadcast({"type": "ping"}), timeout=0.1)
+            await manager.drain()
+            return manager
+
+        manager = asyncio.run(scenario())
+
+        assert len(fast.sent) == 4
+        assert slow.closed
+        assert list(manager.connections) == [fast]
+        assert manager.metrics.get_stats()["failed_sends"] == 1
+
+    def test_disconnect_stops_writer_and_clears_subscription(self):
+        client = FakeWebSocket()
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            connection = await manager.connect(client)
+            manager.subscribe(client, Subscription(zones=["A"]))
+            manager.disconnect(client)
+            manager.disconnect(client)
+            await asyncio.sleep(0)
+            return manager, connection
+
+        manager, connection = asyncio.run(scenario())
+
+        assert connection.writer.cancelled()
+        assert not manager.connections
+        assert not manager.topic_index
+
+    def test_payload_bytes_counts_utf8_without_reencoding(self):
+        message = {"type": "dashboard_update", "data": {"name": "Роутер"}}
+        text = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        size = len(text.encode())
+        client = FakeWebSocket()
+
+        async def scenario():
+            manager = WebSocketConnectionManager(send_timeout=1)
+            await manager.connect(client)
+            await manager.broadcast(message)
+            await manager.drain()
+            return manager, manager.connections[client].sent_bytes
+
+        manager, sent_bytes = asyncio.run(scenario())
+
+        # Кириллица в UTF-8 длиннее строки: считаются байты, а не символы
+        assert size > len(text)
+        assert encode_text(message).nbytes == size
+        assert manager.metrics.get_stats()["last_payload_bytes"] == size
+        assert sent_bytes == size
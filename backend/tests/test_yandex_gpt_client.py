@@ -0,0 +1,269 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.core.ai.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.ai.yandex_gpt_client import AIServiceError, YandexGPTClient
+
+AI_TEXT = (
+    '```json\n[{"product_id": "TEL-0001", "days_until_stockout": 3, '
+    '"recommended_order": 40}]\n```'
+)
+
+
+class MockYandex:
+    """Локальный HTTP-сервер вместо YandexGPT: отвечает статусами из сценария"""
+
+    def __init__(self, statuses=(), delay=0.0, body=None):
+        self.statuses = list(statuses)
+        self.delay = delay
+        # Тело успешного ответа вместо JSON YandexGPT
+        self.body = body
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with mock._lock:
+                    mock.requests.append((self.client_address, json.loads(body)))
+                    status = mock.statuses.pop(0) if mock.statuses else 200
+                    mock.in_flight += 1
+                    mock.max_in_flight = max(mock.max_in_flight, mock.in_flight)
+                time.sleep(mock.delay)
+                with mock._lock:
+                    mock.in_flight -= 1
+                response = json.dumps(
+                    {"result": {"alternatives": [{"message": {"text": AI_TEXT}}]}}
+                    if status == 200
+                    else {"error": "unavailable"}
+                ).encode()
+                if status == 200 and mock.body is not None:
+                    response = mock.body
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/completion"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+INVENTORY = {"TEL-0001": 2}
+
+
+def make_client(url, **kwargs):
+    options = {"max_retries": 2, "backoff_base": 0.001, "backoff_max": 0.01}
+    options.update(kwargs)
+    return YandexGPTClient(url=url, api_key="test-key", **options)
+
+
+async def with_client(client, coro_factory):
+    await client.start()
+    try:
+        return await coro_factory()
+    finally:
+        await client.stop()
+
+
+@pytest.mark.unit
+class TestYandexGPTClient:
+    """Тесты асинхронного клиента YandexGPT на локальном мок-сервере."""
+
+    def test_prediction_reuses_pooled_connection(self):
+        with MockYandex() as mock:
+            client = make_client(mock.url)
+
+            async def scenario():
+                return [await client.get_prediction(INVENTORY, []) for _ in range(3)]
+
+            results = asyncio.run(with_client(client, scenario))
+
+        assert results[0]["categories"][0]["product_id"] == "TEL-0001"
+        # keep-alive: все запросы пришли с одного клиентского сокета
+        assert len({address for address, _ in mock.requests}) == 1
+        assert mock.requests[0][1]["modelUri"] == client.model
+
+    def test_retries_on_429_and_5xx(self):
+        with MockYandex(statuses=[429, 503]) as mock:
+            client = make_client(mock.url)
+            result = asyncio.run(
+                with_client(client, lambda: client.send_to_ai(INVENTORY, []))
+            )
+
+        assert result == AI_TEXT
+        assert len(mock.requests) == 3
+        assert client.breaker.failures == 0
+
+    def test_exhausted_retries_return_none(self):
+        with MockYandex(statuses=[500] * 10) as mock:
+            client = make_client(mock.url)
+            result = asyncio.run(
+                with_client(client, lambda: client.get_prediction(INVENTORY, []))
+            )
+
+        assert result is None
+        assert len(mock.requests) == 3
+        assert client.breaker.failures == 1
+
+    def test_client_error_is_not_retried(self):
+        with MockYandex(statuses=[400]) as mock:
+            client = make_client(mock.url)
+
+            with pytest.raises(AIServiceError):
+                asyncio.run(with_client(client, lambda: client.send_to_ai(INVENTORY, [])))
+
+        assert len(mock.requests) == 1
+        # Отказ в запросе — не сбой сервиса: предохранитель его не считает
+        assert client.breaker.failures == 0
+
+    def test_rejected_trial_releases_half_open_circuit(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        now[0] = 11
+
+        with MockYandex(statuses=[400]) as mock:
+            client = make_client(mock.url, breaker=breaker)
+
+            async def scenario():
+                with pytest.raises(AIServiceError):
+                    await client.send_to_ai(INVENTORY, [])
+                return await client.send_to_ai(INVENTORY, [])
+
+            result = asyncio.run(with_client(client, scenario))
+
+        assert result == AI_TEXT
+        assert breaker.state == "closed"
+
+    def test_programming_error_is_not_counted_as_outage(self):
+        client = make_client("http://127.0.0.1:1/completion")
+
+        async def broken(payload):
+            raise TypeError("bad payload")
+
+        client._post_with_retries = broken
+
+        with pytest.raises(TypeError):
+            asyncio.run(client.send_to_ai(INVENTORY, []))
+        assert client.breaker.failures == 0
+
+    def test_open_circuit_fails_fast(self):
+        with MockYandex(statuses=[503] * 10) as mock:
+            breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+            client = make_client(mock.url, max_retries=0, breaker=breaker)
+
+            async def scenario():
+                for _ in range(2):
+                    with pytest.raises(AIServiceError):
+                        await client.send_to_ai(INVENTORY, [])
+                with pytest.raises(CircuitOpenError):
+                    await client.send_to_ai(INVENTORY, [])
+                return await client.get_prediction(INVENTORY, [])
+
+            result = asyncio.run(with_client(client, scenario))
+
+        assert result is None
+        assert breaker.state == "open"
+        assert len(mock.requests) == 2
+
+    def test_half_open_trial_closes_circuit(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        now[0] = 11
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+
+        assert breaker.state == "closed"
+
+    def test_cancelled_trial_releases_half_open_circuit(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        now[0] = 11
+
+        with MockYandex(delay=0.5) as mock:
+            client = make_client(mock.url, breaker=breaker)
+
+            async def scenario():
+                trial = asyncio.create_task(client.send_to_ai(INVENTORY, []))
+                await asyncio.sleep(0.05)
+                trial.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await trial
+                # Следующий вызов снова может быть пробным
+                return await client.send_to_ai(INVENTORY, [])
+
+            result = asyncio.run(with_client(client, scenario))
+
+        assert result == AI_TEXT
+        assert breaker.state == "closed"
+
+    def test_malformed_body_raises_service_error(self):
+        client = make_client("http://127.0.0.1:1/completion")
+
+        async def post(payload):
+            return {"error": "unexpected"}
+
+        client._post = post
+
+        with pytest.raises(AIServiceError):
+            asyncio.run(client.send_to_ai(INVENTORY, []))
+
+    def test_non_json_body_fails_only_its_chunk(self):
+        with MockYandex(body=b"<html>Bad gateway</html>") as mock:
+            client = make_client(mock.url)
+            predictions, failed = asyncio.run(
+                with_client(client, lambda: client.predict_products(INVENTORY, []))
+            )
+
+        # Ошибка не прерывает рассылку кусков: товар уходит в failed
+        assert predictions == []
+        assert failed[0]["product_id"] == "TEL-0001"
+        assert "non-JSON" in failed[0]["error"]
+        assert client.breaker.failures == 1
+
+    def test_concurrency_is_bounded(self):
+        with MockYandex(delay=0.05) as mock:
+            client = make_client(mock.url, max_concurrency=2)
+
+            async def scenario():
+                return await asyncio.gather(
+                    *(client.send_to_ai(INVENTORY, []) for _ in range(6))
+                )
+
+            results = asyncio.run(with_client(client, scenario))
+
+        assert results == [AI_TEXT] * 6
+        assert mock.max_in_flight <= 2
@@ -4,12 +4,18 @@ from datetime import datetime, timezone
 import threading
 import requests
 import os
+import uuid
 import logging
 
 # Shared state for occupied positions
 occupied_positions = set()
 position_lock = threading.Lock()
 
+# Повторы отправки отчета: тот же request_id, сервер отбросит дубль
+SEND_RETRIES = 3
+SEND_TIMEOUT = 5
+RETRY_BACKOFF = 1.0
+
 class RobotEmulator:
     def __init__(self, robot_id, api_url):
         self.robot_id = robot_id
@@ -130,6 +136,7 @@ class RobotEmulator:
         
 
         data = {
+            "request_id": str(uuid.uuid4()),
             "robot_id": self.robot_id,
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "location": {
@@ -141,22 +148,30 @@ class RobotEmulator:
             "battery_level": round(self.battery, 1),
         }
 
-        try:
-            response = requests.post(
-                f"{self.api_url}/api/robots/data",
-                json=data,
-                headers={"Content-Type": "application/json"}
-            )
-
-            if response.status_code == 200:
-                logging.info(f" {self.robot_id}: Данные отправлены успешно!")
-                logging.info(f" Location: {self.current_zone}-{self.current_row}-{self.current_shelf}")
-                logging.info(f" Battery: {self.battery:.1f}% |  {len(data['scan_results'])} товаров")
-            else:
+        for attempt in range(1, SEND_RETRIES + 1):
+            try:
+                response = requests.post(
+                    f"{self.api_url}/api/robots/data",
+                    json=data,
+                    headers={"Content-Type": "application/json"},
+                    timeout=SEND_TIMEOUT
+                )
+
+                if response.status_code == 200:
+                    logging.info(f" {self.robot_id}: Данные отправлены успешно!")
+                    logging.info(f" Location: {self.current_zone}-{self.current_row}-{self.current_shelf}")
+                    logging.info(f" Battery: {self.battery:.1f}% |  {len(data['scan_results'])} товаров")
+                    return
                 logging.info(f" {self.robot_id}: Ошибка {response.status_code}")
+                # Повторяем только временные ошибки сервера
+                if response.status_code < 500 and response.status_code != 429:
+                    return
+
+            except Exception as e:
+                logging.info(f" {self.robot_id}: Ошибка подключения: {e}")
 
-        except Exception as e:
-            logging.info(f" {self.robot_id}: Ошибка подключения: {e}")
+            if attempt < SEND_RETRIES:
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
 
     def run(self):
         """Основной цикл работы робота"""